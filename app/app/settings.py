@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "core",
@@ -45,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,17 +80,68 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Connections are reused across requests through a per-process pool, see
+# core.db.backends.postgresql_pool for the POOL options.
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.db.backends.postgresql_pool",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "POOL": {
+            "MAX_SIZE": int(os.environ.get("DB_POOL_SIZE", 10)),
+            "MAX_IDLE": 300,
+            "MAX_LIFETIME": 3600,
+            "CHECK_AFTER": 30,
+            "TIMEOUT": 30,
+        },
     }
 }
 
 
+# Metrics exposed on /metrics
+# Set METRICS_DIR to a directory shared by every worker process on the host to
+# aggregate their metrics, each process writes its totals there every few seconds.
+
+METRICS_DIR = os.environ.get("METRICS_DIR")
+METRICS_FLUSH_INTERVAL = 5
+# /metrics answers requests bearing METRICS_TOKEN as `Authorization: Bearer <token>`,
+# or from the comma-separated METRICS_ALLOWED_IPS, and 403 to anyone else. No
+# address is trusted by default: behind a local reverse proxy every request
+# comes from 127.0.0.1.
+METRICS_ALLOWED_IPS = [
+    ip for ip in os.environ.get("METRICS_ALLOWED_IPS", "").split(",") if ip
+]
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# Set MEMCACHED_LOCATION to share the cache between processes and hosts,
+# otherwise each process keeps its own LRU-bounded local-memory cache.
+
+if os.environ.get("MEMCACHED_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": os.environ.get("MEMCACHED_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# Cache alias and timeout in seconds for per-user listings and recipe indexes
+RECIPE_RESPONSE_CACHE = "default"
+RECIPE_RESPONSE_CACHE_TIMEOUT = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -125,4 +178,73 @@ MEDIA_URL = "/media/"
 STATIC_ROOT = "/vol/web/static/"
 MEDIA_ROOT = "/vol/web/media/"
 
+# Who sends media files once their owner was checked: "" for Django itself,
+# "x-accel-redirect" for nginx or "x-sendfile" for Apache and lighttpd
+MEDIA_SERVE_MODE = os.environ.get("MEDIA_SERVE_MODE", "")
+# Internal nginx location aliased to MEDIA_ROOT
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+# Media names are unique per upload so browsers may cache them for a year
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Image formats accepted for recipe images, and their largest width * height,
+# checked from the header before anything gets decoded
+RECIPE_IMAGE_FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+RECIPE_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Largest recipe image accepted by chunked uploads, in bytes, and how long an
+# unfinished upload can be resumed, in seconds
+RECIPE_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+RECIPE_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Replaced or deleted recipe images modified within this many seconds are left
+# to delete_orphaned_images, a recipe not committed yet may be reusing them
+RECIPE_IMAGE_RELEASE_GRACE = 5 * 60
+
+# Resized copies generated for every recipe image upload, as max (width, height)
+RECIPE_IMAGE_VARIANTS = {"thumbnail": (150, 150), "medium": (600, 600)}
+
+# Worker threads generating image variants, 0 generates them in-process
+RECIPE_IMAGE_WORKERS = 2
+
 AUTH_USER_MODEL = "core.UserModel"
+
+# Lifetime in seconds of the stateless tokens issued by `users:token?signed=1`
+SIGNED_TOKEN_MAX_AGE = 60 * 60 * 24
+
+# Recipes a tag or ingredient filter passes to the database as a list of ids,
+# larger matches are filtered with subqueries on the M2M tables instead
+RECIPE_INDEX_MAX_IDS = 500
+
+# Recipe indexes kept in each process, in front of the shared cache
+RECIPE_INDEX_LOCAL_SIZE = 256
+
+# Largest list accepted by the recipe, tag and ingredient bulk endpoints
+BULK_CREATE_MAX_ITEMS = 5000
+
+# Recipes read per query when streaming an export
+RECIPE_EXPORT_CHUNK_SIZE = 1000
+
+# Recipes validated and loaded per transaction by an import
+RECIPE_IMPORT_BATCH_SIZE = 1000
+
+# Recipes returned by the similar recipes endpoint
+RECIPE_SIMILAR_MAX_RESULTS = 10
+
+# Recipes returned by the pantry endpoint, and the most missing ingredients
+# a client may allow
+RECIPE_PANTRY_MAX_RESULTS = 100
+RECIPE_PANTRY_MAX_MISSING = 10
+
+# Percentiles, histogram bins and number of top tags and ingredients reported
+# by the recipe stats endpoint
+RECIPE_STATS_PERCENTILES = (25, 50, 75, 90, 99)
+RECIPE_STATS_HISTOGRAM_BINS = 10
+RECIPE_STATS_TOP = 5
+
+# Build recipe, tag and ingredient list responses straight from database rows
+# instead of going through the DRF serializers, see recipe.fast
+RECIPE_FAST_SERIALIZERS = True
+
+# Assemble the unfiltered recipe list from JSON stored per recipe, see
+# recipe.snapshots, requires RECIPE_FAST_SERIALIZERS
+RECIPE_SNAPSHOTS = True
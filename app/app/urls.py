@@ -15,11 +15,15 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf.urls.static import static
 from django.conf import settings
 
+from core import views as core_views
+from recipe.media import MediaView
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", core_views.metrics, name="metrics"),
     path("api/users/", include("users.urls")),
     path("api/recipe/", include("recipe.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", MediaView.as_view(), name="media"),
+]
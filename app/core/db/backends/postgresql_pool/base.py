@@ -0,0 +1,94 @@
+import threading
+
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from psycopg2 import extensions
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def close_all_pools():
+    """Close the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.closeall()
+
+
+def _check(conn):
+    """Return True if the server still answers on the connection"""
+    if conn.closed:
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    return True
+
+
+def _reset(conn):
+    """Roll back anything left open so the next checkout starts clean"""
+    if conn.closed:
+        raise Database.InterfaceError("connection already closed")
+    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use
+        close_all_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that reuses connections from a process-wide pool
+
+    Pool options are read from the POOL dictionary of the database settings:
+    MAX_SIZE, MAX_IDLE, MAX_LIFETIME, CHECK_AFTER and TIMEOUT (seconds).
+    """
+
+    creation_class = DatabaseCreation
+
+    def _get_pool(self, conn_params):
+        key = tuple(sorted((name, str(value)) for name, value in conn_params.items()))
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = self.settings_dict.get("POOL", {})
+                pool = _pools[key] = ConnectionPool(
+                    connect=lambda: super(DatabaseWrapper, self).get_new_connection(
+                        conn_params
+                    ),
+                    check=_check,
+                    reset=_reset,
+                    max_size=options.get("MAX_SIZE", 10),
+                    max_idle=options.get("MAX_IDLE", 300),
+                    max_lifetime=options.get("MAX_LIFETIME", 3600),
+                    check_after=options.get("CHECK_AFTER", 30),
+                    timeout=options.get("TIMEOUT", 30),
+                )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        self._pool = self._get_pool(conn_params)
+        try:
+            connection = self._pool.getconn()
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc))
+        # The parent sets this on whichever wrapper opened the connection,
+        # a pooled connection may be handed to a different one.
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self._pool.putconn(self.connection)
@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available in time"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of reusable database connections
+
+    `connect` opens a new connection. Idle connections are checked with
+    `check` before being handed out again once they sat idle for
+    `check_after` seconds, and are recycled after `max_idle` seconds of idling
+    or `max_lifetime` seconds in total. Every checkout and checkin also closes
+    the idle connections past those limits, wherever they are in the stack.
+    `reset` runs whenever a connection is returned and should leave it ready
+    for the next user, raising if it can't.
+    """
+
+    def __init__(
+        self,
+        connect,
+        close=lambda conn: conn.close(),
+        check=lambda conn: True,
+        reset=lambda conn: None,
+        max_size=10,
+        max_idle=300,
+        max_lifetime=3600,
+        check_after=30,
+        timeout=30,
+    ):
+        self._connect = connect
+        self._close = close
+        self._check = check
+        self._reset = reset
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+        self.timeout = timeout
+
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        """Number of open connections, idle or checked out"""
+        return self._size
+
+    @property
+    def idle(self):
+        """Number of idle connections"""
+        return len(self._idle)
+
+    def getconn(self):
+        """Check out a healthy connection, opening one if the pool has room"""
+        deadline = time.monotonic() + self.timeout
+        self._evict_expired()
+        while True:
+            conn, idle_since = self._checkout(deadline)
+            if conn is None:
+                break
+            now = time.monotonic()
+            if self._expired(conn, idle_since, now):
+                self._discard(conn)
+            elif now - idle_since >= self.check_after and not self._healthy(conn):
+                self._discard(conn)
+            else:
+                return conn
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, or close it when discarded"""
+        if not discard:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+        if discard or self._expired(conn, time.monotonic(), time.monotonic()):
+            self._discard(conn)
+            return
+
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+        self._evict_expired()
+
+    def closeall(self):
+        """Close every idle connection"""
+        with self._condition:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def _evict_expired(self):
+        """Close the idle connections that went past max_idle or max_lifetime
+
+        Checkouts take the most recently used connection, so the ones at the
+        bottom of the stack would otherwise only be looked at once traffic
+        digs down to them, possibly after the server closed them.
+        """
+        now = time.monotonic()
+        expired, kept = [], deque()
+        with self._condition:
+            for item in self._idle:
+                (expired if self._expired(*item, now) else kept).append(item)
+            self._idle = kept
+        for conn, _ in expired:
+            self._discard(conn)
+
+    def _checkout(self, deadline):
+        """Pop the most recently used idle connection or reserve a new slot
+
+        Returns (None, None) once a slot for a new connection was reserved.
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout} seconds"
+                    )
+                self._condition.wait(remaining)
+
+    def _expired(self, conn, idle_since, now):
+        created_at = self._created_at.get(id(conn), now)
+        return now - idle_since > self.max_idle or now - created_at > self.max_lifetime
+
+    def _healthy(self, conn):
+        try:
+            return self._check(conn)
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._created_at.pop(id(conn), None)
+        try:
+            self._close(conn)
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -1,20 +1,48 @@
 import time
 
-from django.db import connections
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to pause execution until database is available"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Seconds to wait before giving up",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Longest pause in seconds between two attempts",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
     def handle(self, *args, **kwargs):
         self.stdout.write("Waiting for database...")
-        db_conn = None
-        while not db_conn:
+        deadline = time.monotonic() + kwargs["timeout"]
+        delay = 0.1
+        while True:
             try:
-                db_conn = connections["default"]
+                self.probe(kwargs["database"])
+                break
             except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second..")
-                time.sleep(1)
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(
+                        f"Database unavailable after {kwargs['timeout']:g} seconds!"
+                    )
+                self.stdout.write(f"Database unavailable, waiting {delay:g} seconds..")
+                time.sleep(delay)
+                delay = min(delay * 2, kwargs["max_delay"])
         self.stdout.write(self.style.SUCCESS("Database available!"))
+
+    def probe(self, alias):
+        """Open a connection and run a trivial query on it"""
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
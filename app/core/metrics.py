@@ -0,0 +1,255 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# metrics-<pid>-<token>.json, the token tells apart processes reusing a pid
+PROCESS_FILE_RE = re.compile(r"^metrics-(\d+)(?:-[0-9a-f]+)?\.json$")
+# Totals of exited processes, kept so that counters never go backwards
+ARCHIVE_FILE = "metrics-archive.json"
+
+# name -> (type, help, buckets) of every metric recorded per view and method
+METRICS = {
+    "http_request_duration_seconds": (
+        "histogram",
+        "Request latency in seconds",
+        LATENCY_BUCKETS,
+    ),
+    "http_request_db_queries": (
+        "histogram",
+        "SQL queries executed per request",
+        QUERY_COUNT_BUCKETS,
+    ),
+    "http_request_db_duration_seconds": (
+        "histogram",
+        "Time spent executing SQL per request in seconds",
+        LATENCY_BUCKETS,
+    ),
+    "http_response_size_bytes": (
+        "histogram",
+        "Response body size in bytes",
+        SIZE_BUCKETS,
+    ),
+    "http_responses_total": ("counter", "Responses by status code", None),
+}
+
+
+class MetricsRegistry:
+    """Per-thread metric shards merged on collection
+
+    Each thread only ever writes to its own shard, so recording needs no
+    lock. With METRICS_DIR set, every process periodically writes its totals
+    to a file in that directory and collection sums the files of all
+    processes. Files of processes that exited are folded into a single
+    archive file on collection.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._file_pid = self._file_token = None
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, name, labels, value):
+        """Record `value` in the histogram `name`"""
+        buckets = METRICS[name][2]
+        shard = self._shard()
+        key = (name, labels)
+        series = shard.get(key)
+        if series is None:
+            # One count per bucket, then +Inf, then the sum
+            series = shard[key] = [0] * (len(buckets) + 2)
+        series[bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def increment(self, name, labels, amount=1):
+        """Add `amount` to the counter `name`"""
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe_request(self, view, method, status, duration, queries, db_duration, size):
+        """Record every metric of a single request"""
+        labels = (("view", view), ("method", method))
+        self.observe("http_request_duration_seconds", labels, duration)
+        self.observe("http_request_db_queries", labels, queries)
+        self.observe("http_request_db_duration_seconds", labels, db_duration)
+        if size is not None:
+            self.observe("http_response_size_bytes", labels, size)
+        self.increment("http_responses_total", labels + (("status", str(status)),))
+        self.maybe_flush()
+
+    def local_totals(self):
+        """Return this process' metrics summed over every thread"""
+        totals = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in dict(shard).items():
+                totals[key] = _add(totals.get(key), value)
+        return totals
+
+    def _own_file(self):
+        """Return the name of this process' file, unique even if its pid is reused"""
+        pid = os.getpid()
+        if self._file_pid != pid:
+            # Forked workers inherit the registry but need a file of their own
+            self._file_pid, self._file_token = pid, uuid.uuid4().hex[:16]
+        return f"metrics-{pid}-{self._file_token}.json"
+
+    def maybe_flush(self):
+        """Write this process' totals to METRICS_DIR if they are due"""
+        if not settings.METRICS_DIR:
+            return
+        if time.monotonic() - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self):
+        """Atomically write this process' totals to METRICS_DIR"""
+        self._last_flush = time.monotonic()
+        _write_totals(os.path.join(settings.METRICS_DIR, self._own_file()), self.local_totals())
+
+    def collect(self):
+        """Return the metrics of every process, or of this one alone"""
+        totals = self.local_totals()
+        if not settings.METRICS_DIR:
+            return totals
+
+        # Lock the directory so that concurrent collections archive each file once
+        lock = os.open(settings.METRICS_DIR, os.O_RDONLY)
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._archive_exited()
+            own_file = self._own_file()
+            for entry in os.scandir(settings.METRICS_DIR):
+                if entry.name.endswith(".json") and entry.name != own_file:
+                    for key, value in _read_totals(entry.path).items():
+                        totals[key] = _add(totals.get(key), value)
+        finally:
+            os.close(lock)
+        return totals
+
+    def _archive_exited(self):
+        """Add the totals of processes that exited to the archive and drop their files"""
+        exited = []
+        for entry in os.scandir(settings.METRICS_DIR):
+            match = PROCESS_FILE_RE.match(entry.name)
+            if match and not _is_running(int(match.group(1))):
+                exited.append(entry.path)
+        if not exited:
+            return
+
+        archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+        archive = _read_totals(archive_path)
+        for path in exited:
+            for key, value in _read_totals(path).items():
+                archive[key] = _add(archive.get(key), value)
+        _write_totals(archive_path, archive)
+        for path in exited:
+            os.remove(path)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        totals = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = sorted(
+                (labels, value) for (metric, labels), value in totals.items() if metric == name
+            )
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    bucket_labels = labels + (("le", _number(bound)),)
+                    lines.append(f"{name}_bucket{_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _is_running(pid):
+    """Return True if a process with this id exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_totals(path):
+    """Return the totals written to a file, or nothing if it can't be read"""
+    try:
+        with open(path) as stream:
+            rows = json.load(stream)
+    except (OSError, ValueError):
+        return {}
+    return {(name, tuple(tuple(label) for label in labels)): value for name, labels, value in rows}
+
+
+def _write_totals(path, totals):
+    """Atomically replace a file with totals"""
+    rows = [[name, list(labels), value] for (name, labels), value in totals.items()]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as stream:
+        json.dump(rows, stream)
+    os.replace(tmp_path, path)
+
+
+def _add(total, value):
+    """Add a counter or histogram value to a running total"""
+    if total is None:
+        return list(value) if isinstance(value, list) else value
+    if isinstance(value, list):
+        return [a + b for a, b in zip(total, value)]
+    return total + value
+
+
+def _number(value):
+    return value if isinstance(value, str) else repr(float(value)).replace("inf", "+Inf")
+
+
+def _labels(labels):
+    """Render label pairs, escaping values as the exposition format requires"""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+REGISTRY = MetricsRegistry()
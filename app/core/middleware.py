@@ -0,0 +1,58 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core.metrics import REGISTRY
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Record latency, SQL and response size metrics per view and method"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        if not response.streaming:
+            size = len(response.content)
+        elif response.has_header("Content-Length"):
+            size = int(response["Content-Length"])
+        else:
+            size = None
+
+        REGISTRY.observe_request(
+            view,
+            request.method,
+            response.status_code,
+            duration,
+            timer.count,
+            timer.duration,
+            size,
+        )
+        return response
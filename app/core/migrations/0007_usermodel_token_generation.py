@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
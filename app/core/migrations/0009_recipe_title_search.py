@@ -0,0 +1,41 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+CREATE_INDEXES = [
+    "CREATE INDEX core_recipe_title_tsv_idx ON core_recipe "
+    "USING GIN (to_tsvector('english'::regconfig, COALESCE(title, '')))",
+    "CREATE INDEX core_recipe_title_trgm_idx ON core_recipe "
+    "USING GIN (title gin_trgm_ops)",
+]
+
+DROP_INDEXES = [
+    "DROP INDEX IF EXISTS core_recipe_title_tsv_idx",
+    "DROP INDEX IF EXISTS core_recipe_title_trgm_idx",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    """Index recipe titles for full-text and trigram search on PostgreSQL"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in CREATE_INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in DROP_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipeimagevariant'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_title_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='data_modified_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='usermodel',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
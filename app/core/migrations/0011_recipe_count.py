@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:18
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    for name, through in (("Tag", Recipe.tags.through), ("Ingredient", Recipe.ingredients.through)):
+        model = apps.get_model("core", name)
+        column = f"{name.lower()}_id"
+        counts = (
+            through.objects.filter(**{column: OuterRef("pk")})
+            .order_by()
+            .values(column)
+            .annotate(count=Count("recipe_id"))
+            .values("count")
+        )
+        model.objects.update(
+            recipe_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_usermodel_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:22
+
+from django.db import migrations, models
+
+# Lookups by tag or ingredient, the unique constraint already covers recipe_id first
+THROUGH_INDEXES = (
+    ("core_recipe_tags", "core_recipe_tags_tag_recipe_idx", "tag_id"),
+    ("core_recipe_ingredients", "core_recipe_ingredients_ingredient_recipe_idx", "ingredient_id"),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'name', 'id'], name='ingredient_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(condition=models.Q(recipe_count__gt=0), fields=['user', 'name', 'id'], name='ingredient_user_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-recipe_count', 'name', 'id'], name='ingredient_user_most_used_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'name', 'id'], name='tag_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(condition=models.Q(recipe_count__gt=0), fields=['user', 'name', 'id'], name='tag_user_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-recipe_count', 'name', 'id'], name='tag_user_most_used_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f"CREATE INDEX {name} ON {table} ({column}, recipe_id)",
+            f"DROP INDEX {name}",
+        )
+        for table, name, column in THROUGH_INDEXES
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeMinHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_bands', to='core.Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recipeminhashband',
+            index=models.Index(fields=['user', 'band', 'bucket'], name='minhash_band_bucket_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipeminhashband',
+            unique_together={('recipe', 'band')},
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def count_values(apps, schema_editor):
+    Recipe = apps.get_model("core", "Recipe")
+    RecipeValueCount = apps.get_model("core", "RecipeValueCount")
+    rows = []
+    for field, scale in (("price", 100), ("time_minutes", 1)):
+        counts = Recipe.objects.values_list("user_id", field).annotate(count=Count("id"))
+        for user_id, value, count in counts.order_by():
+            rows.append(
+                RecipeValueCount(
+                    user_id=user_id, field=field, value=int(value * scale), count=count
+                )
+            )
+    RecipeValueCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recipeimageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeValueCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(choices=[('price', 'Price in cents'), ('time_minutes', 'Time in minutes')], max_length=16)),
+                ('value', models.IntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'field', 'value')},
+            },
+        ),
+        migrations.RunPython(count_values, migrations.RunPython.noop),
+    ]
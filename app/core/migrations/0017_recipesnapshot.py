@@ -0,0 +1,21 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipevaluecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSnapshot',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='core.Recipe')),
+                ('body', models.TextField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:02
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipesnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='index_token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
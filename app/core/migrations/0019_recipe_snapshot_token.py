@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-16 21:20
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_usermodel_index_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='snapshot_token',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+        # Existing snapshots get a token no recipe has and are rendered again
+        migrations.AddField(
+            model_name='recipesnapshot',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4),
+            preserve_default=False,
+        ),
+    ]
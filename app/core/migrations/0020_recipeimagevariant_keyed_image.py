@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-16 22:05
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_recipe_snapshot_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeimagevariant',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.KeyedStorage(), upload_to=core.models.recipe_image_variant_file_path),
+        ),
+    ]
@@ -5,12 +5,19 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 import os
 import uuid
 
+from core.storage import ContentAddressedStorage, KeyedStorage
+
 
 def recipe_image_file_path(instance, filename):
-    """Generate file path for new recipe image"""
+    """Generate file path for new recipe image
+
+    The storage replaces the file name with the hash of the image content.
+    """
 
     ext = os.path.splitext(filename)[1]
     new_name = f"{uuid.uuid4()}{ext}"
@@ -18,6 +25,16 @@ def recipe_image_file_path(instance, filename):
     return os.path.join("uploads/recipe/", new_name)
 
 
+def recipe_image_variant_file_path(instance, filename):
+    """Generate file path for a resized variant of a recipe image
+
+    Variants are named after the source image's digest and the variant name,
+    recipes sharing an image share its variants.
+    """
+
+    return os.path.join("uploads/variants/", filename)
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         """Creates and saves a new user"""
@@ -38,6 +55,17 @@ class UserManager(BaseUserManager):
 
         return superuser
 
+    def bump_data_version(self, user_id, links=False):
+        """Record that the user's recipes, tags or ingredients have changed
+
+        `links` tells that recipes may have gained or lost tags or ingredients,
+        which also invalidates the user's recipe index.
+        """
+        changes = {"data_version": F("data_version") + 1, "data_modified_at": timezone.now()}
+        if links:
+            changes["index_token"] = uuid.uuid4()
+        self.filter(pk=user_id).update(**changes)
+
 
 class UserModel(AbstractBaseUser, PermissionsMixin):
     """Custom user model that supports using email instead of username"""
@@ -46,6 +74,11 @@ class UserModel(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    token_generation = models.PositiveIntegerField(default=0)
+    data_version = models.PositiveIntegerField(default=0)
+    data_modified_at = models.DateTimeField(null=True)
+    # Replaced whenever the user's recipe tags or ingredients change
+    index_token = models.UUIDField(default=uuid.uuid4, editable=False)
 
     objects = UserManager()
 
@@ -57,6 +90,23 @@ class Tag(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Number of recipes using it, kept up to date by recipe.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Serve the per-user listings, alphabetical, assigned only or most used first
+        indexes = (
+            models.Index(fields=("user", "name", "id"), name="tag_user_name_idx"),
+            models.Index(
+                fields=("user", "name", "id"),
+                name="tag_user_assigned_idx",
+                condition=models.Q(recipe_count__gt=0),
+            ),
+            models.Index(
+                fields=("user", "-recipe_count", "name", "id"),
+                name="tag_user_most_used_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -67,6 +117,23 @@ class Ingredient(models.Model):
 
     name = models.CharField(max_length=255)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Number of recipes using it, kept up to date by recipe.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # Serve the per-user listings, alphabetical, assigned only or most used first
+        indexes = (
+            models.Index(fields=("user", "name", "id"), name="ingredient_user_name_idx"),
+            models.Index(
+                fields=("user", "name", "id"),
+                name="ingredient_user_assigned_idx",
+                condition=models.Q(recipe_count__gt=0),
+            ),
+            models.Index(
+                fields=("user", "-recipe_count", "name", "id"),
+                name="ingredient_user_most_used_idx",
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -82,7 +149,143 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField("Ingredient")
     tags = models.ManyToManyField("Tag")
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_file_path, storage=ContentAddressedStorage()
+    )
+    # Replaced whenever the list rendering of the recipe changes, see RecipeSnapshot
+    snapshot_token = models.UUIDField(default=uuid.uuid4, editable=False)
+
+    class Meta:
+        indexes = (
+            # Serve the per-user listing, newest first
+            models.Index(fields=("user", "-id"), name="recipe_user_id_idx"),
+            # Count the recipes sharing a content-addressed image
+            models.Index(fields=("image",), name="recipe_image_idx"),
+        )
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageVariant(models.Model):
+    """Resized copy of a recipe image, generated in the background"""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+    STATUS_CHOICES = ((PENDING, "Pending"), (READY, "Ready"), (FAILED, "Failed"))
+
+    recipe = models.ForeignKey(
+        "Recipe", on_delete=models.CASCADE, related_name="image_variants"
+    )
+    name = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    image = models.ImageField(
+        null=True, upload_to=recipe_image_variant_file_path, storage=KeyedStorage()
+    )
+    width = models.PositiveIntegerField(null=True)
+    height = models.PositiveIntegerField(null=True)
+
+    class Meta:
+        ordering = ("name",)
+        unique_together = ("recipe", "name")
+
+    def __str__(self):
+        return f"{self.recipe} ({self.name})"
+
+
+class RecipeImageUpload(models.Model):
+    """Recipe image uploaded in chunks, see recipe.uploads
+
+    `offset` is the number of bytes received so far, the client resumes from
+    there after an interrupted chunk.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    recipe = models.ForeignKey(
+        "Recipe", on_delete=models.CASCADE, related_name="image_uploads"
+    )
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class RecipeValueCount(models.Model):
+    """Number of a user's recipes with a given price or duration
+
+    Kept up to date on every recipe write, see recipe.stats. Prices are
+    stored in cents.
+    """
+
+    PRICE = "price"
+    TIME_MINUTES = "time_minutes"
+    FIELD_CHOICES = ((PRICE, "Price in cents"), (TIME_MINUTES, "Time in minutes"))
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    field = models.CharField(max_length=16, choices=FIELD_CHOICES)
+    value = models.IntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Also reads a user's distribution in value order
+        unique_together = ("user", "field", "value")
+
+    def __str__(self):
+        return f"{self.field}={self.value}: {self.count}"
+
+
+class RecipeSnapshotManager(models.Manager):
+    def invalidate(self, recipe_ids):
+        """Drop the snapshots of recipes whose rendering changed
+
+        The recipes also get a new snapshot token, so a snapshot a concurrent
+        list request renders from the replaced data is never served.
+        """
+        recipe_ids = list(recipe_ids)
+        if recipe_ids:
+            Recipe.objects.filter(pk__in=recipe_ids).update(snapshot_token=uuid.uuid4())
+            self.filter(recipe_id__in=recipe_ids).delete()
+
+
+class RecipeSnapshot(models.Model):
+    """JSON of a recipe exactly as the recipe list renders it, see recipe.snapshots"""
+
+    recipe = models.OneToOneField(
+        "Recipe", on_delete=models.CASCADE, primary_key=True, related_name="snapshot"
+    )
+    body = models.TextField()
+    # Snapshot token of the recipe when the body was rendered
+    token = models.UUIDField()
+
+    objects = RecipeSnapshotManager()
+
+    def __str__(self):
+        return f"Snapshot of {self.recipe_id}"
+
+
+class RecipeMinHashBand(models.Model):
+    """LSH bucket of one band of a recipe's ingredient MinHash signature
+
+    Recipes sharing a bucket in any band are candidates for being similar,
+    see recipe.similarity.
+    """
+
+    recipe = models.ForeignKey(
+        "Recipe", on_delete=models.CASCADE, related_name="minhash_bands"
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        unique_together = ("recipe", "band")
+        indexes = (
+            models.Index(fields=("user", "band", "bucket"), name="minhash_band_bucket_idx"),
+        )
+
+    def __str__(self):
+        return f"{self.recipe} (band {self.band})"
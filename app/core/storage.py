@@ -0,0 +1,66 @@
+import hashlib
+import os
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """Return the hex SHA-256 digest of a file's content"""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class KeyedStorage(FileSystemStorage):
+    """File system storage where a name identifies the content of the file
+
+    Saving under a name that exists returns it and only touches the file, so
+    a name may be referenced by several rows and the deletes skipping
+    recently modified files never remove one a pending row is reusing.
+    """
+
+    def touch(self, name):
+        """Mark a file as just reused, return False if it doesn't exist"""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_keyed_name(name, content)
+        if self.touch(name):
+            return name
+
+        # Write under a unique name and rename, concurrent saves of the same
+        # content then replace the file with identical bytes.
+        temp_name = self._save(f"{name}.{uuid.uuid4().hex}.tmp", content)
+        os.replace(self.path(temp_name), self.path(name))
+        return name
+
+    def get_keyed_name(self, name, content):
+        """Return the name identifying `content`, the name asked for by default"""
+        return name
+
+
+@deconstructible
+class ContentAddressedStorage(KeyedStorage):
+    """File system storage naming files after the SHA-256 of their content
+
+    Only the directory and extension of the name asked for are kept, the file
+    is stored as <directory>/<first two digits>/<digest><extension>.
+    """
+
+    def get_keyed_name(self, name, content):
+        digest = content_hash(content)
+        directory, extension = os.path.dirname(name), os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
@@ -1,6 +1,7 @@
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import TestCase
 
@@ -9,15 +10,47 @@ class CommandTests(TestCase):
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is available"""
         with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.return_value = True
+            gi.return_value = MagicMock()
             call_command("wait_for_db")
 
             self.assertEqual(gi.call_count, 1)
+            cursor = gi.return_value.cursor.return_value.__enter__.return_value
+            cursor.execute.assert_called_once_with("SELECT 1")
 
     @patch("time.sleep", return_value=True)
     def test_wait_for_db(self, ts):
         """Test waiting for db"""
         with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+            gi.side_effect = [OperationalError] * 5 + [MagicMock()]
             call_command("wait_for_db")
             self.assertEqual(gi.call_count, 6)
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_backs_off(self, ts):
+        """Test that the pause between attempts doubles up to the maximum"""
+        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
+            gi.side_effect = [OperationalError] * 5 + [MagicMock()]
+            call_command("wait_for_db", "--max-delay=0.5")
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_when_connection_fails(self, ts):
+        """Test that a connection failing on its first query is retried"""
+        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
+            broken = MagicMock()
+            broken.cursor.side_effect = OperationalError
+            gi.side_effect = [broken, MagicMock()]
+            call_command("wait_for_db")
+
+            self.assertEqual(gi.call_count, 2)
+
+    @patch("time.monotonic", side_effect=[0, 0, 10])
+    @patch("time.sleep", return_value=True)
+    def test_wait_for_db_timeout(self, ts, tm):
+        """Test that the command gives up once the timeout has passed"""
+        with patch("django.db.utils.ConnectionHandler.__getitem__") as gi:
+            gi.side_effect = OperationalError
+            with self.assertRaises(CommandError):
+                call_command("wait_for_db", "--timeout=5")
@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault("check", lambda conn: conn.healthy)
+        return ConnectionPool(self.connect, **kwargs)
+
+    def test_connection_is_reused(self):
+        """Test that a returned connection is handed out again"""
+        pool = self.make_pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(pool.size, 1)
+
+    def test_pool_size_is_bounded(self):
+        """Test that checkouts beyond max_size time out"""
+        pool = self.make_pool(max_size=2, timeout=0.01)
+        pool.getconn()
+        pool.getconn()
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+        self.assertEqual(len(self.opened), 2)
+
+    def test_failed_connect_frees_slot(self):
+        """Test that a connection failing to open doesn't use up the pool"""
+        pool = ConnectionPool(lambda: 1 / 0, max_size=1)
+        with self.assertRaises(ZeroDivisionError):
+            pool.getconn()
+
+        self.assertEqual(pool.size, 0)
+
+    def test_idle_connection_is_recycled(self):
+        """Test that connections idle for too long are closed and replaced"""
+        pool = self.make_pool(max_idle=10)
+        with patch("time.monotonic", return_value=100):
+            conn = pool.getconn()
+            pool.putconn(conn)
+        with patch("time.monotonic", return_value=111):
+            new_conn = pool.getconn()
+
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_connections_below_the_top_are_evicted(self):
+        """Test that connections left under busier ones are closed once idle too long"""
+        pool = self.make_pool(max_idle=10)
+        with patch("time.monotonic", return_value=100):
+            bottom, top = pool.getconn(), pool.getconn()
+            pool.putconn(bottom)
+        with patch("time.monotonic", return_value=105):
+            pool.putconn(top)
+        with patch("time.monotonic", return_value=111):
+            self.assertIs(pool.getconn(), top)
+
+        self.assertTrue(bottom.closed)
+        self.assertEqual(pool.idle, 0)
+        self.assertEqual(pool.size, 1)
+
+    def test_old_connection_is_recycled(self):
+        """Test that connections are closed once they reach max_lifetime"""
+        pool = self.make_pool(max_lifetime=60)
+        with patch("time.monotonic", return_value=100):
+            conn = pool.getconn()
+        with patch("time.monotonic", return_value=161):
+            pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.idle, 0)
+        self.assertEqual(pool.size, 0)
+
+    def test_unhealthy_connection_is_discarded(self):
+        """Test that idle connections failing the health check are replaced"""
+        pool = self.make_pool(check_after=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.healthy = False
+
+        self.assertIsNot(pool.getconn(), conn)
+        self.assertTrue(conn.closed)
+
+    def test_connection_failing_reset_is_discarded(self):
+        """Test that connections which can't be reset aren't returned to the pool"""
+
+        def reset(conn):
+            raise RuntimeError
+
+        pool = self.make_pool(reset=reset)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.idle, 0)
+        self.assertEqual(pool.size, 0)
@@ -0,0 +1,154 @@
+import json
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.metrics import MetricsRegistry
+
+METRICS_URL = reverse("metrics")
+LABELS = (("view", "recipe:tag-list"), ("method", "GET"))
+EXITED_PID = 999999999
+
+
+class MetricsRegistryTests(TestCase):
+    """Test aggregating and rendering request metrics"""
+
+    def test_render_histogram(self):
+        """Test that histograms are rendered with cumulative buckets"""
+        registry = MetricsRegistry()
+        registry.observe("http_request_duration_seconds", LABELS, 0.003)
+        registry.observe("http_request_duration_seconds", LABELS, 0.2)
+
+        output = registry.render()
+
+        prefix = 'http_request_duration_seconds_bucket{view="recipe:tag-list",method="GET"'
+        self.assertIn(f'{prefix},le="0.005"}} 1', output)
+        self.assertIn(f'{prefix},le="0.25"}} 2', output)
+        self.assertIn(f'{prefix},le="+Inf"}} 2', output)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", output)
+
+    def test_threads_are_merged(self):
+        """Test that metrics recorded on different threads are summed"""
+        registry = MetricsRegistry()
+
+        def record():
+            for _ in range(100):
+                registry.increment("http_responses_total", LABELS)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(registry.local_totals()[("http_responses_total", LABELS)], 400)
+
+    def test_processes_are_merged(self):
+        """Test that totals flushed by other processes are included"""
+        registry = MetricsRegistry()
+        registry.increment("http_responses_total", LABELS, 2)
+
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            with open(os.path.join(metrics_dir, "metrics-1.json"), "w") as stream:
+                json.dump([["http_responses_total", [list(label) for label in LABELS], 3]], stream)
+
+            with override_settings(METRICS_DIR=metrics_dir):
+                registry.flush()
+                totals = registry.collect()
+
+            self.assertEqual(len(os.listdir(metrics_dir)), 2)
+
+        self.assertEqual(totals[("http_responses_total", LABELS)], 5)
+
+    def test_reused_pid_keeps_previous_file(self):
+        """Test that a process never overwrites the file of an exited one with its pid"""
+        registry = MetricsRegistry()
+        registry.increment("http_responses_total", LABELS, 2)
+        rows = [["http_responses_total", [list(label) for label in LABELS], 3]]
+
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            previous = f"metrics-{os.getpid()}-0123456789abcdef.json"
+            with open(os.path.join(metrics_dir, previous), "w") as stream:
+                json.dump(rows, stream)
+
+            with override_settings(METRICS_DIR=metrics_dir):
+                registry.flush()
+                totals = registry.collect()
+
+            self.assertIn(previous, os.listdir(metrics_dir))
+            self.assertEqual(len(os.listdir(metrics_dir)), 2)
+
+        self.assertEqual(totals[("http_responses_total", LABELS)], 5)
+
+    def test_exited_processes_archived(self):
+        """Test that files of exited processes are folded into the archive"""
+        registry = MetricsRegistry()
+        rows = [["http_responses_total", [list(label) for label in LABELS], 3]]
+
+        with tempfile.TemporaryDirectory() as metrics_dir:
+            for name in (
+                "metrics-archive.json",
+                f"metrics-{EXITED_PID}.json",
+                f"metrics-{EXITED_PID}-0123456789abcdef.json",
+            ):
+                with open(os.path.join(metrics_dir, name), "w") as stream:
+                    json.dump(rows, stream)
+
+            with override_settings(METRICS_DIR=metrics_dir), patch(
+                "core.metrics._is_running", lambda pid: pid != EXITED_PID
+            ):
+                totals = registry.collect()
+                self.assertEqual(registry.collect(), totals)
+
+            files = sorted(name for name in os.listdir(metrics_dir) if name.endswith(".json"))
+            self.assertEqual(files, ["metrics-archive.json"])
+
+        self.assertEqual(totals[("http_responses_total", LABELS)], 9)
+
+
+class MetricsEndpointTests(TestCase):
+    """Test the metrics middleware and endpoint"""
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_requests_recorded_per_view(self):
+        """Test that requests are recorded under their resolved view name"""
+        user = get_user_model().objects.create_user("test@example.com", "password123")
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get(reverse("recipe:tag-list"))
+
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        output = res.content.decode()
+        self.assertIn(
+            'http_responses_total{view="recipe:tag-list",method="GET",status="200"}',
+            output,
+        )
+        self.assertIn('http_request_db_queries_count{view="recipe:tag-list"', output)
+
+    def test_local_address_not_trusted_by_default(self):
+        """Test that requests from localhost need the token unless allowed"""
+        res = APIClient().get(METRICS_URL, REMOTE_ADDR="127.0.0.1")
+
+        self.assertEqual(res.status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.1"], METRICS_TOKEN="secret")
+    def test_metrics_restricted(self):
+        """Test that other addresses need the metrics token"""
+        client = APIClient()
+
+        self.assertEqual(client.get(METRICS_URL).status_code, 403)
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(res.status_code, 403)
+        res = client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(res.status_code, 200)
+        res = client.get(METRICS_URL, REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,36 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.storage = ContentAddressedStorage(location=directory.name)
+
+    def test_name_is_content_hash(self):
+        """Test that files are named after the hash of their content"""
+        digest = hashlib.sha256(b"photo").hexdigest()
+
+        name = self.storage.save("uploads/recipe/a.JPG", ContentFile(b"photo"))
+
+        self.assertEqual(name, f"uploads/recipe/{digest[:2]}/{digest}.jpg")
+        with self.storage.open(name) as stream:
+            self.assertEqual(stream.read(), b"photo")
+
+    def test_same_content_stored_once(self):
+        """Test that saving the same bytes twice returns the same file"""
+        first = self.storage.save("uploads/recipe/a.jpg", ContentFile(b"photo"))
+        second = self.storage.save("uploads/recipe/b.jpg", ContentFile(b"photo"))
+        other = self.storage.save("uploads/recipe/c.jpg", ContentFile(b"other"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.metrics import REGISTRY
+
+
+def can_read_metrics(request):
+    """Return True if the request comes from an allowed address or has the token"""
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS:
+        return True
+    scheme, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    return bool(
+        settings.METRICS_TOKEN
+        and scheme.lower() == "bearer"
+        and constant_time_compare(token, settings.METRICS_TOKEN)
+    )
+
+
+def metrics(request):
+    """Expose request metrics in the Prometheus text format"""
+    if not can_read_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type="text/plain; version=0.0.4")
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models import CharField
 
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        from recipe import signals  # noqa: F401
+        from recipe.search import TrigramWordSimilar
+
+        CharField.register_lookup(TrigramWordSimilar)
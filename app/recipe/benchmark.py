@@ -0,0 +1,561 @@
+import io
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe
+from recipe import fast, uploads
+from recipe.bulk import bulk_create_with_ids
+from recipe.serializers import IngredientSerializer, RecipeSerializer, TagSerializer
+from recipe.signals import objects_bulk_created
+from users.authentication import create_signed_token
+
+BENCHMARK_PASSWORD = "benchmark-password"
+
+# A single request issued by an endpoint for one iteration
+Call = namedtuple("Call", "method path data format client")
+Call.__new__.__defaults__ = (None, "json", None)
+
+Endpoint = namedtuple("Endpoint", "name prepare")
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def _host():
+    """Return a host name that passes ALLOWED_HOSTS validation"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def make_client(user=None, signed=False):
+    """Return an API client authenticated with a token of `user`"""
+    client = APIClient(HTTP_HOST=_host())
+    if user is not None:
+        if signed:
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {create_signed_token(user)}")
+        else:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def seed_dataset(users, recipes, tags, ingredients, rng):
+    """Create `users` users each owning the given number of objects
+
+    Every recipe gets up to three random tags and five random ingredients.
+    Returns the created users.
+    """
+    created_users = []
+    for index in range(users):
+        user = get_user_model().objects.create_user(
+            f"benchmark-{index}-{rng.getrandbits(32)}@example.com",
+            BENCHMARK_PASSWORD,
+            name=f"Benchmark user {index}",
+        )
+        created_users.append(user)
+
+        user_tags = bulk_create_with_ids(
+            Tag, [Tag(user=user, name=f"Tag {i}") for i in range(tags)]
+        )
+        user_ingredients = bulk_create_with_ids(
+            Ingredient,
+            [Ingredient(user=user, name=f"Ingredient {i}") for i in range(ingredients)],
+        )
+        user_recipes = bulk_create_with_ids(
+            Recipe,
+            [
+                Recipe(
+                    user=user,
+                    title=f"Recipe {i}",
+                    time_minutes=rng.randint(5, 180),
+                    price=f"{rng.uniform(1, 99):.2f}",
+                )
+                for i in range(recipes)
+            ],
+        )
+
+        recipe_tags, recipe_ingredients = [], []
+        for recipe in user_recipes:
+            for tag in rng.sample(user_tags, min(3, len(user_tags))):
+                recipe_tags.append(Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk))
+            for ingredient in rng.sample(user_ingredients, min(5, len(user_ingredients))):
+                recipe_ingredients.append(
+                    Recipe.ingredients.through(
+                        recipe_id=recipe.pk, ingredient_id=ingredient.pk
+                    )
+                )
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        Recipe.ingredients.through.objects.bulk_create(recipe_ingredients)
+
+        for model, objs in ((Tag, user_tags), (Ingredient, user_ingredients)):
+            objects_bulk_created.send(
+                sender=model, user_id=user.pk, pks=[obj.pk for obj in objs]
+            )
+        objects_bulk_created.send(
+            sender=Recipe, user_id=user.pk, pks=[recipe.pk for recipe in user_recipes]
+        )
+
+    return created_users
+
+
+def _image_file():
+    """Return a small in-memory JPEG upload"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, format="JPEG")
+    buffer.name = "benchmark.jpg"
+    buffer.seek(0)
+    return buffer
+
+
+def _throwaway_recipe(user):
+    """Create a recipe for endpoints that modify or delete one"""
+    return Recipe.objects.create(user=user, title="Throwaway", time_minutes=5, price="1.00")
+
+
+def build_endpoints(user, rng):
+    """Return every API endpoint of the users and recipe apps to benchmark"""
+    recipe_ids = list(
+        Recipe.objects.filter(user=user).order_by("id").values_list("id", flat=True)
+    )
+    tag_ids = list(Tag.objects.filter(user=user).values_list("id", flat=True))
+    ingredient_ids = list(Ingredient.objects.filter(user=user).values_list("id", flat=True))
+    recipe_list = reverse("recipe:recipe-list")
+
+    def recipe_detail(_):
+        return reverse("recipe:recipe-detail", args=[rng.choice(recipe_ids)])
+
+    def new_recipe(index):
+        return {
+            "title": f"Benchmark recipe {index}",
+            "time_minutes": 30,
+            "price": "9.99",
+            "tags": rng.sample(tag_ids, min(2, len(tag_ids))),
+            "ingredients": rng.sample(ingredient_ids, min(3, len(ingredient_ids))),
+        }
+
+    def logout(index):
+        throwaway = get_user_model().objects.create_user(
+            f"benchmark-logout-{index}-{rng.getrandbits(32)}@example.com",
+            BENCHMARK_PASSWORD,
+        )
+        return Call("post", reverse("users:logout"), client=make_client(throwaway))
+
+    def delete_recipe(_):
+        recipe = _throwaway_recipe(user)
+        return Call("delete", reverse("recipe:recipe-detail", args=[recipe.pk]))
+
+    def upload_image(_):
+        recipe = _throwaway_recipe(user)
+        return Call(
+            "post",
+            reverse("recipe:recipe-upload-image", args=[recipe.pk]),
+            {"image": _image_file()},
+            "multipart",
+        )
+
+    def finish_upload(_):
+        recipe = _throwaway_recipe(user)
+        content = _image_file().getvalue()
+        upload = uploads.start_upload(recipe, "benchmark.jpg", len(content))
+        uploads.write_chunk(upload, 0, len(content), io.BytesIO(content))
+        return Call(
+            "post", reverse("recipe:recipe-finish-upload", args=[recipe.pk, upload.pk])
+        )
+
+    def import_file(index):
+        content = "".join(
+            json.dumps(
+                {
+                    "title": f"Imported recipe {index}-{n}",
+                    "time_minutes": 20,
+                    "price": "4.50",
+                    "tags": [f"Tag {rng.randrange(50)}"],
+                    "ingredients": [f"Ingredient {rng.randrange(100)}"],
+                }
+            )
+            + "\n"
+            for n in range(100)
+        )
+        upload = io.BytesIO(content.encode())
+        upload.name = "recipes.ndjson"
+        return Call("post", reverse("recipe:recipe-import"), {"file": upload}, "multipart")
+
+    def sample_ids(ids, count):
+        return ",".join(str(pk) for pk in rng.sample(ids, min(count, len(ids))))
+
+    def credentials():
+        return {"email": user.email, "password": BENCHMARK_PASSWORD}
+
+    return [
+        Endpoint(
+            "users:create",
+            lambda i: Call(
+                "post",
+                reverse("users:create"),
+                {
+                    "email": f"benchmark-new-{i}-{rng.getrandbits(32)}@example.com",
+                    "password": BENCHMARK_PASSWORD,
+                    "name": "New user",
+                },
+                client=make_client(),
+            ),
+        ),
+        Endpoint(
+            "users:token",
+            lambda i: Call("post", reverse("users:token"), credentials(), client=make_client()),
+        ),
+        Endpoint(
+            "users:token (signed)",
+            lambda i: Call(
+                "post", f"{reverse('users:token')}?signed=1", credentials(), client=make_client()
+            ),
+        ),
+        Endpoint("users:me", lambda i: Call("get", reverse("users:me"))),
+        Endpoint(
+            "users:me (signed token)",
+            lambda i: Call("get", reverse("users:me"), client=make_client(user, signed=True)),
+        ),
+        Endpoint(
+            "users:me (update)",
+            lambda i: Call("patch", reverse("users:me"), {"name": f"Benchmark {i}"}),
+        ),
+        Endpoint("users:logout", logout),
+        Endpoint("recipe:tag-list", lambda i: Call("get", reverse("recipe:tag-list"))),
+        Endpoint(
+            "recipe:tag-list (assigned only)",
+            lambda i: Call("get", f"{reverse('recipe:tag-list')}?assigned_only=1"),
+        ),
+        Endpoint(
+            "recipe:tag-list (most used)",
+            lambda i: Call("get", f"{reverse('recipe:tag-list')}?ordering=most_used"),
+        ),
+        Endpoint(
+            "recipe:tag-create",
+            lambda i: Call("post", reverse("recipe:tag-list"), {"name": f"New tag {i}"}),
+        ),
+        Endpoint(
+            "recipe:tag-bulk-create",
+            lambda i: Call(
+                "post",
+                reverse("recipe:tag-bulk-create"),
+                [{"name": f"Bulk tag {i}-{n}"} for n in range(100)],
+            ),
+        ),
+        Endpoint(
+            "recipe:ingredient-list", lambda i: Call("get", reverse("recipe:ingredient-list"))
+        ),
+        Endpoint(
+            "recipe:ingredient-create",
+            lambda i: Call(
+                "post", reverse("recipe:ingredient-list"), {"name": f"New ingredient {i}"}
+            ),
+        ),
+        Endpoint(
+            "recipe:ingredient-bulk-create",
+            lambda i: Call(
+                "post",
+                reverse("recipe:ingredient-bulk-create"),
+                [{"name": f"Bulk ingredient {i}-{n}"} for n in range(100)],
+            ),
+        ),
+        Endpoint("recipe:recipe-list", lambda i: Call("get", recipe_list)),
+        Endpoint(
+            "recipe:recipe-list (unpaginated)",
+            lambda i: Call("get", f"{recipe_list}?paginate=0"),
+        ),
+        Endpoint(
+            "recipe:recipe-list (fields)",
+            lambda i: Call("get", f"{recipe_list}?fields=id,title"),
+        ),
+        Endpoint(
+            "recipe:recipe-list (expand)",
+            lambda i: Call("get", f"{recipe_list}?expand=tags,ingredients"),
+        ),
+        Endpoint(
+            "recipe:recipe-list (filtered)",
+            lambda i: Call("get", f"{recipe_list}?tags={sample_ids(tag_ids, 2)}"),
+        ),
+        Endpoint(
+            "recipe:recipe-list (match all)",
+            lambda i: Call("get", f"{recipe_list}?tags={sample_ids(tag_ids, 2)}&match=all"),
+        ),
+        Endpoint(
+            "recipe:recipe-list (search)",
+            lambda i: Call("get", f"{recipe_list}?search=Recipe+{rng.randrange(100)}"),
+        ),
+        Endpoint("recipe:recipe-detail", lambda i: Call("get", recipe_detail(i))),
+        Endpoint(
+            "recipe:recipe-pantry",
+            lambda i: Call(
+                "get",
+                f"{reverse('recipe:recipe-pantry')}?ingredients={sample_ids(ingredient_ids, 25)}"
+                "&max_missing=2",
+            ),
+        ),
+        Endpoint("recipe:recipe-stats", lambda i: Call("get", reverse("recipe:recipe-stats"))),
+        Endpoint(
+            "recipe:recipe-similar",
+            lambda i: Call(
+                "get", reverse("recipe:recipe-similar", args=[rng.choice(recipe_ids)])
+            ),
+        ),
+        Endpoint(
+            "recipe:recipe-export",
+            lambda i: Call("get", reverse("recipe:recipe-export")),
+        ),
+        Endpoint(
+            "recipe:recipe-export (csv)",
+            lambda i: Call("get", f"{reverse('recipe:recipe-export')}?file_format=csv"),
+        ),
+        Endpoint(
+            "recipe:recipe-create",
+            lambda i: Call("post", recipe_list, new_recipe(i)),
+        ),
+        Endpoint(
+            "recipe:recipe-bulk-create",
+            lambda i: Call(
+                "post",
+                reverse("recipe:recipe-bulk-create"),
+                [new_recipe(f"{i}-{n}") for n in range(100)],
+            ),
+        ),
+        Endpoint(
+            "recipe:recipe-update",
+            lambda i: Call("put", recipe_detail(i), new_recipe(i)),
+        ),
+        Endpoint(
+            "recipe:recipe-partial-update",
+            lambda i: Call("patch", recipe_detail(i), {"title": f"Patched {i}"}),
+        ),
+        Endpoint("recipe:recipe-import", import_file),
+        Endpoint("recipe:recipe-delete", delete_recipe),
+        Endpoint("recipe:recipe-upload-image", upload_image),
+        Endpoint("recipe:recipe-finish-upload", finish_upload),
+    ]
+
+
+def _issue(call, default_client):
+    """Send a prepared call and return the response"""
+    client = call.client or default_client
+    method = getattr(client, call.method)
+    if call.data is None:
+        response = method(call.path)
+    else:
+        response = method(call.path, call.data, format=call.format)
+    if response.streaming:
+        # Streamed bodies are only generated while they are consumed
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def run_endpoint(endpoint, default_client, iterations, warmup):
+    """Time an endpoint and return its latency, throughput, query and memory stats"""
+    for index in range(warmup):
+        _issue(endpoint.prepare(f"warmup-{index}"), default_client)
+
+    latencies, queries, statuses = [], [], Counter()
+    for index in range(iterations):
+        call = endpoint.prepare(index)
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = _issue(call, default_client)
+            latencies.append(time.perf_counter() - start)
+        queries.append(len(context))
+        statuses[response.status_code] += 1
+
+    call = endpoint.prepare("traced")
+    tracemalloc.start()
+    try:
+        _issue(call, default_client)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "latency_ms": {
+            "mean": statistics.mean(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+        "throughput_rps": iterations / total if total else None,
+        "queries": {
+            "median": statistics.median(queries),
+            "max": max(queries),
+        },
+        "peak_memory_kb": peak_memory / 1024,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_benchmark(
+    users=2,
+    recipes=200,
+    tags=20,
+    ingredients=50,
+    iterations=50,
+    warmup=5,
+    seed=0,
+    only=None,
+    keep=False,
+    label="",
+):
+    """Seed a dataset, drive every endpoint in-process and return the report
+
+    Everything runs in a transaction that is rolled back unless `keep` is set.
+    Work the endpoints defer with transaction.on_commit, like generating
+    image variants in the worker pool, is then dropped with it: the timings
+    cover the requests alone, not that background work. `only` restricts the
+    run to endpoints whose name contains that string.
+    """
+    rng = random.Random(seed)
+    report = {
+        "meta": {
+            "label": label,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "database": connection.vendor,
+            "dataset": {
+                "users": users,
+                "recipes": recipes,
+                "tags": tags,
+                "ingredients": ingredients,
+                "seed": seed,
+            },
+            "iterations": iterations,
+            "warmup": warmup,
+        },
+        "endpoints": {},
+    }
+
+    with transaction.atomic():
+        seeded_users = seed_dataset(users, recipes, tags, ingredients, rng)
+        user = seeded_users[0]
+        default_client = make_client(user)
+
+        for endpoint in build_endpoints(user, rng):
+            if only and only not in endpoint.name:
+                continue
+            report["endpoints"][endpoint.name] = run_endpoint(
+                endpoint, default_client, iterations, warmup
+            )
+
+        if not keep:
+            for recipe in Recipe.objects.filter(user=user).exclude(image=""):
+                recipe.image.delete(save=False)
+            transaction.set_rollback(True)
+
+    return report
+
+
+def _serializer_cases(user):
+    """Yield (name, DRF render, fast render) for each list the fast path serves"""
+    for name, params in (("recipes", {}), ("recipes_expanded", {"expand": "tags,ingredients"})):
+        request = Request(APIRequestFactory().get("/", params))
+        fields, nested = RecipeSerializer.requested_fields(request)
+        queryset = Recipe.objects.filter(user=user).order_by("-id")
+        prefetches = [
+            Prefetch(relation, queryset=model.objects.order_by("id"))
+            for relation, model in (("tags", Tag), ("ingredients", Ingredient))
+        ]
+
+        def drf(queryset=queryset, prefetches=prefetches, request=request):
+            recipes = queryset.prefetch_related(*prefetches, "image_variants")
+            return RecipeSerializer(recipes, many=True, context={"request": request}).data
+
+        def rows(queryset=queryset, request=request):
+            serializer = fast.RecipeRowSerializer(request)
+            return serializer.render(serializer.values(queryset))
+
+        yield name, drf, rows
+
+    for name, model, serializer_class in (
+        ("tags", Tag, TagSerializer),
+        ("ingredients", Ingredient, IngredientSerializer),
+    ):
+        queryset = model.objects.filter(user=user).order_by("name", "id")
+
+        def drf(queryset=queryset, serializer_class=serializer_class):
+            return serializer_class(queryset, many=True).data
+
+        def rows(queryset=queryset, serializer_class=serializer_class):
+            serializer = fast.AttrRowSerializer(serializer_class)
+            return serializer.render(serializer.values(queryset))
+
+        yield name, drf, rows
+
+
+def run_serializer_benchmark(recipes=200, tags=20, ingredients=50, iterations=20, seed=0):
+    """Compare the per-row cost of the DRF serializers and the fast path
+
+    Both render every list of a seeded user, including the queries. The
+    seeded data is rolled back afterwards.
+    """
+    report = {}
+    with transaction.atomic():
+        user = seed_dataset(1, recipes, tags, ingredients, random.Random(seed))[0]
+        for name, *renderers in _serializer_cases(user):
+            timings = []
+            for render in renderers:
+                count = len(render())
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    render()
+                elapsed = time.perf_counter() - started
+                timings.append(elapsed / iterations / max(count, 1) * 1e6)
+            report[name] = {
+                "rows": count,
+                "drf_us_per_row": round(timings[0], 2),
+                "fast_us_per_row": round(timings[1], 2),
+                "speedup": round(timings[0] / timings[1], 2) if timings[1] else None,
+            }
+        transaction.set_rollback(True)
+    return report
+
+
+def format_report(report):
+    """Render a report as a plain text table"""
+    header = f"{'endpoint':<36}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    header += f"{'req/s':>9}{'queries':>9}{'peak KB':>10}"
+    lines = [header, "-" * len(header)]
+    for name, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        lines.append(
+            f"{name:<36}{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+            f"{stats['throughput_rps'] or 0:>9.1f}{stats['queries']['median']:>9}"
+            f"{stats['peak_memory_kb']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def write_report(report, stream):
+    """Write a report as JSON so runs can be diffed across commits"""
+    json.dump(report, stream, indent=2, sort_keys=True)
+    stream.write("\n")
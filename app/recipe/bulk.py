@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.db import connections, router, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import ListField, IntegerField
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.serializers import RecipeSerializer
+from recipe.signals import objects_bulk_created
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """Validate one item of a bulk recipe payload without per-id lookups
+
+    Ownership of the referenced tags and ingredients is checked for the whole
+    batch at once in `create_recipes`.
+    """
+
+    ingredients = ListField(child=IntegerField(), required=False, default=list)
+    tags = ListField(child=IntegerField(), required=False, default=list)
+
+
+def bulk_create_with_ids(model, objs):
+    """Insert `objs` in bulk and make sure every object gets its primary key"""
+    db = router.db_for_write(model)
+    connection = connections[db]
+
+    if not objs:
+        return objs
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.using(db).bulk_create(objs)
+
+    with transaction.atomic(using=db):
+        if connection.vendor == "sqlite":
+            # SQLite holds the write lock until commit, so the newest rows in
+            # the table are the ones that were just inserted.
+            model.objects.using(db).bulk_create(objs)
+            pks = model.objects.using(db).order_by("-pk").values_list("pk", flat=True)
+            for obj, pk in zip(objs, list(pks[: len(objs)])[::-1]):
+                obj.pk = pk
+        else:
+            fields = [f for f in model._meta.concrete_fields if not f.primary_key]
+            for obj in objs:
+                obj.pk = model._base_manager._insert(
+                    [obj], fields=fields, return_id=True, using=db
+                )
+    return objs
+
+
+def _validate_items(serializer_class, items):
+    """Validate each item and return (validated data, errors) by index"""
+    if not isinstance(items, list):
+        raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+    if len(items) > settings.BULK_CREATE_MAX_ITEMS:
+        raise ValidationError(
+            {
+                "non_field_errors": [
+                    f"Ensure this list has at most {settings.BULK_CREATE_MAX_ITEMS} items."
+                ]
+            }
+        )
+
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            errors[index] = serializer.errors
+    return valid, errors
+
+
+def _results(count, created, errors):
+    """Return per-item results in the order the items were submitted"""
+    results = []
+    for index in range(count):
+        if index in created:
+            results.append({"status": status.HTTP_201_CREATED, "data": created[index]})
+        else:
+            results.append(
+                {"status": status.HTTP_400_BAD_REQUEST, "errors": errors[index]}
+            )
+    return results
+
+
+def create_attrs(serializer_class, user, items):
+    """Validate and insert many tags or ingredients for the user"""
+    model = serializer_class.Meta.model
+    valid, errors = _validate_items(serializer_class, items)
+
+    objs = [model(user=user, **data) for data in valid.values()]
+    bulk_create_with_ids(model, objs)
+    objects_bulk_created.send(sender=model, user_id=user.pk, pks=[obj.pk for obj in objs])
+
+    created = {
+        index: serializer_class(obj).data for index, obj in zip(valid.keys(), objs)
+    }
+    return _results(len(items), created, errors)
+
+
+def _check_owned(model, user, valid, field, errors):
+    """Move items referencing objects the user doesn't own into `errors`"""
+    requested = {pk for data in valid.values() for pk in data[field]}
+    owned = set(
+        model.objects.filter(user=user, pk__in=requested).values_list("pk", flat=True)
+    )
+    for index, data in list(valid.items()):
+        missing = sorted(set(data[field]) - owned)
+        if missing:
+            errors[index] = {
+                field: [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]
+            }
+            del valid[index]
+
+
+def create_recipes(user, items):
+    """Validate and insert many recipes and their tags and ingredients"""
+    valid, errors = _validate_items(RecipeBulkSerializer, items)
+    _check_owned(Tag, user, valid, "tags", errors)
+    _check_owned(Ingredient, user, valid, "ingredients", errors)
+
+    with transaction.atomic():
+        recipes = [
+            Recipe(
+                user=user,
+                **{
+                    key: value
+                    for key, value in data.items()
+                    if key not in ("tags", "ingredients")
+                },
+            )
+            for data in valid.values()
+        ]
+        bulk_create_with_ids(Recipe, recipes)
+
+        recipe_tags, recipe_ingredients = [], []
+        for recipe, data in zip(recipes, valid.values()):
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=pk)
+                for pk in dict.fromkeys(data["tags"])
+            )
+            recipe_ingredients.extend(
+                Recipe.ingredients.through(recipe_id=recipe.pk, ingredient_id=pk)
+                for pk in dict.fromkeys(data["ingredients"])
+            )
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        Recipe.ingredients.through.objects.bulk_create(recipe_ingredients)
+        objects_bulk_created.send(
+            sender=Recipe, user_id=user.pk, pks=[recipe.pk for recipe in recipes]
+        )
+
+    saved = Recipe.objects.filter(pk__in=[recipe.pk for recipe in recipes])
+    saved = saved.prefetch_related("tags", "ingredients", "image_variants").in_bulk()
+    created = {
+        index: RecipeSerializer(saved[recipe.pk]).data
+        for index, recipe in zip(valid.keys(), recipes)
+    }
+    return _results(len(items), created, errors)
+
+
+def bulk_response(results):
+    """Return 201 if every item was created, 400 if none was, else 207
+
+    An empty batch has nothing to fail and gets a 201 with no results.
+    """
+    created = sum(result["status"] == status.HTTP_201_CREATED for result in results)
+    if created == len(results):
+        response_status = status.HTTP_201_CREATED
+    elif created == 0:
+        response_status = status.HTTP_400_BAD_REQUEST
+    else:
+        response_status = status.HTTP_207_MULTI_STATUS
+    return Response({"results": results}, status=response_status)
@@ -0,0 +1,48 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipe.conditional import get_user_data_marker
+
+
+def cache_user_response(view_method):
+    """Cache the serialized data of a per-user view method
+
+    Entries are keyed on the user's data version, so any write to their
+    recipes, tags or ingredients (including creates, deletes and recipe
+    changes that affect `assigned_only`) makes every older entry unreachable.
+    Those are then evicted by the cache's LRU policy. The key also covers the
+    model, the negotiated format and the full query string.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, modified_at = get_user_data_marker(request)
+        query = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+        key = ":".join(
+            (
+                "recipe-response",
+                self.queryset.model._meta.label_lower,
+                str(request.user.pk),
+                str(version),
+                str(modified_at.timestamp() if modified_at else 0),
+                request.accepted_renderer.format,
+                query,
+            )
+        )
+        cache = caches[settings.RECIPE_RESPONSE_CACHE]
+
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
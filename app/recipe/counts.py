@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import Tag, Ingredient, Recipe
+
+# model -> (through table, column of the model in it)
+COUNTED = {
+    Tag: (Recipe.tags.through, "tag_id"),
+    Ingredient: (Recipe.ingredients.through, "ingredient_id"),
+}
+
+
+def adjust_recipe_counts(model, deltas):
+    """Apply {pk: delta} to recipe_count with one UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        model.objects.filter(pk__in=pks).update(recipe_count=F("recipe_count") + delta)
+
+
+def linked_ids(model, recipe_ids):
+    """Return {related pk: number of the given recipes using it}"""
+    through, column = COUNTED[model]
+    rows = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .values_list(column)
+        .annotate(count=Count("recipe_id"))
+        .order_by()
+    )
+    return dict(rows)
+
+
+def actual_recipe_count(model):
+    """Expression counting the through rows of the outer tag or ingredient"""
+    through, column = COUNTED[model]
+    rows = (
+        through.objects.filter(**{column: OuterRef("pk")})
+        .order_by()
+        .values(column)
+        .annotate(count=Count("recipe_id"))
+        .values("count")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def repair_recipe_counts(model, queryset=None):
+    """Recompute recipe_count in bulk and return how many rows were wrong"""
+    queryset = model.objects.all() if queryset is None else queryset
+    actual = actual_recipe_count(model)
+    return queryset.exclude(recipe_count=actual).update(recipe_count=actual)
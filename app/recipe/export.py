@@ -0,0 +1,102 @@
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from core.models import Recipe
+
+COLUMNS = ("id", "title", "time_minutes", "price", "link")
+
+# Tag and ingredient names are joined with this in a single CSV cell
+CSV_LIST_SEPARATOR = "|"
+
+
+def _names(through, field, recipe_ids):
+    """Return {recipe id: [related names]} for a chunk of recipes"""
+    names = {}
+    rows = (
+        through.objects.filter(recipe_id__in=recipe_ids)
+        .order_by(f"{field}__name")
+        .values_list("recipe_id", f"{field}__name")
+    )
+    for recipe_id, name in rows:
+        names.setdefault(recipe_id, []).append(name)
+    return names
+
+
+def iter_recipes(user, chunk_size=None):
+    """Yield every recipe of the user as a plain dict, ordered by id
+
+    Recipes are read in keyset-paginated chunks of `chunk_size` rows and the
+    tags and ingredients of each chunk are fetched in one query each, so
+    memory use doesn't grow with the size of the collection.
+    """
+    chunk_size = chunk_size or settings.RECIPE_EXPORT_CHUNK_SIZE
+    last_id = 0
+    while True:
+        chunk = list(
+            Recipe.objects.filter(user=user, id__gt=last_id)
+            .order_by("id")
+            .values_list(*COLUMNS)[:chunk_size]
+        )
+        if not chunk:
+            return
+
+        recipe_ids = [row[0] for row in chunk]
+        tags = _names(Recipe.tags.through, "tag", recipe_ids)
+        ingredients = _names(Recipe.ingredients.through, "ingredient", recipe_ids)
+        for row in chunk:
+            record = dict(zip(COLUMNS, row))
+            record["price"] = str(record["price"])
+            record["tags"] = tags.get(record["id"], [])
+            record["ingredients"] = ingredients.get(record["id"], [])
+            yield record
+
+        if len(chunk) < chunk_size:
+            return
+        last_id = recipe_ids[-1]
+
+
+def render_ndjson(records):
+    """Yield one JSON document per line"""
+    for record in records:
+        yield json.dumps(record) + "\n"
+
+
+class _Echo:
+    """File-like object handing back whatever is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(records):
+    """Yield a header line followed by one CSV line per record"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS + ("tags", "ingredients"))
+    for record in records:
+        yield writer.writerow(
+            [record[column] for column in COLUMNS]
+            + [
+                CSV_LIST_SEPARATOR.join(record["tags"]),
+                CSV_LIST_SEPARATOR.join(record["ingredients"]),
+            ]
+        )
+
+
+# format -> (content type, renderer)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", render_ndjson),
+    "csv": ("text/csv", render_csv),
+}
+
+
+def streaming_response(user, file_format):
+    """Return a response streaming the user's recipes as an attachment"""
+    content_type, render = EXPORT_FORMATS[file_format]
+    response = StreamingHttpResponse(
+        render(iter_recipes(user)), content_type=f"{content_type}; charset=utf-8"
+    )
+    response["Content-Disposition"] = f'attachment; filename="recipes.{file_format}"'
+    return response
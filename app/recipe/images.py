@@ -0,0 +1,251 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image
+
+from core.models import Recipe, RecipeImageVariant, RecipeSnapshot
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class InlineExecutor:
+    """Executor that runs each task straight away in the calling thread"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+def get_executor():
+    """Return the worker pool generating image variants
+
+    RECIPE_IMAGE_WORKERS = 0 processes variants in-process, which is what
+    tests use.
+    """
+    global _executor
+
+    if not settings.RECIPE_IMAGE_WORKERS:
+        return InlineExecutor()
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix="recipe-image",
+            )
+    return _executor
+
+
+def inspect_image(file):
+    """Return (format, width, height) of an image, reading its header only
+
+    Raises ValueError for files that aren't images in one of
+    RECIPE_IMAGE_FORMATS or have more than RECIPE_IMAGE_MAX_PIXELS pixels,
+    before anything gets decoded.
+    """
+    file.seek(0)
+    try:
+        # Lazy, only the header is parsed until the pixels are accessed
+        img = Image.open(file)
+        image_format, (width, height) = img.format, img.size
+    except (OSError, ValueError, Image.DecompressionBombError):
+        raise ValueError("Upload a valid image.")
+    finally:
+        file.seek(0)
+    if image_format not in settings.RECIPE_IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format {image_format}.")
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ValueError(
+            f"Image has {width * height} pixels, at most "
+            f"{settings.RECIPE_IMAGE_MAX_PIXELS} are allowed."
+        )
+    return image_format, width, height
+
+
+def schedule_variants(recipe: Recipe):
+    """Replace the recipe's variants with pending ones and queue their generation
+
+    Generation starts once the current transaction commits so the worker sees
+    the new image.
+    """
+    # Their files may be shared, post_delete releases them once unreferenced
+    recipe.image_variants.all().delete()
+
+    RecipeImageVariant.objects.bulk_create(
+        RecipeImageVariant(recipe=recipe, name=name)
+        for name in settings.RECIPE_IMAGE_VARIANTS
+    )
+    # bulk_create sends no post_save to drop the recipe's snapshot
+    RecipeSnapshot.objects.invalidate([recipe.pk])
+    # The viewset prefetches variants, drop the stale ones from the cache
+    getattr(recipe, "_prefetched_objects_cache", {}).pop("image_variants", None)
+
+    image_name = recipe.image.name
+    transaction.on_commit(
+        lambda: get_executor().submit(generate_variants, recipe.pk, image_name)
+    )
+
+
+def generate_variants(recipe_id, image_name):
+    """Generate every pending variant of a recipe image"""
+    try:
+        variants = RecipeImageVariant.objects.filter(
+            recipe_id=recipe_id, recipe__image=image_name, status=RecipeImageVariant.PENDING
+        ).select_related("recipe")
+        for variant in variants:
+            _generate_variant(variant)
+    finally:
+        if threading.current_thread().name.startswith("recipe-image"):
+            connections.close_all()
+
+
+def _generate_variant(variant: RecipeImageVariant):
+    """Resize the original image into a single variant and store it
+
+    The file is keyed by the digest of the original and the variant name, an
+    image shared by several recipes is only resized once.
+    """
+    width, height = settings.RECIPE_IMAGE_VARIANTS[variant.name]
+    stem = os.path.splitext(os.path.basename(variant.recipe.image.name))[0]
+    filename = f"{stem}-{variant.name}.jpg"
+
+    name = variant.image.field.generate_filename(variant, filename)
+    if variant.image.storage.touch(name):
+        try:
+            with variant.image.storage.open(name) as existing, Image.open(existing) as img:
+                variant.width, variant.height = img.size
+        except (OSError, ValueError):
+            logger.exception("Failed to reuse %s, generating it again", name)
+            variant.image.storage.delete(name)
+        else:
+            variant.image.name = name
+            variant.status = RecipeImageVariant.READY
+            variant.save(update_fields=["image", "width", "height", "status"])
+            return
+
+    try:
+        with variant.recipe.image.open("rb") as original, Image.open(original) as img:
+            img.thumbnail((width, height))
+            buffer = BytesIO()
+            img.convert("RGB").save(buffer, format="JPEG", quality=85, optimize=True)
+            variant.width, variant.height = img.size
+    except (OSError, ValueError):
+        logger.exception("Failed to generate %s variant of %s", variant.name, stem)
+        variant.status = RecipeImageVariant.FAILED
+        variant.save(update_fields=["status"])
+        return
+
+    variant.image.save(filename, ContentFile(buffer.getvalue()), save=False)
+    variant.status = RecipeImageVariant.READY
+    variant.save(update_fields=["image", "width", "height", "status"])
+
+
+# Upload directory -> model whose `image` column references the files in it
+IMAGE_REFERENCES = {
+    "uploads/recipe/": Recipe,
+    "uploads/variants/": RecipeImageVariant,
+}
+
+
+def delete_unless_recent(name, cutoff):
+    """Delete an upload file unless it was modified after `cutoff`
+
+    The file is moved aside first. A save reusing it meanwhile has either
+    touched it already, and it is put back, or finds it gone and writes it
+    again. Returns True if the file was deleted.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    released = f"{path}.released"
+    try:
+        os.rename(path, released)
+    except FileNotFoundError:
+        return False
+    if os.stat(released).st_mtime >= cutoff:
+        os.replace(released, path)
+        return False
+    os.remove(released)
+    return True
+
+
+def release_image(name):
+    """Delete a recipe image or variant once no row references it any more
+
+    Images modified in the last RECIPE_IMAGE_RELEASE_GRACE seconds are kept,
+    a row not committed yet may be reusing them, orphaned_images finds them
+    later.
+    """
+    if not name:
+        return
+    model = next(
+        model for directory, model in IMAGE_REFERENCES.items() if name.startswith(directory)
+    )
+    if not model.objects.filter(image=name).exists():
+        delete_unless_recent(name, time.time() - settings.RECIPE_IMAGE_RELEASE_GRACE)
+
+
+def _walk(root, directory):
+    """Yield (name relative to root, DirEntry) of every file under directory"""
+    pending = [directory]
+    while pending:
+        try:
+            entries = os.scandir(os.path.join(root, pending.pop()))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    yield name, entry
+
+
+def orphaned_images(min_age, batch_size=500):
+    """Yield (name, size) of upload files no row references
+
+    Files modified less than `min_age` seconds ago are skipped, their row may
+    not be committed yet. Each directory is a single pass over the file
+    system, the old enough files being looked up in the referencing column
+    `batch_size` names at a time.
+    """
+    root = settings.MEDIA_ROOT
+    cutoff = time.time() - min_age
+    for directory, model in IMAGE_REFERENCES.items():
+        batch = []
+        for name, entry in _walk(root, directory):
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff:
+                batch.append((name, stat.st_size))
+            if len(batch) >= batch_size:
+                yield from _unreferenced(model, batch)
+                batch = []
+        yield from _unreferenced(model, batch)
+
+
+def _unreferenced(model, files):
+    """Return the (name, size) pairs whose name no row of `model` references"""
+    if not files:
+        return []
+    referenced = set(
+        model.objects.filter(image__in=[name for name, _ in files]).values_list(
+            "image", flat=True
+        )
+    )
+    return [(name, size) for name, size in files if name not in referenced]
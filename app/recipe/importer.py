@@ -0,0 +1,264 @@
+import codecs
+import csv
+import io
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from rest_framework import serializers
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.bulk import bulk_create_with_ids
+from recipe.export import CSV_LIST_SEPARATOR
+from recipe.signals import objects_bulk_created
+
+# Errors beyond this many are counted but not reported individually
+MAX_REPORTED_ERRORS = 100
+
+# Every NOT NULL column of Recipe: COPY skips the model's Python defaults
+RECIPE_COPY_COLUMNS = (
+    "id",
+    "user_id",
+    "title",
+    "time_minutes",
+    "price",
+    "link",
+    "snapshot_token",
+)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Validate one imported recipe, tags and ingredients given by name"""
+
+    tags = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False, default=list
+    )
+    ingredients = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False, default=list
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ("title", "time_minutes", "price", "link", "tags", "ingredients")
+
+
+def parse_ndjson(lines):
+    """Yield one record per non-blank line of JSON"""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield {"non_field_errors": [f"Invalid JSON: {exc}"]}, None
+            continue
+        if not isinstance(record, dict):
+            yield {"non_field_errors": ["Expected a JSON object."]}, None
+            continue
+        yield None, record
+
+
+def parse_csv(lines):
+    """Yield one record per CSV row, splitting the tag and ingredient cells"""
+    for row in csv.DictReader(lines):
+        for field in ("tags", "ingredients"):
+            cell = row.get(field) or ""
+            row[field] = [name for name in cell.split(CSV_LIST_SEPARATOR) if name]
+        yield None, row
+
+
+IMPORT_FORMATS = {"ndjson": parse_ndjson, "csv": parse_csv}
+
+
+def decode_lines(stream, encoding="utf-8-sig"):
+    """Decode an iterable of byte lines, such as an uploaded file"""
+    return codecs.iterdecode(stream, encoding)
+
+
+def guess_format(filename):
+    """Return the import format matching a file extension, if any"""
+    extension = filename.rsplit(".", 1)[-1].lower()
+    return extension if extension in IMPORT_FORMATS else None
+
+
+class ImportResult:
+    """Running totals of an import"""
+
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, record, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"record": record, "errors": errors})
+
+    def as_dict(self):
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
+
+
+def _resolve(model, user, names):
+    """Return {name: pk} for `names`, creating the objects the user lacks"""
+    if not names:
+        return {}
+    existing = (
+        model.objects.filter(user=user, name__in=names)
+        .order_by("-pk")
+        .values_list("name", "pk")
+    )
+    # Ordered by descending pk, so the oldest object wins on duplicate names
+    resolved = dict(existing)
+
+    missing = [model(user=user, name=name) for name in names if name not in resolved]
+    bulk_create_with_ids(model, missing)
+    if missing:
+        objects_bulk_created.send(
+            sender=model, user_id=user.pk, pks=[obj.pk for obj in missing]
+        )
+    resolved.update((obj.name, obj.pk) for obj in missing)
+    return resolved
+
+
+def _copy(connection, table, columns, rows, not_null=()):
+    """Load rows into a table with COPY ... FROM STDIN
+
+    COPY reads an unquoted empty CSV field as NULL, the `not_null` columns
+    read it as an empty string instead.
+    """
+    quote_name = connection.ops.quote_name
+    options = "FORMAT csv"
+    if not_null:
+        options += f", FORCE_NOT_NULL ({', '.join(quote_name(c) for c in not_null)})"
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote_name(table)} ({', '.join(quote_name(c) for c in columns)}) "
+            f"FROM STDIN WITH ({options})",
+            buffer,
+        )
+
+
+def _copy_recipes(connection, user, batch):
+    """COPY a batch of recipes with ids reserved from the table's sequence"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+            [Recipe._meta.db_table, len(batch)],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    recipes = []
+    for pk, data in zip(ids, batch):
+        recipes.append(
+            Recipe(
+                pk=pk,
+                user=user,
+                title=data["title"],
+                time_minutes=data["time_minutes"],
+                price=data["price"],
+                link=data.get("link", ""),
+            )
+        )
+    _copy(
+        connection,
+        Recipe._meta.db_table,
+        RECIPE_COPY_COLUMNS,
+        (
+            (r.pk, user.pk, r.title, r.time_minutes, r.price, r.link, r.snapshot_token)
+            for r in recipes
+        ),
+        not_null=("title", "link"),
+    )
+    return recipes
+
+
+def _insert_through(connection, through, column, rows):
+    """Insert (recipe id, related id) rows into an M2M through table"""
+    if not rows:
+        return
+    if connection.vendor == "postgresql":
+        _copy(connection, through._meta.db_table, ("recipe_id", column), rows)
+    else:
+        through.objects.bulk_create(
+            through(**{"recipe_id": recipe_id, column: pk}) for recipe_id, pk in rows
+        )
+
+
+def _load_batch(user, batch):
+    """Insert one batch of validated records and return the created recipes"""
+    db = router.db_for_write(Recipe)
+    connection = connections[db]
+
+    tag_ids = _resolve(Tag, user, list(dict.fromkeys(n for d in batch for n in d["tags"])))
+    ingredient_ids = _resolve(
+        Ingredient, user, list(dict.fromkeys(n for d in batch for n in d["ingredients"]))
+    )
+
+    if connection.vendor == "postgresql":
+        recipes = _copy_recipes(connection, user, batch)
+    else:
+        recipes = bulk_create_with_ids(
+            Recipe,
+            [
+                Recipe(
+                    user=user,
+                    **{k: v for k, v in data.items() if k not in ("tags", "ingredients")},
+                )
+                for data in batch
+            ],
+        )
+
+    recipe_tags, recipe_ingredients = [], []
+    for recipe, data in zip(recipes, batch):
+        recipe_tags.extend(
+            (recipe.pk, tag_ids[name]) for name in dict.fromkeys(data["tags"])
+        )
+        recipe_ingredients.extend(
+            (recipe.pk, ingredient_ids[name]) for name in dict.fromkeys(data["ingredients"])
+        )
+    _insert_through(connection, Recipe.tags.through, "tag_id", recipe_tags)
+    _insert_through(connection, Recipe.ingredients.through, "ingredient_id", recipe_ingredients)
+
+    objects_bulk_created.send(
+        sender=Recipe, user_id=user.pk, pks=[recipe.pk for recipe in recipes]
+    )
+    return recipes
+
+
+def import_recipes(user, records, batch_size=None, progress=None):
+    """Validate and load parsed records for the user in batches
+
+    Each batch is committed in its own transaction, so a failure only loses
+    the batch being loaded. Invalid records are skipped and reported by their position.
+    `progress` is called with the running ImportResult after every batch.
+    """
+    batch_size = batch_size or settings.RECIPE_IMPORT_BATCH_SIZE
+    result = ImportResult()
+    numbered = enumerate(records, start=1)
+
+    while True:
+        chunk = list(islice(numbered, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        for index, (errors, record) in chunk:
+            if errors is None:
+                serializer = RecipeImportSerializer(data=record)
+                if serializer.is_valid():
+                    batch.append(serializer.validated_data)
+                    continue
+                errors = serializer.errors
+            result.add_error(index, errors)
+
+        if batch:
+            with transaction.atomic(using=router.db_for_write(Recipe)):
+                result.created += len(_load_batch(user, batch))
+        if progress is not None:
+            progress(result)
+
+    return result
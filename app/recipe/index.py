@@ -0,0 +1,206 @@
+import threading
+from array import array
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from core.models import Recipe
+from recipe.conditional import get_user_index_token
+
+# user id -> (index token, RecipeIndex) of the indexes recently used by this process
+_local_indexes = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _postings(through, field, user_id):
+    """Map each related id to the sorted array of the user's recipe ids using it"""
+    postings = defaultdict(lambda: array("q"))
+    rows = (
+        through.objects.filter(recipe__user_id=user_id)
+        .order_by(field, "recipe_id")
+        .values_list(field, "recipe_id")
+    )
+    for related_id, recipe_id in rows.iterator():
+        postings[related_id].append(recipe_id)
+    return dict(postings)
+
+
+def _intersect(postings):
+    """Return the recipe ids present in every posting array"""
+    postings = sorted(postings, key=len)
+    result = set(postings[0]) if postings else set()
+    for posting in postings[1:]:
+        if not result:
+            break
+        result.intersection_update(posting)
+    return result
+
+
+def _union(postings):
+    """Return the recipe ids present in any posting array"""
+    result = set()
+    for posting in postings:
+        result.update(posting)
+    return result
+
+
+def _bitsets(postings, positions):
+    """Turn posting arrays into integer bitsets over recipe positions"""
+    size = (len(positions) + 7) // 8
+    bitsets = {}
+    for related_id, recipe_ids in postings.items():
+        bitmap = bytearray(size)
+        for recipe_id in recipe_ids:
+            position = positions[recipe_id]
+            bitmap[position >> 3] |= 1 << (position & 7)
+        bitsets[related_id] = int.from_bytes(bitmap, "little")
+    return bitsets
+
+
+def _bit_positions(bits):
+    """Yield the positions of the set bits of an integer"""
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+class RecipeIndex:
+    """Per-user inverted index from tag and ingredient ids to recipe ids
+
+    Besides the posting arrays, every ingredient gets a bitset with one bit
+    per recipe using any ingredient, so pantry queries run as big integer
+    operations across all of the user's recipes at once.
+    """
+
+    def __init__(self, tags, ingredients):
+        self.tags = tags
+        self.ingredients = ingredients
+        # Recipes having at least one ingredient, bit i of a bitset is recipe_ids[i]
+        self.recipe_ids = array("q", sorted(_union(ingredients.values())))
+        positions = {recipe_id: i for i, recipe_id in enumerate(self.recipe_ids)}
+        self.ingredient_bits = _bitsets(ingredients, positions)
+
+    @classmethod
+    def build(cls, user_id):
+        """Build the index of a user from the recipe M2M tables"""
+        return cls(
+            tags=_postings(Recipe.tags.through, "tag_id", user_id),
+            ingredients=_postings(Recipe.ingredients.through, "ingredient_id", user_id),
+        )
+
+    def lookup(self, tag_ids=None, ingredient_ids=None, match_all=False):
+        """Return the sorted ids of recipes matching the requested tags and ingredients
+
+        With `match_all` a recipe must have every requested tag and ingredient,
+        otherwise it needs at least one of the tags and one of the ingredients.
+        """
+        combine = _intersect if match_all else _union
+        groups = []
+        if tag_ids:
+            groups.append(combine(self.tags.get(pk, ()) for pk in set(tag_ids)))
+        if ingredient_ids:
+            groups.append(
+                combine(self.ingredients.get(pk, ()) for pk in set(ingredient_ids))
+            )
+        return sorted(set.intersection(*groups)) if groups else []
+
+    def filter(self, queryset, tag_ids=None, ingredient_ids=None, match_all=False):
+        """Filter a recipe queryset down to the recipes matching the lookup
+
+        Lookups matching more than RECIPE_INDEX_MAX_IDS recipes are left to
+        the database as subqueries on the M2M tables, rather than sent back
+        as a list of ids.
+        """
+        recipe_ids = self.lookup(tag_ids, ingredient_ids, match_all)
+        if len(recipe_ids) <= settings.RECIPE_INDEX_MAX_IDS:
+            return queryset.filter(id__in=recipe_ids)
+
+        condition = Q()
+        for through, column, ids in (
+            (Recipe.tags.through, "tag_id", tag_ids),
+            (Recipe.ingredients.through, "ingredient_id", ingredient_ids),
+        ):
+            if not ids:
+                continue
+            rows = through.objects.values("recipe_id")
+            if match_all:
+                for pk in set(ids):
+                    condition &= Q(id__in=rows.filter(**{column: pk}))
+            else:
+                condition &= Q(id__in=rows.filter(**{f"{column}__in": ids}))
+        return queryset.filter(condition)
+
+    def pantry(self, ingredient_ids, max_missing=0):
+        """Return (recipe id, missing count) of recipes cookable from a pantry
+
+        A recipe qualifies when at most `max_missing` of its ingredients are
+        not in `ingredient_ids`. Results are ordered by missing count, then
+        newest first. Recipes without ingredients are never returned.
+
+        Missing counts are kept as bit-sliced counters, bit j of counters[i]
+        being bit i of recipe j's count, and each ingredient outside the
+        pantry is added to every recipe using it with a few integer ops.
+        """
+        pantry = set(ingredient_ids)
+        width = (max_missing + 1).bit_length()
+        counters = [0] * width
+        overflow = 0
+        for ingredient_id, bits in self.ingredient_bits.items():
+            if ingredient_id in pantry:
+                continue
+            carry = bits
+            for i in range(width):
+                counters[i], carry = counters[i] ^ carry, counters[i] & carry
+            overflow |= carry
+
+        everything = (1 << len(self.recipe_ids)) - 1
+        results = []
+        for missing in range(max_missing + 1):
+            matching = everything & ~overflow
+            for i, counter in enumerate(counters):
+                matching &= counter if missing >> i & 1 else ~counter
+            recipe_ids = sorted(
+                (self.recipe_ids[position] for position in _bit_positions(matching)),
+                reverse=True,
+            )
+            results.extend((recipe_id, missing) for recipe_id in recipe_ids)
+        return results
+
+
+def _remember(user_id, token, index):
+    """Keep an index in this process, dropping the least recently used ones"""
+    with _local_lock:
+        _local_indexes[user_id] = (token, index)
+        _local_indexes.move_to_end(user_id)
+        while len(_local_indexes) > settings.RECIPE_INDEX_LOCAL_SIZE:
+            _local_indexes.popitem(last=False)
+
+
+def get_recipe_index(request):
+    """Return the requesting user's recipe index, building it if it is stale
+
+    Indexes are identified by the user's index token, which changes whenever
+    tags or ingredients are linked to or unlinked from their recipes, so
+    other writes leave the index in place. Recently used indexes are kept
+    in the process and only fetched from the shared cache, or rebuilt, when
+    missing or stale.
+    """
+    user_id = request.user.pk
+    token = get_user_index_token(request)
+    with _local_lock:
+        local = _local_indexes.get(user_id)
+        if local is not None and local[0] == token:
+            _local_indexes.move_to_end(user_id)
+            return local[1]
+
+    key = f"recipe-index:{user_id}:{token}"
+    cache = caches[settings.RECIPE_RESPONSE_CACHE]
+    index = cache.get(key)
+    if index is None:
+        index = RecipeIndex.build(user_id)
+        cache.set(key, index, settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+    _remember(user_id, token, index)
+    return index
@@ -0,0 +1,65 @@
+import io
+
+from django.core.management.base import BaseCommand
+
+from recipe.benchmark import format_report, run_benchmark, write_report
+
+
+class Command(BaseCommand):
+    """Django command to benchmark every API endpoint against a seeded dataset"""
+
+    help = (
+        "Seed users, recipes, tags and ingredients, drive every API endpoint "
+        "in-process and report latency percentiles, throughput, SQL query "
+        "counts and peak memory. The seeded data is rolled back afterwards, "
+        "so work deferred to transaction commit, such as image variant "
+        "generation, never runs and is not measured unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2)
+        parser.add_argument("--recipes", type=int, default=200, help="Recipes per user")
+        parser.add_argument("--tags", type=int, default=20, help="Tags per user")
+        parser.add_argument(
+            "--ingredients", type=int, default=50, help="Ingredients per user"
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--only", help="Only run endpoints whose name contains this string"
+        )
+        parser.add_argument("--label", default="", help="Label stored in the report")
+        parser.add_argument(
+            "--output", help='Write the JSON report to this file, "-" for stdout'
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the seeded data instead of rolling back"
+        )
+
+    def handle(self, *args, **options):
+        report = run_benchmark(
+            users=options["users"],
+            recipes=options["recipes"],
+            tags=options["tags"],
+            ingredients=options["ingredients"],
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+            only=options["only"],
+            keep=options["keep"],
+            label=options["label"],
+        )
+
+        output = options["output"]
+        if output == "-":
+            buffer = io.StringIO()
+            write_report(report, buffer)
+            self.stdout.write(buffer.getvalue(), ending="")
+            return
+
+        self.stdout.write(format_report(report))
+        if output:
+            with open(output, "w") as stream:
+                write_report(report, stream)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {output}"))
@@ -0,0 +1,44 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recipe.benchmark import run_serializer_benchmark
+
+
+class Command(BaseCommand):
+    """Django command to compare the DRF serializers with the fast path"""
+
+    help = (
+        "Seed a user, render every list with the DRF serializers and with "
+        "recipe.fast and report the cost per row in microseconds. The seeded "
+        "data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=200)
+        parser.add_argument("--tags", type=int, default=20)
+        parser.add_argument("--ingredients", type=int, default=50)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        report = run_serializer_benchmark(
+            recipes=options["recipes"],
+            tags=options["tags"],
+            ingredients=options["ingredients"],
+            iterations=options["iterations"],
+            seed=options["seed"],
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+            return
+
+        header = f"{'list':<20}{'rows':>7}{'DRF us/row':>12}{'fast us/row':>13}{'speedup':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, stats in report.items():
+            self.stdout.write(
+                f"{name:<20}{stats['rows']:>7}{stats['drf_us_per_row']:>12.2f}"
+                f"{stats['fast_us_per_row']:>13.2f}{stats['speedup'] or 0:>9.2f}"
+            )
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import RecipeSnapshot
+from recipe.snapshots import check_snapshots
+
+
+class Command(BaseCommand):
+    """Django command to compare stored recipe snapshots with fresh renderings"""
+
+    help = (
+        "Re-render the stored recipe list snapshots in batches and report the ones "
+        "differing from what the serializers produce now, optionally rewriting them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only check the snapshots of the user with this email")
+        parser.add_argument(
+            "--repair", action="store_true", help="Rewrite the stale snapshots found"
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        snapshots = RecipeSnapshot.objects.all()
+        if options["user"]:
+            users = get_user_model().objects.filter(email=options["user"])
+            if not users.exists():
+                raise CommandError(f"No user with email {options['user']}")
+            snapshots = snapshots.filter(recipe__user__in=users)
+
+        stale = check_snapshots(snapshots, options["batch_size"], options["repair"])
+        for recipe_id in stale:
+            self.stdout.write(f"Stale snapshot of recipe {recipe_id}")
+        action = "repaired" if options["repair"] else "found"
+        style = self.style.SUCCESS if options["repair"] or not stale else self.style.WARNING
+        self.stdout.write(style(f"{len(stale)} stale snapshot(s) {action}"))
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipe.images import delete_unless_recent, orphaned_images
+
+
+class Command(BaseCommand):
+    """Django command to delete upload files no recipe or variant references"""
+
+    help = (
+        "Walk uploads/recipe/ and uploads/variants/ once, compare every file "
+        "with the image columns and delete the ones nothing references."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=3600,
+            help="Keep files modified less than this many seconds ago",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only list the orphaned files"
+        )
+
+    def handle(self, *args, **options):
+        count = size = 0
+        cutoff = time.time() - options["min_age"]
+        for name, file_size in orphaned_images(options["min_age"]):
+            if options["dry_run"]:
+                self.stdout.write(name)
+            elif not delete_unless_recent(name, cutoff):
+                # Gone already, or reused since the walk
+                continue
+            count += 1
+            size += file_size
+
+        verb = "Found" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {count} orphaned files ({size} bytes)")
+        )
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.export import EXPORT_FORMATS, iter_recipes
+
+
+class Command(BaseCommand):
+    """Django command to export every recipe of a user"""
+
+    help = (
+        "Stream every recipe of a user, with its tag and ingredient names, "
+        "as NDJSON or CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the user whose recipes are exported")
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--output", default="-", help='File to write to, "-" for stdout')
+        parser.add_argument("--chunk-size", type=int, help="Recipes read per query")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        _, render = EXPORT_FORMATS[options["format"]]
+        lines = render(iter_recipes(user, options["chunk_size"]))
+        if options["output"] == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        with open(options["output"], "w", newline="") as stream:
+            stream.writelines(lines)
+        self.stderr.write(self.style.SUCCESS(f"Recipes written to {options['output']}"))
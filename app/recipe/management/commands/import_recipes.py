@@ -0,0 +1,55 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.importer import IMPORT_FORMATS, guess_format, import_recipes
+
+
+class Command(BaseCommand):
+    """Django command to import recipes for a user from a file"""
+
+    help = (
+        "Load recipes from an NDJSON or CSV file, as written by export_recipes, "
+        "creating missing tags and ingredients by name. Every batch is "
+        "committed on its own."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("email", help="Email of the user receiving the recipes")
+        parser.add_argument("path", help='File to read, "-" for stdin')
+        parser.add_argument(
+            "--format", choices=list(IMPORT_FORMATS), help="Defaults to the file extension"
+        )
+        parser.add_argument("--batch-size", type=int, help="Recipes loaded per transaction")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options["email"])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        file_format = options["format"] or guess_format(options["path"])
+        if file_format is None:
+            raise CommandError("Unable to tell the file format, pass --format")
+
+        def progress(result):
+            self.stdout.write(f"{result.created} recipes imported, {result.failed} failed")
+
+        if options["path"] == "-":
+            stream = sys.stdin
+        else:
+            stream = open(options["path"], encoding="utf-8-sig", newline="")
+        with stream:
+            result = import_recipes(
+                user,
+                IMPORT_FORMATS[file_format](stream),
+                batch_size=options["batch_size"],
+                progress=progress,
+            )
+
+        for error in result.errors:
+            self.stderr.write(f"Record {error['record']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Imported {result.created} recipes, {result.failed} failed")
+        )
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    """Django command to recompute the price and duration counts of recipes"""
+
+    help = (
+        "Recompute the per-user price and time_minutes counts behind the recipe "
+        "stats endpoint with one aggregate query per field."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild the stats of the user with this email")
+
+    def handle(self, *args, **options):
+        users = None
+        if options["user"]:
+            users = get_user_model().objects.filter(email=options["user"])
+            if not users.exists():
+                raise CommandError(f"No user with email {options['user']}")
+
+        rebuild_stats(users)
+        self.stdout.write(self.style.SUCCESS("Recipe stats rebuilt"))
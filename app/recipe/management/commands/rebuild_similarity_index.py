@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from recipe.similarity import update_bands
+
+
+class Command(BaseCommand):
+    """Django command to recompute the similarity buckets of every recipe"""
+
+    help = (
+        "Recompute the MinHash LSH buckets behind the similar recipes endpoint. "
+        "They are kept up to date on writes, this is needed once for recipes "
+        "created before the index existed or after its banding changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_id, total = 0, 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            update_bands(recipe_ids)
+            total += len(recipe_ids)
+            last_id = recipe_ids[-1]
+            self.stdout.write(f"{total} recipes indexed")
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} recipes"))
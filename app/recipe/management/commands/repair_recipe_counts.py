@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from recipe.counts import COUNTED, repair_recipe_counts
+
+
+class Command(BaseCommand):
+    """Django command to recompute the recipe counts of tags and ingredients"""
+
+    help = (
+        "Recompute recipe_count of every tag and ingredient from the recipe "
+        "relations with one UPDATE per model, and report how many were wrong."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only repair the objects of the user with this email")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(email=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        for model in COUNTED:
+            queryset = model.objects.all()
+            if user is not None:
+                queryset = queryset.filter(user=user)
+            repaired = repair_recipe_counts(model, queryset)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural.capitalize()}: {repaired} repaired"
+            )
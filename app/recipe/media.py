@@ -0,0 +1,162 @@
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.http import quote_etag
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from core.models import Recipe, RecipeImageVariant
+from users.authentication import SignedTokenAuthentication
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Upload directory -> function returning whether the user owns a file in it
+OWNERS = {
+    "uploads/recipe/": lambda user, name: Recipe.objects.filter(
+        user=user, image=name
+    ).exists(),
+    "uploads/variants/": lambda user, name: RecipeImageVariant.objects.filter(
+        recipe__user=user, image=name
+    ).exists(),
+}
+
+
+def owns_media(user, name):
+    """Return True if `name` is a recipe image or variant of the user"""
+    for prefix, owns in OWNERS.items():
+        if name.startswith(prefix):
+            return owns(user, name)
+    return False
+
+
+def parse_range(header, size):
+    """Return the (start, end) byte range requested by a Range header
+
+    Returns None when the whole file should be sent, which is the case for
+    a missing, malformed or multi-range header, and raises ValueError when
+    the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", "")) if header else None
+    if match is None or match.group(0) == "bytes=-":
+        return None
+    first, last = match.groups()
+    if not first:
+        # A suffix range, the last `last` bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range starts past the end of the file")
+    return start, end
+
+
+class FileRange:
+    """Read at most `length` bytes of an open file from its current position
+
+    Keeps `fileno` so that WSGI servers implementing wsgi.file_wrapper with
+    os.sendfile (gunicorn, uWSGI) still send the range without copying it
+    through Python, they send Content-Length bytes from the current offset.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _cache_headers(response, etag=None):
+    response["Cache-Control"] = f"private, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable"
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def _proxy_response(name, content_type):
+    """Hand the transfer over to the front proxy, which also handles ranges"""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SERVE_MODE == "x-accel-redirect":
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + name
+    else:
+        response["X-Sendfile"] = safe_join(settings.MEDIA_ROOT, name)
+    return _cache_headers(response)
+
+
+def _file_response(request, path, content_type):
+    """Send the file, or the single range asked for, from this process"""
+    try:
+        file = open(path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404("No such file.")
+    stat = os.fstat(file.fileno())
+    size = stat.st_size
+    etag = quote_etag(f"{int(stat.st_mtime):x}-{size:x}")
+
+    if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+        file.close()
+        return _cache_headers(HttpResponse(status=304), etag)
+
+    byte_range = None
+    if request.META.get("HTTP_IF_RANGE", etag) == etag:
+        try:
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), content_type=content_type)
+        response.status_code = 206
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return _cache_headers(response, etag)
+
+
+class MediaView(APIView):
+    """Serve recipe images and their variants to the user owning them
+
+    Files are sent by the front proxy when MEDIA_SERVE_MODE is set, otherwise
+    by Django itself. Media names are unique per upload, so responses are
+    cacheable for good.
+    """
+
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, path):
+        name = posixpath.normpath(path)
+        if name != path or not owns_media(request.user, name):
+            raise Http404("No such file.")
+
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if settings.MEDIA_SERVE_MODE:
+            return _proxy_response(name, content_type)
+        return _file_response(request, safe_join(settings.MEDIA_ROOT, name), content_type)
@@ -0,0 +1,149 @@
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.renderers import JSONRenderer
+
+# Accepted values of `?paginate=`
+PAGINATE_VALUES = {"1": True, "true": True, "0": False, "false": False}
+
+
+class OptionalCursorPagination(CursorPagination):
+    """Opaque keyset pagination that clients can opt out of with `?paginate=0`
+
+    The cursor encodes the position of the last row served instead of an
+    OFFSET, so a page costs the same no matter how deep the client pages.
+    Positions hold every ordering field and orderings end with a unique one,
+    so rows sharing the leading values are neither skipped nor repeated.
+    """
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    paginate_query_param = "paginate"
+
+    def get_ordering(self, request, queryset, view):
+        """Use the ordering chosen by the view if it lets clients pick one"""
+        if hasattr(view, "get_ordering"):
+            return tuple(view.get_ordering())
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate the queryset unless the client asked for a bare list
+
+        Follows CursorPagination.paginate_queryset, filtering on the whole
+        position instead of the first ordering field.
+        """
+        paginate = request.query_params.get(self.paginate_query_param, "1").lower()
+        if paginate not in PAGINATE_VALUES:
+            raise ValidationError(
+                {self.paginate_query_param: ["Must be one of: 0, 1, true, false."]}
+            )
+        if not PAGINATE_VALUES[paginate]:
+            return None
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._after(current_position, reverse))
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[: self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _after(self, position, reverse):
+        """Return the condition selecting the rows past a position
+
+        A row is past it when it ties on the first ordering fields and goes
+        past it on the next one.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        tied = Q()
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip("-")
+            lookup = "lt" if order.startswith("-") != reverse else "gt"
+            condition |= tied & Q(**{f"{field}__{lookup}": value})
+            tied &= Q(**{field: value})
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Return the values of every ordering field of a row as JSON"""
+        values = []
+        for order in ordering:
+            field = order.lstrip("-")
+            if isinstance(instance, dict):
+                values.append(instance[field])
+            else:
+                values.append(getattr(instance, field))
+        return json.dumps(values, separators=(",", ":"))
+
+    def get_paginated_json(self, results):
+        """Return the JSON get_paginated_response renders, around rendered results"""
+        links = JSONRenderer().render(
+            OrderedDict([("next", self.get_next_link()), ("previous", self.get_previous_link())])
+        )
+        return links[:-1] + b',"results":' + results + b"}"
+
+
+class RecipeCursorPagination(OptionalCursorPagination):
+    """Cursor pagination for recipes, newest first"""
+
+    ordering = ("-id",)
+
+
+class RecipeAttrCursorPagination(OptionalCursorPagination):
+    """Cursor pagination for tags and ingredients, alphabetical"""
+
+    ordering = ("name", "id")
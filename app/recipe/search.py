@@ -0,0 +1,74 @@
+from django.contrib.postgres.lookups import PostgresSimpleLookup
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import (
+    Case,
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+    Q,
+    QuerySet,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast
+
+# Must match the expression indexed in core/migrations/0009_recipe_title_search
+SEARCH_CONFIG = "english"
+
+
+class TrigramWordSimilar(PostgresSimpleLookup):
+    """Match values with an extent similar to the term, served by trigram indexes"""
+
+    lookup_name = "trigram_word_similar"
+    operator = "%%>"
+
+
+class WordSimilarity(Func):
+    """Similarity of a term to the closest extent of an expression"""
+
+    function = "word_similarity"
+
+    def __init__(self, expression, term):
+        super().__init__(Value(term), expression, output_field=FloatField())
+
+
+def _boost(term, output_field):
+    """Rank exact title matches first, then titles starting with the term"""
+    return Case(
+        When(title__iexact=term, then=Value(2)),
+        When(title__istartswith=term, then=Value(1)),
+        default=Value(0),
+        output_field=output_field,
+    )
+
+
+def search_recipes(queryset: QuerySet, term):
+    """Filter recipes whose title matches `term` and order them by relevance
+
+    PostgreSQL combines full-text matching with trigram word similarity so
+    that misspelt terms still match, both served by GIN indexes. Other
+    backends fall back to a case-insensitive match on every word of the term.
+    Either way exact titles rank first, then titles starting with the term.
+    """
+    if connections[queryset.db].vendor == "postgresql":
+        vector = SearchVector("title", config=SEARCH_CONFIG)
+        query = SearchQuery(term, config=SEARCH_CONFIG)
+        relevance = (
+            _boost(term, FloatField())
+            + SearchRank(vector, query)
+            + WordSimilarity(F("title"), term)
+        )
+        queryset = queryset.annotate(
+            search=vector,
+            # ts_rank and word_similarity are real, cast so that the cursor
+            # holds the exact value it is compared with on the next page
+            relevance=Cast(relevance, FloatField()),
+        ).filter(Q(search=query) | Q(title__trigram_word_similar=term))
+    else:
+        for word in term.split():
+            queryset = queryset.filter(title__icontains=word)
+        queryset = queryset.annotate(relevance=_boost(term, IntegerField()))
+
+    return queryset.order_by("-relevance", "-id")
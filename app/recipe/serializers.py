@@ -1,6 +1,16 @@
-from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import (
+    BaseSerializer,
+    FileField,
+    ModelSerializer,
+    PrimaryKeyRelatedField,
+    SerializerMethodField,
+)
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, RecipeImageUpload, RecipeImageVariant
+from recipe.images import inspect_image
 
 
 class TagSerializer(ModelSerializer):
@@ -8,8 +18,8 @@ class TagSerializer(ModelSerializer):
 
     class Meta:
         model = Tag
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
 
 
 class IngredientSerializer(ModelSerializer):
@@ -17,19 +27,100 @@ class IngredientSerializer(ModelSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ("id", "name")
-        read_only_fields = ("id",)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ("id", "recipe_count")
+
+
+class RecipeImageVariantSerializer(ModelSerializer):
+    """Serializer for the resized variants of a recipe image"""
 
+    url = SerializerMethodField()
 
-class RecipeSerializer(ModelSerializer):
+    class Meta:
+        model = RecipeImageVariant
+        fields = ("name", "status", "url", "width", "height")
+        read_only_fields = fields
+
+    def get_url(self, obj: RecipeImageVariant):
+        """Return the variant's media URL once it has been generated"""
+        return obj.image.url if obj.image else None
+
+
+def _param_set(request, name):
+    """Return the comma separated names of a query parameter, None if absent"""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """Let clients trim fields with `?fields=` and inline relations with `?expand=`
+
+    Only applies to reads. `expandable_fields` maps relations rendered as
+    primary keys to the serializer used to inline them.
+    """
+
+    expandable_fields = {}
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Return (fields to render, relations to render as nested objects)"""
+        fields = set(cls.Meta.fields)
+        nested = {
+            name
+            for name, field in cls._declared_fields.items()
+            if isinstance(field, BaseSerializer)
+        }
+        if request is None or request.method not in SAFE_METHODS:
+            return fields, nested
+
+        only = _param_set(request, "fields")
+        expand = _param_set(request, "expand") or set()
+        errors = {}
+        unknown = (only or set()) - fields
+        if unknown:
+            errors["fields"] = [f"Unknown fields: {', '.join(sorted(unknown))}."]
+        unknown = expand - set(cls.expandable_fields)
+        if unknown:
+            errors["expand"] = [f"Cannot expand: {', '.join(sorted(unknown))}."]
+        if errors:
+            raise ValidationError(errors)
+        if only is not None:
+            fields = only | expand
+        return fields, (nested | expand) & fields
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, nested = self.requested_fields(self.context.get("request"))
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
+        for name in nested & set(self.expandable_fields):
+            if not isinstance(self.fields[name], BaseSerializer):
+                self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
+
+class RecipeSerializer(SparseFieldsMixin, ModelSerializer):
     """Serializer for the recipe objects."""
 
+    expandable_fields = {"tags": TagSerializer, "ingredients": IngredientSerializer}
+
     ingredients = PrimaryKeyRelatedField(many=True, queryset=Ingredient.objects.all())
     tags = PrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
+    image_variants = RecipeImageVariantSerializer(many=True, read_only=True)
 
     class Meta:
         model = Recipe
-        fields = ("id", "title", "time_minutes", "price", "link", "ingredients", "tags")
+        fields = (
+            "id",
+            "title",
+            "time_minutes",
+            "price",
+            "link",
+            "ingredients",
+            "tags",
+            "image_variants",
+        )
         read_only_fields = ("id",)
 
 
@@ -40,10 +131,45 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+class HeaderCheckedImageField(FileField):
+    """Image field that only reads the image header to validate it
+
+    DRF's ImageField has Pillow verify the whole image, loading uploads kept
+    in memory a second time.
+    """
+
+    def to_internal_value(self, data):
+        file = super().to_internal_value(data)
+        try:
+            inspect_image(file)
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+        return file
+
+
 class RecipeImageSerializer(ModelSerializer):
     """Serializer for uploading images to recipe"""
 
+    image = HeaderCheckedImageField(allow_null=True, max_length=100, required=False)
+    image_variants = RecipeImageVariantSerializer(many=True, read_only=True)
+
     class Meta:
         model = Recipe
-        fields = ("id", "image")
+        fields = ("id", "image", "image_variants")
         read_only_fields = ("id",)
+
+
+class RecipeImageUploadSerializer(ModelSerializer):
+    """Serializer for chunked recipe image uploads"""
+
+    class Meta:
+        model = RecipeImageUpload
+        fields = ("id", "filename", "size", "offset", "created_at")
+        read_only_fields = ("id", "offset", "created_at")
+
+    def validate_size(self, size):
+        if not 0 < size <= settings.RECIPE_UPLOAD_MAX_SIZE:
+            raise ValidationError(
+                f"Must be between 1 and {settings.RECIPE_UPLOAD_MAX_SIZE} bytes."
+            )
+        return size
@@ -0,0 +1,291 @@
+import os
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeImageUpload,
+    RecipeImageVariant,
+    RecipeSnapshot,
+)
+from recipe import images, similarity, stats, uploads
+from recipe.counts import COUNTED, adjust_recipe_counts, linked_ids
+
+# Sent after objects were inserted with bulk_create, which bypasses post_save
+# and m2m_changed. `sender` is the model, `pks` the primary keys created.
+objects_bulk_created = Signal(providing_args=["user_id", "pks"])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_data_version_on_write(sender, instance, signal, **kwargs):
+    """Bump the owner's data version whenever one of their objects changes
+
+    Deletes also take the deleted object's tag and ingredient links along.
+    """
+    get_user_model().objects.bump_data_version(instance.user_id, links=signal is post_delete)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_data_version_on_relation_change(sender, instance, action, **kwargs):
+    """Bump the owner's data version when a recipe's tags or ingredients change"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        get_user_model().objects.bump_data_version(instance.user_id, links=True)
+
+
+@receiver(post_save, sender=RecipeImageVariant)
+@receiver(post_delete, sender=RecipeImageVariant)
+def bump_data_version_on_variant_change(sender, instance, **kwargs):
+    """Bump the recipe owner's data version when an image variant changes"""
+    user_id = (
+        Recipe.objects.filter(pk=instance.recipe_id).values_list("user_id", flat=True).first()
+    )
+    if user_id is not None:
+        get_user_model().objects.bump_data_version(user_id)
+
+
+@receiver(objects_bulk_created)
+def bump_data_version_on_bulk_create(sender, user_id, pks, **kwargs):
+    """Bump the owner's data version after a bulk insert"""
+    if pks:
+        get_user_model().objects.bump_data_version(user_id, links=True)
+
+
+def _linked(counted, instance, reverse, pk_set):
+    """Return the counted pk of every through row between instance and pk_set"""
+    through, column = COUNTED[counted]
+    if reverse:
+        rows = through.objects.filter(**{column: instance.pk})
+        if pk_set is not None:
+            rows = rows.filter(recipe_id__in=pk_set)
+    else:
+        rows = through.objects.filter(recipe_id=instance.pk)
+        if pk_set is not None:
+            rows = rows.filter(**{f"{column}__in": pk_set})
+    return list(rows.values_list(column, flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_recipe_counts_on_relation_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Keep recipe_count in step with the links added to or removed from recipes"""
+    counted = Tag if sender is Recipe.tags.through else Ingredient
+    if action in ("pre_remove", "pre_clear"):
+        # pk_set may name objects that aren't linked, remember the rows that are
+        instance._recipe_count_unlinked = _linked(counted, instance, reverse, pk_set)
+    elif action in ("post_remove", "post_clear"):
+        unlinked = Counter(getattr(instance, "_recipe_count_unlinked", ()))
+        adjust_recipe_counts(counted, {pk: -count for pk, count in unlinked.items()})
+    elif action == "post_add" and pk_set:
+        # Django only reports the links that were actually created
+        if reverse:
+            adjust_recipe_counts(counted, {instance.pk: len(pk_set)})
+        else:
+            adjust_recipe_counts(counted, dict.fromkeys(pk_set, 1))
+
+
+@receiver(pre_delete, sender=Recipe)
+def update_recipe_counts_on_delete(sender, instance, **kwargs):
+    """Release the tags and ingredients of a recipe about to be deleted"""
+    for counted in COUNTED:
+        linked = linked_ids(counted, [instance.pk])
+        adjust_recipe_counts(counted, {pk: -count for pk, count in linked.items()})
+
+
+@receiver(objects_bulk_created, sender=Recipe)
+def update_recipe_counts_on_bulk_create(sender, pks, **kwargs):
+    """Count the tags and ingredients linked to bulk inserted recipes"""
+    if pks:
+        for counted in COUNTED:
+            adjust_recipe_counts(counted, linked_ids(counted, pks))
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def update_similarity_on_ingredient_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rehash the recipes whose ingredient sets changed"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            similarity.update_bands([instance.pk])
+    elif action == "pre_clear":
+        instance._similarity_recipe_ids = list(instance.recipe_set.values_list("pk", flat=True))
+    elif action == "post_clear":
+        similarity.update_bands(getattr(instance, "_similarity_recipe_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        similarity.update_bands(pk_set)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_of_deleted_ingredient(sender, instance, **kwargs):
+    """Note which recipes lose an ingredient that is about to be deleted"""
+    instance._similarity_recipe_ids = list(instance.recipe_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def update_similarity_on_ingredient_delete(sender, instance, **kwargs):
+    """Rehash the recipes that lost a deleted ingredient"""
+    similarity.update_bands(getattr(instance, "_similarity_recipe_ids", ()))
+
+
+@receiver(objects_bulk_created, sender=Recipe)
+def update_similarity_on_bulk_create(sender, pks, **kwargs):
+    """Hash the ingredient sets of bulk inserted recipes"""
+    similarity.update_bands(pks)
+
+
+@receiver(post_init, sender=Recipe)
+def remember_stored_image(sender, instance, **kwargs):
+    """Remember the image name loaded from the database"""
+    # Read the raw attribute so deferred images are not loaded
+    image = instance.__dict__.get("image")
+    instance._stored_image = getattr(image, "name", image)
+
+
+@receiver(post_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    """Delete the previous image file once the replacement is committed"""
+    if "image" not in instance.__dict__:
+        # Deferred and never loaded, so it can't have been replaced
+        return
+    stored, current = instance._stored_image, instance.image.name
+    if stored and stored != current:
+        transaction.on_commit(lambda: images.release_image(stored))
+    instance._stored_image = current
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    """Delete the image file of a deleted recipe unless another one shares it"""
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: images.release_image(name))
+
+
+@receiver(post_delete, sender=RecipeImageVariant)
+def release_deleted_variant(sender, instance, **kwargs):
+    """Delete the file of a deleted variant unless another one shares it"""
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: images.release_image(name))
+
+
+@receiver(post_delete, sender=RecipeImageUpload)
+def delete_upload_part(sender, instance, **kwargs):
+    """Delete the received chunks of a finished or discarded upload"""
+    try:
+        os.remove(uploads.part_path(instance.pk))
+    except FileNotFoundError:
+        pass
+
+
+def _stats_changes(instance, update_fields):
+    """Return the stats fields a save writes, with their new stored values"""
+    changes = stats.stored_values(instance.__dict__)
+    if update_fields is not None:
+        changes = {field: value for field, value in changes.items() if field in update_fields}
+    return changes
+
+
+def _stored_stats(pk, fields):
+    """Read the stored values of stats fields, the instance's may be stale"""
+    row = Recipe.objects.filter(pk=pk).values(*fields).first()
+    return stats.stored_values(row or {})
+
+
+@receiver(pre_save, sender=Recipe)
+def load_stored_stats(sender, instance, update_fields, **kwargs):
+    """Read the price and duration a save is about to overwrite"""
+    changes = _stats_changes(instance, update_fields)
+    instance._stored_stats = {}
+    if changes and not instance._state.adding:
+        instance._stored_stats = _stored_stats(instance.pk, changes)
+
+
+@receiver(post_save, sender=Recipe)
+def update_stats_on_save(sender, instance, update_fields, **kwargs):
+    """Move the recipe between the counts of its old and new price and duration"""
+    deltas = Counter()
+    for field, value in _stats_changes(instance, update_fields).items():
+        stored = instance._stored_stats.get(field)
+        if stored != value:
+            deltas[field, value] += 1
+            if stored is not None:
+                deltas[field, stored] -= 1
+    stats.adjust_stats(instance.user_id, deltas)
+
+
+@receiver(pre_delete, sender=Recipe)
+def update_stats_on_delete(sender, instance, **kwargs):
+    """Drop a recipe about to be deleted from the counts"""
+    stored = _stored_stats(instance.pk, stats.STATS_FIELDS)
+    stats.adjust_stats(instance.user_id, {item: -1 for item in stored.items()})
+
+
+@receiver(objects_bulk_created, sender=Recipe)
+def update_stats_on_bulk_create(sender, user_id, pks, **kwargs):
+    """Count the prices and durations of bulk inserted recipes"""
+    if pks:
+        for owner_id, deltas in stats.count_recipes(Recipe.objects.filter(pk__in=pks)).items():
+            stats.adjust_stats(owner_id, deltas)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_snapshot_on_save(sender, instance, created, **kwargs):
+    """Drop the snapshot of an updated recipe"""
+    if not created:
+        RecipeSnapshot.objects.invalidate([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_snapshots_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop the snapshots of recipes whose tags or ingredients changed"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            RecipeSnapshot.objects.invalidate([instance.pk])
+    elif action == "pre_clear":
+        instance._snapshot_recipe_ids = list(instance.recipe_set.values_list("pk", flat=True))
+    elif action == "post_clear":
+        RecipeSnapshot.objects.invalidate(getattr(instance, "_snapshot_recipe_ids", ()))
+    elif action in ("post_add", "post_remove"):
+        RecipeSnapshot.objects.invalidate(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_snapshots_of_deleted_attr(sender, instance, **kwargs):
+    """Note which recipes list a tag or ingredient that is about to be deleted"""
+    instance._snapshot_recipe_ids = list(instance.recipe_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_snapshots_on_attr_delete(sender, instance, **kwargs):
+    """Drop the snapshots of recipes that lost a deleted tag or ingredient"""
+    RecipeSnapshot.objects.invalidate(getattr(instance, "_snapshot_recipe_ids", ()))
+
+
+@receiver(post_save, sender=RecipeImageVariant)
+@receiver(post_delete, sender=RecipeImageVariant)
+def invalidate_snapshot_on_variant_change(sender, instance, **kwargs):
+    """Drop the snapshot of a recipe whose image variants changed"""
+    RecipeSnapshot.objects.invalidate([instance.recipe_id])
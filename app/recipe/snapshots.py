@@ -0,0 +1,130 @@
+import json
+
+from django.db.models import F
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.models import Recipe, RecipeSnapshot
+from recipe import fast
+
+# Query parameters that leave the recipe list in its default rendering
+SNAPSHOT_PARAMS = {"cursor", "page_size", "paginate"}
+
+
+class RenderedResponse(Response):
+    """Response whose JSON body was assembled upfront
+
+    `data` parses the body back, it's only there for tests and introspection.
+    """
+
+    def __init__(self, content, **kwargs):
+        super().__init__(**kwargs)
+        self.rendered_json = content
+
+    @property
+    def data(self):
+        return json.loads(self.rendered_json)
+
+    @data.setter
+    def data(self, value):
+        pass
+
+    @property
+    def rendered_content(self):
+        self["Content-Type"] = self.accepted_renderer.media_type
+        return self.rendered_json
+
+
+def _render_rows(serializer, rows):
+    """Return {recipe id: JSON of the recipe as the recipe list renders it}"""
+    renderer = JSONRenderer()
+    return {item["id"]: renderer.render(item).decode() for item in serializer.render(rows)}
+
+
+def render(recipe_ids):
+    """Return {recipe id: JSON of the recipe as the recipe list renders it}"""
+    serializer = fast.RecipeRowSerializer(None)
+    return _render_rows(
+        serializer, serializer.values(Recipe.objects.filter(pk__in=recipe_ids).order_by())
+    )
+
+
+def can_serve(request):
+    """Return True if the request wants the default, compact JSON recipe list"""
+    return (
+        set(request.query_params) <= SNAPSHOT_PARAMS
+        and type(request.accepted_renderer) is JSONRenderer
+        and "indent" not in request.accepted_media_type
+    )
+
+
+def list_response(view, request):
+    """Assemble the recipe list from snapshots, rendering the missing ones
+
+    A page is a single query joining the snapshots to the recipes. Recipes
+    without a snapshot of their current token, new or changed since, are
+    rendered in a batch from the columns loaded along and stored under the
+    token read with those columns. A recipe changing meanwhile gets a new
+    token, so the snapshot is never served.
+    """
+    serializer = fast.RecipeRowSerializer(None)
+    queryset = serializer.values(
+        Recipe.objects.filter(user=request.user).order_by("-id")
+    ).annotate(
+        token=F("snapshot_token"),
+        body=F("snapshot__body"),
+        stored_token=F("snapshot__token"),
+    )
+    page = view.paginate_queryset(queryset)
+    rows = list(queryset if page is None else page)
+
+    missing = [row for row in rows if row["body"] is None or row["stored_token"] != row["token"]]
+    if missing:
+        rendered = _render_rows(serializer, missing)
+        outdated = [row for row in missing if row["body"] is not None]
+        if outdated:
+            RecipeSnapshot.objects.filter(
+                recipe_id__in=[row["id"] for row in outdated],
+                token__in=[row["stored_token"] for row in outdated],
+            ).delete()
+        RecipeSnapshot.objects.bulk_create(
+            (
+                RecipeSnapshot(recipe_id=row["id"], body=rendered[row["id"]], token=row["token"])
+                for row in missing
+            ),
+            ignore_conflicts=True,
+        )
+        for row in missing:
+            row["body"] = rendered[row["id"]]
+
+    results = f"[{','.join(row['body'] for row in rows)}]".encode()
+    if page is not None:
+        results = view.paginator.get_paginated_json(results)
+    return RenderedResponse(results)
+
+
+def check_snapshots(queryset, batch_size=500, repair=False):
+    """Compare served snapshots with fresh renderings and return the stale ids
+
+    Snapshots of an older token are never served and left alone. With
+    `repair` the stale ones are rewritten.
+    """
+    stale = []
+    current = queryset.filter(token=F("recipe__snapshot_token"))
+    ids = current.order_by("recipe_id").values_list("recipe_id", flat=True)
+    last = 0
+    while True:
+        batch = list(ids.filter(recipe_id__gt=last)[:batch_size])
+        if not batch:
+            return stale
+        last = batch[-1]
+        rendered = render(batch)
+        snapshots = RecipeSnapshot.objects.filter(recipe_id__in=batch)
+        changed = [
+            RecipeSnapshot(recipe_id=pk, body=rendered[pk])
+            for pk, body in snapshots.values_list("recipe_id", "body")
+            if body != rendered.get(pk)
+        ]
+        stale.extend(snapshot.recipe_id for snapshot in changed)
+        if repair and changed:
+            RecipeSnapshot.objects.bulk_update(changed, ["body"])
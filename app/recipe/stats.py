@@ -0,0 +1,167 @@
+import math
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from core.models import Ingredient, Recipe, RecipeValueCount, Tag
+from recipe.serializers import IngredientSerializer, TagSerializer
+
+# RecipeValueCount field -> function turning a recipe's value into the stored integer
+STATS_FIELDS = {
+    RecipeValueCount.PRICE: lambda price: int(Decimal(str(price)).scaleb(2)),
+    RecipeValueCount.TIME_MINUTES: int,
+}
+
+
+def stored_values(values):
+    """Return {field: stored integer} of the stats fields present in `values`"""
+    return {
+        field: convert(values[field])
+        for field, convert in STATS_FIELDS.items()
+        if values.get(field) is not None
+    }
+
+
+def adjust_stats(user_id, deltas):
+    """Apply {(field, value): delta} to a user's counts
+
+    Missing rows are inserted first, then there is one UPDATE per field and
+    distinct delta, so the number of queries doesn't grow with the number of
+    recipes changed.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    RecipeValueCount.objects.bulk_create(
+        (
+            RecipeValueCount(user_id=user_id, field=field, value=value)
+            for field, value in deltas
+        ),
+        ignore_conflicts=True,
+    )
+    grouped = defaultdict(list)
+    for (field, value), delta in deltas.items():
+        grouped[field, delta].append(value)
+    for (field, delta), values in grouped.items():
+        RecipeValueCount.objects.filter(
+            user_id=user_id, field=field, value__in=values
+        ).update(count=F("count") + delta)
+
+
+def count_recipes(queryset):
+    """Return {user id: {(field, value): number of recipes}} of some recipes"""
+    counts = defaultdict(Counter)
+    rows = queryset.values_list("user_id", *STATS_FIELDS).annotate(count=Count("id")).order_by()
+    for user_id, *values, count in rows:
+        for (field, convert), value in zip(STATS_FIELDS.items(), values):
+            counts[user_id][field, convert(value)] += count
+    return counts
+
+
+def rebuild_stats(users=None):
+    """Recompute the counts of the given users, or of every user, from scratch"""
+    recipes = Recipe.objects.all()
+    rows = RecipeValueCount.objects.all()
+    if users is not None:
+        recipes = recipes.filter(user__in=users)
+        rows = rows.filter(user__in=users)
+    with transaction.atomic():
+        rows.delete()
+        RecipeValueCount.objects.bulk_create(
+            (
+                RecipeValueCount(user_id=user_id, field=field, value=value, count=count)
+                for user_id, counts in count_recipes(recipes).items()
+                for (field, value), count in counts.items()
+            ),
+            batch_size=1000,
+        )
+
+
+def _percentiles(values, total, percents):
+    """Return {percent: nearest-rank percentile} walking (value, count) pairs once"""
+    ranks = sorted(
+        (max(math.ceil(percent / 100 * total) - 1, 0), percent) for percent in percents
+    )
+    result = {}
+    seen = 0
+    position = 0
+    for value, count in values:
+        seen += count
+        while position < len(ranks) and ranks[position][0] < seen:
+            result[ranks[position][1]] = value
+            position += 1
+    return result
+
+
+def _histogram(values, bins):
+    """Return [(start, end, count)] of `bins` equal-width bins between min and max"""
+    low, high = values[0][0], values[-1][0]
+    edges = sorted({low + (high - low) * index // bins for index in range(bins)})
+    counts = [0] * len(edges)
+    for value, count in values:
+        counts[bisect_right(edges, value) - 1] += count
+    ends = edges[1:] + [high]
+    return list(zip(edges, ends, counts))
+
+
+def distribution(values, display):
+    """Summarize sorted (value, count) pairs, formatting values with `display`"""
+    total = sum(count for _, count in values)
+    if not total:
+        return None
+    mean = sum(value * count for value, count in values) / total
+    percentiles = _percentiles(values, total, settings.RECIPE_STATS_PERCENTILES)
+    return {
+        "min": display(values[0][0]),
+        "max": display(values[-1][0]),
+        "mean": display(mean),
+        "percentiles": {
+            f"p{percent}": display(percentiles[percent])
+            for percent in settings.RECIPE_STATS_PERCENTILES
+        },
+        "histogram": [
+            {"start": display(start), "end": display(end), "count": count}
+            for start, end, count in _histogram(values, settings.RECIPE_STATS_HISTOGRAM_BINS)
+        ],
+    }
+
+
+def _price(cents):
+    return str((Decimal(cents) / 100).quantize(Decimal("0.01")))
+
+
+def _minutes(minutes):
+    return round(minutes, 2)
+
+
+def user_stats(user):
+    """Return the recipe count, price and time distributions and top tags and ingredients"""
+    values = defaultdict(list)
+    rows = (
+        RecipeValueCount.objects.filter(user=user, count__gt=0)
+        .order_by("field", "value")
+        .values_list("field", "value", "count")
+    )
+    for field, value, count in rows:
+        values[field].append((value, count))
+
+    top = {}
+    for name, model, serializer_class in (
+        ("top_tags", Tag, TagSerializer),
+        ("top_ingredients", Ingredient, IngredientSerializer),
+    ):
+        queryset = model.objects.filter(user=user, recipe_count__gt=0).order_by(
+            "-recipe_count", "name", "id"
+        )
+        top[name] = serializer_class(queryset[: settings.RECIPE_STATS_TOP], many=True).data
+
+    return {
+        "recipe_count": sum(count for _, count in values[RecipeValueCount.PRICE]),
+        "price": distribution(values[RecipeValueCount.PRICE], _price),
+        "time_minutes": distribution(values[RecipeValueCount.TIME_MINUTES], _minutes),
+        **top,
+    }
@@ -0,0 +1,25 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that a block stays within a SQL query budget"""
+
+    @contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        """Fail if more than `budget` queries run inside the block"""
+        context = CaptureQueriesContext(connections[using])
+        with context:
+            yield context
+
+        executed = len(context)
+        if executed > budget:
+            queries = "\n".join(
+                f"{index}. {query['sql']}"
+                for index, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(
+                f"{executed} queries executed, budget is {budget}:\n{queries}"
+            )
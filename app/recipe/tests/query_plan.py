@@ -0,0 +1,62 @@
+import re
+from unittest import SkipTest
+
+from django.db import connections
+
+
+def _postgresql_problems(plan):
+    """Yield the sequential scans and sorts of a JSON plan tree"""
+    node_type = plan["Node Type"]
+    if node_type == "Seq Scan":
+        yield f"Seq Scan on {plan['Relation Name']}"
+    elif node_type in ("Sort", "Incremental Sort"):
+        yield f"{node_type} by {', '.join(plan['Sort Key'])}"
+    for child in plan.get("Plans", ()):
+        yield from _postgresql_problems(child)
+
+
+def query_plan_problems(queryset):
+    """Return the full table scans and sorts in the plan of a queryset
+
+    On PostgreSQL sequential scans and sorts are disabled while planning, so
+    one only shows up when no index can serve the query at all, however small
+    the test tables are.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off; SET enable_sort = off")
+            try:
+                # psycopg2 decodes the json result, unlike QuerySet.explain()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            finally:
+                cursor.execute("RESET enable_seqscan; RESET enable_sort")
+        return list(_postgresql_problems(plan[0]["Plan"]))
+
+    if connection.vendor == "sqlite":
+        problems = []
+        for line in queryset.explain().splitlines():
+            # Each line is "<id> <parent> <unused> <detail>"
+            detail = line.split(" ", 3)[-1]
+            if re.match(r"SCAN (?!.*USING (COVERING )?INDEX)", detail):
+                problems.append(detail)
+            elif detail.startswith("USE TEMP B-TREE"):
+                problems.append(detail)
+        return problems
+
+    raise SkipTest(f"No query plan checks for {connection.vendor}")
+
+
+class QueryPlanMixin:
+    """TestCase mixin asserting that querysets are served from indexes"""
+
+    def assertIndexedPlan(self, queryset):
+        """Fail if the plan of `queryset` has a full table scan or a sort"""
+        problems = query_plan_problems(queryset)
+        if problems:
+            self.fail(
+                f"Query plan is not index-only for:\n{queryset.query}\n"
+                + "\n".join(problems)
+            )
@@ -0,0 +1,67 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe
+from recipe.benchmark import percentile
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test the API benchmark management command"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_benchmark_writes_json_report(self):
+        """Test that the benchmark reports every endpoint and rolls back its data"""
+        with tempfile.NamedTemporaryFile(mode="r", suffix=".json") as report_file:
+            call_command(
+                "benchmark_api",
+                "--users=1",
+                "--recipes=5",
+                "--tags=3",
+                "--ingredients=3",
+                "--iterations=2",
+                "--warmup=0",
+                f"--output={report_file.name}",
+                stdout=StringIO(),
+            )
+            report = json.load(report_file)
+
+        self.assertIn("recipe:recipe-list", report["endpoints"])
+        self.assertIn("users:me", report["endpoints"])
+        for name, stats in report["endpoints"].items():
+            self.assertEqual(stats["iterations"], 2)
+            self.assertIn("p99", stats["latency_ms"])
+            self.assertGreaterEqual(stats["queries"]["max"], 0)
+            self.assertTrue(
+                all(int(code) < 400 for code in stats["status_codes"]), (name, stats)
+            )
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_report_to_stdout(self):
+        """Test that `--output -` writes the JSON report to the command's stdout"""
+        stdout = StringIO()
+        call_command(
+            "benchmark_api",
+            "--users=1",
+            "--recipes=2",
+            "--tags=1",
+            "--ingredients=1",
+            "--iterations=1",
+            "--warmup=0",
+            "--only=recipe:recipe-list",
+            "--output=-",
+            stdout=stdout,
+        )
+
+        report = json.loads(stdout.getvalue())
+        self.assertIn("recipe:recipe-list", report["endpoints"])
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.tests.query_budget import QueryBudgetMixin
+
+TAGS_BULK_URL = reverse("recipe:tag-bulk-create")
+INGREDIENTS_BULK_URL = reverse("recipe:ingredient-bulk-create")
+RECIPES_BULK_URL = reverse("recipe:recipe-bulk-create")
+
+
+class PublicBulkApiTests(TestCase):
+    """Test the publicly available bulk API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Test that login is required for bulk creating recipes"""
+        res: Response = self.client.post(RECIPES_BULK_URL, [], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTests(QueryBudgetMixin, TestCase):
+    """Test the authorized usage of the bulk API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """Test creating several tags in one request"""
+        payload = [{"name": "Vegan"}, {"name": "Dessert"}]
+
+        res: Response = self.client.post(TAGS_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tags = Tag.objects.filter(user=self.user).order_by("id")
+        self.assertEqual([tag.name for tag in tags], ["Vegan", "Dessert"])
+        self.assertEqual(
+            [result["data"]["id"] for result in res.data["results"]],
+            [tag.id for tag in tags],
+        )
+
+    def test_bulk_create_ingredients_partial_failure(self):
+        """Test that invalid items are reported without blocking valid ones"""
+        payload = [{"name": "Salt"}, {"name": ""}]
+
+        res: Response = self.client.post(INGREDIENTS_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        first, second = res.data["results"]
+        self.assertEqual(first["status"], status.HTTP_201_CREATED)
+        self.assertEqual(second["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", second["errors"])
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_recipes(self):
+        """Test creating recipes along with their tags and ingredients"""
+        tag = Tag.objects.create(user=self.user, name="Thai")
+        ingredient = Ingredient.objects.create(user=self.user, name="Rice")
+        payload = [
+            {
+                "title": f"Recipe {index}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [tag.id],
+                "ingredients": [ingredient.id],
+            }
+            for index in range(3)
+        ]
+
+        res: Response = self.client.post(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        for result in res.data["results"]:
+            recipe = Recipe.objects.get(id=result["data"]["id"])
+            self.assertEqual(list(recipe.tags.all()), [tag])
+            self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_bulk_create_recipes_rejects_foreign_tags(self):
+        """Test that recipes can't reference another user's tags"""
+        another_user = get_user_model().objects.create_user(
+            "another@example.com", "anotherpassword"
+        )
+        tag = Tag.objects.create(user=another_user, name="Private")
+        payload = [{"title": "Recipe", "time_minutes": 5, "price": "1.00", "tags": [tag.id]}]
+
+        res: Response = self.client.post(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data["results"][0]["errors"])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_recipes_query_budget(self):
+        """Test that the query count doesn't grow with the number of recipes"""
+        tags = [Tag.objects.create(user=self.user, name=f"Tag {i}") for i in range(5)]
+        payload = [
+            {
+                "title": f"Recipe {index}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [tag.id for tag in tags],
+            }
+            for index in range(50)
+        ]
+
+        # Includes a count query and an UPDATE per model for recipe_count,
+        # rehashing the ingredient sets for the similarity index and counting
+        # prices and durations for the stats
+        with self.assertMaxQueries(23):
+            res: Response = self.client.post(RECIPES_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 50)
+
+    @override_settings(BULK_CREATE_MAX_ITEMS=1)
+    def test_bulk_create_too_many_items(self):
+        """Test that oversized batches are rejected"""
+        payload = [{"name": "Vegan"}, {"name": "Dessert"}]
+
+        res: Response = self.client.post(TAGS_BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_create_empty_list(self):
+        """Test that an empty batch is a no-op"""
+        for url in (TAGS_BULK_URL, INGREDIENTS_BULK_URL, RECIPES_BULK_URL):
+            res: Response = self.client.post(url, [], format="json")
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(res.data, {"results": []})
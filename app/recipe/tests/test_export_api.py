@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+EXPORT_URL = reverse("recipe:recipe-export")
+
+
+def read_lines(res):
+    return b"".join(res.streaming_content).decode().splitlines()
+
+
+class PublicExportApiTests(TestCase):
+    """Test the publicly available export API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Test that login is required for exporting recipes"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTests(TestCase):
+    """Test exporting the authorized user's recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Thai curry", time_minutes=30, price="12.50"
+        )
+        self.recipe.tags.add(
+            Tag.objects.create(user=self.user, name="Vegan"),
+            Tag.objects.create(user=self.user, name="Dinner"),
+        )
+        self.recipe.ingredients.add(Ingredient.objects.create(user=self.user, name="Tofu"))
+        Recipe.objects.create(user=self.user, title="Toast", time_minutes=5, price="1.00")
+
+    def test_export_ndjson(self):
+        """Test that recipes are streamed as one JSON document per line"""
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res["Content-Type"].startswith("application/x-ndjson"))
+        records = [json.loads(line) for line in read_lines(res)]
+        self.assertEqual([record["title"] for record in records], ["Thai curry", "Toast"])
+        self.assertEqual(
+            records[0],
+            {
+                "id": self.recipe.id,
+                "title": "Thai curry",
+                "time_minutes": 30,
+                "price": "12.50",
+                "link": "",
+                "tags": ["Dinner", "Vegan"],
+                "ingredients": ["Tofu"],
+            },
+        )
+        self.assertEqual(records[1]["tags"], [])
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with a header line"""
+        res = self.client.get(EXPORT_URL, {"file_format": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("recipes.csv", res["Content-Disposition"])
+        rows = list(csv.DictReader(read_lines(res)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["title"], "Thai curry")
+        self.assertEqual(rows[0]["tags"], "Dinner|Vegan")
+        self.assertEqual(rows[0]["ingredients"], "Tofu")
+
+    def test_export_limited_to_user(self):
+        """Test that only the user's own recipes are exported"""
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        Recipe.objects.create(user=other, title="Secret", time_minutes=5, price="1.00")
+
+        res = self.client.get(EXPORT_URL)
+
+        titles = [json.loads(line)["title"] for line in read_lines(res)]
+        self.assertNotIn("Secret", titles)
+
+    def test_invalid_format(self):
+        """Test that unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {"file_format": "xml"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_in_chunks(self):
+        """Test that each chunk of recipes costs a fixed number of queries"""
+        for index in range(3):
+            Recipe.objects.create(
+                user=self.user, title=f"Extra {index}", time_minutes=5, price="1.00"
+            )
+        res = self.client.get(EXPORT_URL)
+
+        # Three chunks of recipes, tags and ingredients
+        with self.assertNumQueries(9):
+            lines = read_lines(res)
+        self.assertEqual(len(lines), 5)
+        ids = [json.loads(line)["id"] for line in lines]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_export_command(self):
+        """Test exporting recipes to a file from the command line"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.csv")
+            call_command(
+                "export_recipes", self.user.email, "--format=csv", f"--output={path}",
+                stderr=io.StringIO(),
+            )
+            with open(path, newline="") as stream:
+                rows = list(csv.DictReader(stream))
+
+        self.assertEqual([row["title"] for row in rows], ["Thai curry", "Toast"])
+
+    def test_command_writes_to_stdout(self):
+        """Test that the command writes NDJSON through its stdout"""
+        out = io.StringIO()
+
+        call_command("export_recipes", self.user.email, stdout=out)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record["title"] for record in records], ["Thai curry", "Toast"])
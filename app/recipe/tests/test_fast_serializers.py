@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeImageVariant, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+TAGS_URL = reverse("recipe:tag-list")
+INGREDIENTS_URL = reverse("recipe:ingredient-list")
+
+
+class FastSerializerTests(TestCase):
+    """Test that the fast path renders exactly what the serializers render"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user("test@example.com", "password123")
+        tags = [Tag.objects.create(user=cls.user, name=f"Tag {i}") for i in range(4)]
+        ingredients = [
+            Ingredient.objects.create(user=cls.user, name=f"Ingredient {i}") for i in range(4)
+        ]
+        for index in range(12):
+            recipe = Recipe.objects.create(
+                user=cls.user,
+                title=f"Recipe {index}",
+                time_minutes=index * 5,
+                price=f"{index}.{index % 10}",
+                link="https://example.com" if index % 2 else "",
+            )
+            recipe.tags.add(*tags[index % 4:])
+            recipe.ingredients.add(*reversed(ingredients[: index % 3]))
+            if index % 3 == 0:
+                RecipeImageVariant.objects.create(
+                    recipe=recipe, name="thumbnail", status=RecipeImageVariant.READY,
+                    image=f"uploads/variants/{index}-thumbnail.jpg", width=150, height=100,
+                )
+                RecipeImageVariant.objects.create(recipe=recipe, name="medium")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertSameContent(self, url, params):
+        """Fetch a URL with and without the fast path and compare the bodies"""
+        responses = []
+        for fast in (False, True):
+            cache.clear()
+            with override_settings(RECIPE_FAST_SERIALIZERS=fast):
+                responses.append(self.client.get(url, params))
+        slow, fast = responses
+        self.assertEqual(slow.status_code, 200)
+        self.assertEqual(slow.content, fast.content)
+
+    def test_recipe_lists(self):
+        """Test recipe lists across fields, expansions, filters and paging"""
+        tag = Tag.objects.filter(user=self.user).first()
+        for params in (
+            {},
+            {"page_size": 5},
+            {"paginate": 0},
+            {"fields": "id,price,image_variants"},
+            {"expand": "tags,ingredients"},
+            {"fields": "title", "expand": "ingredients"},
+            {"tags": tag.id},
+            {"search": "Recipe 1"},
+        ):
+            with self.subTest(**params):
+                self.assertSameContent(RECIPES_URL, params)
+
+    def test_attr_lists(self):
+        """Test tag and ingredient lists in every ordering"""
+        for url in (TAGS_URL, INGREDIENTS_URL):
+            for params in ({}, {"assigned_only": 1}, {"ordering": "most_used", "page_size": 2}):
+                with self.subTest(url=url, **params):
+                    self.assertSameContent(url, params)
+
+    def test_next_page(self):
+        """Test that following a cursor gives the same page both ways"""
+        res = self.client.get(RECIPES_URL, {"page_size": 5})
+
+        self.assertSameContent(res.data["next"], {})
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from core.models import Recipe, RecipeImageVariant
+from recipe.images import orphaned_images, release_image, schedule_variants
+
+
+@override_settings(
+    RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_VARIANTS={}, RECIPE_IMAGE_RELEASE_GRACE=0
+)
+class ImageStorageTests(TransactionTestCase):
+    """Test sharing and releasing content-addressed recipe images"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media_root = directory.name
+
+        self.user = get_user_model().objects.create_user("test@example.com", "password123")
+
+    def _recipe(self, content=None):
+        recipe = Recipe.objects.create(
+            user=self.user, title="Toast", time_minutes=5, price="1.00"
+        )
+        if content is not None:
+            recipe.image.save("toast.jpg", ContentFile(content))
+        return recipe
+
+    def _path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def test_identical_images_share_a_file(self):
+        """Test that the same image uploaded twice is stored once"""
+        first = self._recipe(b"photo")
+        second = self._recipe(b"photo")
+
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_replaced_image_deleted(self):
+        """Test that replacing an image deletes the previous file"""
+        recipe = self._recipe(b"old")
+        old_path = recipe.image.path
+
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        recipe.image.save("new.jpg", ContentFile(b"new"))
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+
+    def test_shared_image_kept_until_last_reference(self):
+        """Test that a shared file survives until no recipe references it"""
+        first = self._recipe(b"photo")
+        second = self._recipe(b"photo")
+        path = first.image.path
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        second.image.save("new.jpg", ContentFile(b"new"))
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(RECIPE_IMAGE_RELEASE_GRACE=60)
+    def test_reused_image_not_released(self):
+        """Test that an image saved again for a pending recipe survives its release"""
+        recipe = self._recipe(b"photo")
+        name, path = recipe.image.name, recipe.image.path
+        hour_ago = time.time() - 3600
+        os.utime(path, (hour_ago, hour_ago))
+
+        # Another recipe saves the same bytes but hasn't committed its row yet
+        storage = Recipe._meta.get_field("image").storage
+        self.assertEqual(storage.save("uploads/recipe/toast.jpg", ContentFile(b"photo")), name)
+        Recipe.objects.filter(pk=recipe.pk).update(image="")
+        release_image(name)
+
+        self.assertTrue(os.path.exists(path))
+        self.assertGreater(os.stat(path).st_mtime, hour_ago)
+
+        os.utime(path, (hour_ago, hour_ago))
+        release_image(name)
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(RECIPE_IMAGE_VARIANTS={"thumbnail": (5, 5)})
+    def test_shared_image_variants_shared(self):
+        """Test that recipes sharing an image share its variant files"""
+        buffer = BytesIO()
+        Image.new("RGB", (20, 8)).save(buffer, format="JPEG")
+        first = self._recipe(buffer.getvalue())
+        second = self._recipe(buffer.getvalue())
+        schedule_variants(first)
+        schedule_variants(second)
+
+        variants = RecipeImageVariant.objects.order_by("recipe_id")
+        self.assertEqual(
+            [variant.status for variant in variants], [RecipeImageVariant.READY] * 2
+        )
+        self.assertEqual(len({variant.image.name for variant in variants}), 1)
+        self.assertEqual([(variant.width, variant.height) for variant in variants], [(5, 2)] * 2)
+        path = variants[0].image.path
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_orphaned_images_command(self):
+        """Test that only unreferenced files past the minimum age are deleted"""
+        recipe = self._recipe(b"photo")
+        orphans = ["uploads/recipe/ab/orphan.jpg", "uploads/variants/orphan-thumbnail.jpg"]
+        for name in orphans + ["uploads/recipe/cd/recent.jpg", "other/file.txt"]:
+            os.makedirs(os.path.dirname(self._path(name)), exist_ok=True)
+            with open(self._path(name), "wb") as stream:
+                stream.write(b"orphan")
+        hour_ago = time.time() - 3600
+        for name in orphans + [recipe.image.name]:
+            os.utime(self._path(name), (hour_ago, hour_ago))
+
+        self.assertCountEqual(
+            orphaned_images(min_age=60), [(name, len(b"orphan")) for name in orphans]
+        )
+        self.assertCountEqual(
+            orphaned_images(min_age=60, batch_size=1),
+            [(name, len(b"orphan")) for name in orphans],
+        )
+
+        out = StringIO()
+        call_command("delete_orphaned_images", "--min-age=60", stdout=out)
+
+        self.assertIn("Deleted 2 orphaned files (12 bytes)", out.getvalue())
+        for name in orphans:
+            self.assertFalse(os.path.exists(self._path(name)))
+        for name in (recipe.image.name, "uploads/recipe/cd/recent.jpg", "other/file.txt"):
+            self.assertTrue(os.path.exists(self._path(name)))
+
+    def test_dry_run(self):
+        """Test that a dry run lists orphans without deleting them"""
+        name = "uploads/recipe/ab/orphan.jpg"
+        os.makedirs(os.path.dirname(self._path(name)))
+        with open(self._path(name), "wb") as stream:
+            stream.write(b"orphan")
+
+        out = StringIO()
+        call_command("delete_orphaned_images", "--min-age=0", "--dry-run", stdout=out)
+
+        self.assertIn(name, out.getvalue())
+        self.assertTrue(os.path.exists(self._path(name)))
@@ -0,0 +1,201 @@
+import io
+import json
+import os
+import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+from recipe import importer
+
+IMPORT_URL = reverse("recipe:recipe-import")
+
+
+def ndjson_file(records, name="recipes.ndjson"):
+    content = "".join(json.dumps(record) + "\n" for record in records)
+    return SimpleUploadedFile(name, content.encode())
+
+
+def sample_record(title="Thai curry", **params):
+    record = {"title": title, "time_minutes": 30, "price": "12.50"}
+    record.update(params)
+    return record
+
+
+class PublicImportApiTests(TestCase):
+    """Test the publicly available import API"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_login_required(self):
+        """Test that login is required for importing recipes"""
+        res: Response = self.client.post(IMPORT_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateImportApiTests(TestCase):
+    """Test importing recipes for the authorized user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_import_ndjson(self):
+        """Test importing recipes and resolving tags and ingredients by name"""
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        records = [
+            sample_record(tags=["Vegan", "Dinner"], ingredients=["Tofu"]),
+            sample_record("Toast", link="https://example.com"),
+        ]
+
+        res: Response = self.client.post(IMPORT_URL, {"file": ndjson_file(records)})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {"created": 2, "failed": 0, "errors": []})
+        curry = Recipe.objects.get(user=self.user, title="Thai curry")
+        self.assertIn(vegan, curry.tags.all())
+        self.assertEqual(
+            sorted(curry.tags.values_list("name", flat=True)), ["Dinner", "Vegan"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(list(curry.ingredients.values_list("name", flat=True)), ["Tofu"])
+        toast = Recipe.objects.get(user=self.user, title="Toast")
+        self.assertEqual(toast.link, "https://example.com")
+
+    def test_import_csv(self):
+        """Test importing recipes from a CSV file"""
+        content = (
+            "title,time_minutes,price,link,tags,ingredients\n"
+            "Thai curry,30,12.50,,Vegan|Dinner,Tofu|Rice\n"
+        )
+        upload = SimpleUploadedFile("recipes.csv", content.encode())
+
+        res: Response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEqual(res.data["created"], 1)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list("name", flat=True)), ["Rice", "Tofu"]
+        )
+
+    @skipUnless(connection.vendor == "postgresql", "Recipes are only COPYed on PostgreSQL")
+    def test_copy_empty_link(self):
+        """Test that COPY loads a recipe without a link as an empty string"""
+        importer.import_recipes(self.user, importer.parse_ndjson([json.dumps(sample_record())]))
+
+        self.assertEqual(Recipe.objects.get(user=self.user).link, "")
+
+    def test_copy_columns_cover_required_fields(self):
+        """Test that COPY writes every NOT NULL column of Recipe"""
+        required = {f.column for f in Recipe._meta.concrete_fields if not f.null}
+
+        self.assertEqual(required - set(importer.RECIPE_COPY_COLUMNS), set())
+
+    def test_import_sets_snapshot_token(self):
+        """Test that imported recipes get their own snapshot token"""
+        records = [sample_record(), sample_record("Toast")]
+        importer.import_recipes(self.user, importer.parse_ndjson(map(json.dumps, records)))
+
+        tokens = Recipe.objects.filter(user=self.user).values_list("snapshot_token", flat=True)
+        self.assertEqual(len(set(tokens)), 2)
+        self.assertNotIn(None, tokens)
+
+    def test_invalid_records_reported(self):
+        """Test that invalid records are skipped and reported by position"""
+        content = json.dumps(sample_record()) + "\nnot json\n" + json.dumps({"title": ""})
+        upload = SimpleUploadedFile("recipes.ndjson", content.encode())
+
+        res: Response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["failed"], 2)
+        self.assertEqual([error["record"] for error in res.data["errors"]], [2, 3])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_unknown_format_rejected(self):
+        """Test that files of an unknown format are rejected"""
+        upload = SimpleUploadedFile("recipes.xml", b"<recipes/>")
+
+        res: Response = self.client.post(IMPORT_URL, {"file": upload})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_file_required(self):
+        """Test that a file must be uploaded"""
+        res: Response = self.client.post(IMPORT_URL, {})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_bumps_data_version(self):
+        """Test that an import invalidates the user's cached responses"""
+        version = self.user.data_version
+
+        self.client.post(IMPORT_URL, {"file": ndjson_file([sample_record(tags=["New"])])})
+
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.data_version, version)
+
+    @override_settings(RECIPE_IMPORT_BATCH_SIZE=2)
+    def test_failed_batch_keeps_earlier_batches(self):
+        """Test that every batch is committed in its own transaction"""
+        records = [sample_record(f"Recipe {index}") for index in range(5)]
+        load_batch = importer._load_batch
+        calls = []
+
+        def failing_load_batch(user, batch):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise DatabaseError("boom")
+            return load_batch(user, batch)
+
+        with patch("recipe.importer._load_batch", failing_load_batch):
+            with self.assertRaises(DatabaseError):
+                importer.import_recipes(
+                    self.user, importer.parse_ndjson(json.dumps(r) for r in records)
+                )
+
+        titles = Recipe.objects.filter(user=self.user).values_list("title", flat=True)
+        self.assertEqual(sorted(titles), ["Recipe 0", "Recipe 1"])
+
+    def test_command_round_trip(self):
+        """Test that an export can be imported back with the command"""
+        recipe = Recipe.objects.create(
+            user=self.user, title="Thai curry", time_minutes=30, price="12.50"
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, name="Vegan"))
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name="Tofu"))
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recipes.csv")
+            call_command(
+                "export_recipes", self.user.email, "--format=csv", f"--output={path}",
+                stderr=io.StringIO(),
+            )
+            out = io.StringIO()
+            call_command("import_recipes", other.email, path, "--batch-size=1", stdout=out)
+
+        self.assertIn("Imported 1 recipes, 0 failed", out.getvalue())
+        imported = Recipe.objects.get(user=other)
+        self.assertEqual(imported.title, "Thai curry")
+        self.assertEqual(list(imported.tags.values_list("name", flat=True)), ["Vegan"])
+        self.assertEqual(imported.tags.get().user, other)
+        self.assertEqual(
+            list(imported.ingredients.values_list("name", flat=True)), ["Tofu"]
+        )
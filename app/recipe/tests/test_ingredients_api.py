@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -47,7 +48,7 @@ class PrivateIngredientApiTest(TestCase):
         )
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializered_ingredients.data)
+        self.assertEqual(res.data["results"], serializered_ingredients.data)
 
     def test_ingredients_limited_to_user(self):
         """Test that ingredients returned are for the current authenticated user only"""
@@ -61,8 +62,8 @@ class PrivateIngredientApiTest(TestCase):
 
         res: Response = self.client.get(INGREDIENT_URL)
 
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0].get("name"), ingredient.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0].get("name"), ingredient.name)
 
     def test_create_ingredient_successful(self):
         """Test that creating a new ingredient is successful"""
@@ -90,13 +91,14 @@ class PrivateIngredientApiTest(TestCase):
             title="Apple crumble", time_minutes=5, price=10.00, user=self.user
         )
         recipe.ingredients.add(ingredient_one)
+        ingredient_one.refresh_from_db()
 
         res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
 
         serializer1 = IngredientSerializer(ingredient_one)
         serializer2 = IngredientSerializer(ingredient_two)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_retrieve_ingredient_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -112,4 +114,20 @@ class PrivateIngredientApiTest(TestCase):
 
         res: Response = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_deleting_recipe_invalidates_cache(self):
+        """Test that deleting a recipe refreshes the assigned_only listing"""
+        cache.clear()
+        ingredient = Ingredient.objects.create(user=self.user, name="Eggs")
+        recipe = Recipe.objects.create(
+            title="Omelette", time_minutes=5, price=3.00, user=self.user
+        )
+        recipe.ingredients.add(ingredient)
+        res: Response = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
+        self.assertEqual(len(res.data["results"]), 1)
+
+        recipe.delete()
+        res = self.client.get(INGREDIENT_URL, {"assigned_only": 1})
+
+        self.assertEqual(res.data["results"], [])
@@ -0,0 +1,160 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageVariant
+from recipe.media import parse_range
+
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    return f"/media/{name}"
+
+
+class ParseRangeTests(TestCase):
+    """Test parsing of Range headers"""
+
+    def test_ranges(self):
+        """Test the ranges of the header forms we support"""
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 100))
+        self.assertIsNone(parse_range("items=0-1", 100))
+        self.assertEqual(parse_range("bytes=10-19", 100), (10, 19))
+        self.assertEqual(parse_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=90-500", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(parse_range("bytes=-500", 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        """Test that ranges outside the file are rejected"""
+        for header in ("bytes=100-", "bytes=20-10", "bytes=-0"):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 100)
+
+
+class MediaViewTests(TestCase):
+    """Test serving recipe media to its owner"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        self.media_root = directory.name
+
+        self.user = get_user_model().objects.create_user("test@example.com", "password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Toast", time_minutes=5, price="1.00"
+        )
+        self.recipe.image.save("toast.jpg", ContentFile(CONTENT))
+        self.url = media_url(self.recipe.image.name)
+
+    def test_serve_whole_file(self):
+        """Test that the owner gets the file with long-lived cache headers"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertEqual(res["Content-Length"], str(len(CONTENT)))
+        self.assertEqual(res["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertIn("private", res["Cache-Control"])
+
+    def test_serve_range(self):
+        """Test that a single byte range is answered with 206"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT[100:200])
+        self.assertEqual(res["Content-Length"], "100")
+        self.assertEqual(res["Content-Range"], f"bytes 100-199/{len(CONTENT)}")
+
+    def test_serve_suffix_range(self):
+        """Test that a suffix range returns the end of the file"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=-24")
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT[-24:])
+
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end of the file is answered with 416"""
+        res = self.client.get(self.url, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+
+        self.assertEqual(res.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(res["Content-Range"], f"bytes */{len(CONTENT)}")
+
+    def test_if_range_mismatch(self):
+        """Test that a stale If-Range validator gets the whole file"""
+        res = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), CONTENT)
+
+    def test_not_modified(self):
+        """Test that a matching ETag is answered with 304"""
+        etag = self.client.get(self.url)["ETag"]
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_serve_variant(self):
+        """Test that image variants are served to the recipe owner"""
+        variant = RecipeImageVariant.objects.create(recipe=self.recipe, name="thumbnail")
+        variant.image.save("toast-thumbnail.jpg", ContentFile(b"thumbnail"))
+
+        res = self.client.get(media_url(variant.image.name))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(res.streaming_content), b"thumbnail")
+
+    def test_other_users_media_not_found(self):
+        """Test that media of other users is indistinguishable from missing media"""
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        self.client.force_authenticate(other)
+
+        res: Response = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_paths_not_found(self):
+        """Test that files outside the recipe uploads are never served"""
+        for name in ("uploads/recipe/missing.jpg", f"x/../{self.recipe.image.name}", "a.txt"):
+            with self.subTest(name=name):
+                res: Response = self.client.get(media_url(name))
+
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_login_required(self):
+        """Test that media requires authentication"""
+        res: Response = APIClient().get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(MEDIA_SERVE_MODE="x-accel-redirect")
+    def test_x_accel_redirect(self):
+        """Test that nginx is told to send the file"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res["X-Accel-Redirect"], f"/protected-media/{self.recipe.image.name}")
+        self.assertIn("immutable", res["Cache-Control"])
+
+    @override_settings(MEDIA_SERVE_MODE="x-sendfile")
+    def test_x_sendfile(self):
+        """Test that the proxy is given the absolute path of the file"""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["X-Sendfile"], self.recipe.image.path)
@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe
+
+PANTRY_URL = reverse("recipe:recipe-pantry")
+
+
+class PrivatePantryApiTests(TestCase):
+    """Test the pantry endpoint"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.rice, self.egg, self.leek, self.salt = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ("Rice", "Egg", "Leek", "Salt")
+        )
+
+    def create_recipe(self, title, *ingredients, user=None):
+        recipe = Recipe.objects.create(
+            user=user or self.user, title=title, time_minutes=10, price=5.00
+        )
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def get_pantry(self, *ingredients, **params):
+        params["ingredients"] = ",".join(str(ingredient.id) for ingredient in ingredients)
+        return self.client.get(PANTRY_URL, params)
+
+    def test_recipes_within_pantry(self):
+        """Test that only recipes made entirely from the pantry are returned"""
+        fried_rice = self.create_recipe("Fried rice", self.rice, self.egg)
+        plain_rice = self.create_recipe("Plain rice", self.rice)
+        self.create_recipe("Leek soup", self.leek, self.salt)
+
+        res: Response = self.get_pantry(self.rice, self.egg)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in res.data], [plain_rice.id, fried_rice.id])
+        self.assertEqual([item["missing"] for item in res.data], [0, 0])
+
+    def test_missing_ingredients_allowed(self):
+        """Test allowing missing ingredients and ranking by how many are missing"""
+        soup = self.create_recipe("Leek soup", self.leek, self.salt, self.rice)
+        omelette = self.create_recipe("Omelette", self.egg, self.salt)
+        rice = self.create_recipe("Rice", self.rice)
+
+        res: Response = self.get_pantry(self.rice, self.salt, max_missing=2)
+
+        self.assertEqual([item["id"] for item in res.data], [rice.id, omelette.id, soup.id])
+        self.assertEqual([item["missing"] for item in res.data], [0, 1, 1])
+        self.assertEqual(res.data[2]["missing_ingredients"], [self.leek.id])
+
+    def test_pantry_limited_to_user(self):
+        """Test that other users' recipes are never returned"""
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        self.create_recipe("Their rice", self.rice, user=other)
+
+        res: Response = self.get_pantry(self.rice)
+
+        self.assertEqual(res.data, [])
+
+    def test_pantry_follows_writes(self):
+        """Test that recipe changes are reflected in later pantry queries"""
+        recipe = self.create_recipe("Fried rice", self.rice)
+        res: Response = self.get_pantry(self.rice)
+        self.assertEqual(len(res.data), 1)
+
+        recipe.ingredients.add(self.egg)
+        res = self.get_pantry(self.rice)
+
+        self.assertEqual(res.data, [])
+
+    def test_invalid_params(self):
+        """Test that malformed pantry queries are rejected"""
+        for params in (
+            {"ingredients": "rice"},
+            {"max_missing": "one"},
+            {"max_missing": -1},
+            {"max_missing": 99},
+        ):
+            with self.subTest(**params):
+                res: Response = self.client.get(PANTRY_URL, params)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(list(res.data), list(params))
+
+    def test_recipe_deleted_after_index_read(self):
+        """Test that recipes gone by the time they are fetched are skipped"""
+        recipe = self.create_recipe("Plain rice", self.rice)
+        deleted_id = recipe.id + 1000
+
+        with patch(
+            "recipe.index.RecipeIndex.pantry",
+            return_value=[(recipe.id, 0), (deleted_id, 0)],
+        ):
+            res: Response = self.get_pantry(self.rice)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in res.data], [recipe.id])
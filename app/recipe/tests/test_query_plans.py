@@ -0,0 +1,95 @@
+import random
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Ingredient, Recipe, RecipeMinHashBand, Tag
+from recipe.benchmark import seed_dataset
+from recipe.tests.query_plan import QueryPlanMixin
+from recipe.views import IngredientViewSet, RecipeViewSet, TagViewSet
+
+
+def list_queryset(viewset_class, user, params=None):
+    """Return the queryset a viewset's list action runs for one page"""
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = viewset_class(request=request, format_kwarg=None, action="list", kwargs={})
+    queryset = view.get_queryset()
+    ordering = view.paginator.get_ordering(request, queryset, view)
+    return queryset.order_by(*ordering)[: view.paginator.page_size + 1]
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Test that the hot queries are served from indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, _ = seed_dataset(
+            users=2, recipes=200, tags=20, ingredients=50, rng=random.Random(0)
+        )
+
+    def test_attr_list_plans(self):
+        """Test listing tags and ingredients in every supported way"""
+        for viewset_class in (TagViewSet, IngredientViewSet):
+            for params in (
+                {},
+                {"ordering": "most_used"},
+                {"ordering": "most_used", "assigned_only": 1},
+            ):
+                with self.subTest(viewset=viewset_class.__name__, **params):
+                    self.assertIndexedPlan(list_queryset(viewset_class, self.user, params))
+
+    @skipIf(
+        connection.vendor == "sqlite",
+        "SQLite can't match partial indexes against bound query parameters",
+    )
+    def test_assigned_only_plan(self):
+        """Test listing assigned tags and ingredients alphabetically"""
+        for viewset_class in (TagViewSet, IngredientViewSet):
+            with self.subTest(viewset=viewset_class.__name__):
+                self.assertIndexedPlan(
+                    list_queryset(viewset_class, self.user, {"assigned_only": 1})
+                )
+
+    def test_recipe_list_plans(self):
+        """Test listing recipes, with and without tag and ingredient filters"""
+        tag = Tag.objects.filter(user=self.user).first()
+        ingredient = Ingredient.objects.filter(user=self.user).first()
+        for params in (
+            {},
+            {"tags": tag.id},
+            {"tags": tag.id, "ingredients": ingredient.id, "match": "all"},
+        ):
+            with self.subTest(**params):
+                self.assertIndexedPlan(list_queryset(RecipeViewSet, self.user, params))
+
+    def test_export_chunk_plan(self):
+        """Test reading a chunk of recipes for an export"""
+        self.assertIndexedPlan(
+            Recipe.objects.filter(user=self.user, id__gt=10).order_by("id")[:1000]
+        )
+
+    def test_relation_plans(self):
+        """Test following the recipe M2M relations in both directions"""
+        recipe_ids = list(
+            Recipe.objects.filter(user=self.user).values_list("id", flat=True)[:100]
+        )
+        tag = Tag.objects.filter(user=self.user).first()
+        ingredient = Ingredient.objects.filter(user=self.user).first()
+
+        self.assertIndexedPlan(Tag.objects.filter(recipe__in=recipe_ids))
+        self.assertIndexedPlan(Ingredient.objects.filter(recipe__in=recipe_ids))
+        self.assertIndexedPlan(tag.recipe_set.values_list("id", flat=True))
+        self.assertIndexedPlan(ingredient.recipe_set.values_list("id", flat=True))
+
+    def test_similarity_candidate_plan(self):
+        """Test looking up the recipes sharing an LSH bucket"""
+        band = RecipeMinHashBand.objects.filter(user=self.user).first()
+        self.assertIndexedPlan(
+            RecipeMinHashBand.objects.filter(
+                user=self.user, band=band.band, bucket=band.bucket
+            ).values_list("recipe_id", flat=True)
+        )
@@ -0,0 +1,129 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def sample_recipe(user, title="Sample recipe"):
+    return Recipe.objects.create(user=user, title=title, time_minutes=10, price=5.00)
+
+
+class RecipeCountTests(TestCase):
+    """Test that tags and ingredients count the recipes using them"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.vegan = Tag.objects.create(user=self.user, name="Vegan")
+        self.dessert = Tag.objects.create(user=self.user, name="Dessert")
+        self.salt = Ingredient.objects.create(user=self.user, name="Salt")
+
+    def assertCounts(self, **expected):
+        counts = {
+            obj.name.lower(): obj.recipe_count
+            for model in (Tag, Ingredient)
+            for obj in model.objects.all()
+        }
+        self.assertEqual({name: counts[name] for name in expected}, expected)
+
+    def test_add_and_remove(self):
+        """Test counting links added to and removed from a recipe"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan, self.dessert)
+        recipe.tags.add(self.vegan)
+        recipe.ingredients.add(self.salt)
+        self.assertCounts(vegan=1, dessert=1, salt=1)
+
+        recipe.tags.remove(self.vegan)
+        recipe.tags.remove(self.vegan)
+        self.assertCounts(vegan=0, dessert=1, salt=1)
+
+    def test_reverse_add_and_clear(self):
+        """Test counting links changed from the tag side"""
+        recipes = [sample_recipe(self.user, f"Recipe {index}") for index in range(3)]
+        self.vegan.recipe_set.add(*recipes)
+        self.assertCounts(vegan=3)
+
+        self.vegan.recipe_set.remove(recipes[0])
+        self.assertCounts(vegan=2)
+
+        self.vegan.recipe_set.clear()
+        self.assertCounts(vegan=0)
+
+    def test_clear_and_set(self):
+        """Test counting links replaced on a recipe"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+
+        recipe.tags.set([self.dessert])
+        self.assertCounts(vegan=0, dessert=1)
+
+        recipe.tags.clear()
+        self.assertCounts(vegan=0, dessert=0)
+
+    def test_recipe_delete(self):
+        """Test that deleting recipes releases their tags and ingredients"""
+        recipes = [sample_recipe(self.user, f"Recipe {index}") for index in range(2)]
+        for recipe in recipes:
+            recipe.tags.add(self.vegan)
+            recipe.ingredients.add(self.salt)
+
+        recipes[0].delete()
+        self.assertCounts(vegan=1, salt=1)
+
+        Recipe.objects.all().delete()
+        self.assertCounts(vegan=0, salt=0)
+
+    def test_update_through_api(self):
+        """Test that replacing a recipe's tags through the API updates counts"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        client.patch(
+            reverse("recipe:recipe-detail", args=[recipe.id]),
+            {"tags": [self.dessert.id]},
+            format="json",
+        )
+
+        self.assertCounts(vegan=0, dessert=1)
+
+    def test_bulk_create(self):
+        """Test that bulk created recipes are counted"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = [
+            {
+                "title": f"Recipe {index}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [self.vegan.id] if index % 2 else [self.vegan.id, self.dessert.id],
+                "ingredients": [self.salt.id],
+            }
+            for index in range(5)
+        ]
+
+        client.post(reverse("recipe:recipe-bulk-create"), payload, format="json")
+
+        self.assertCounts(vegan=5, dessert=3, salt=5)
+
+    def test_repair_command(self):
+        """Test that the repair command recomputes drifted counts"""
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.vegan)
+        Tag.objects.update(recipe_count=7)
+        Ingredient.objects.update(recipe_count=2)
+
+        out = io.StringIO()
+        call_command("repair_recipe_counts", stdout=out)
+
+        self.assertCounts(vegan=1, dessert=0, salt=0)
+        self.assertIn("Tags: 2 repaired", out.getvalue())
+        self.assertIn("Ingredients: 1 repaired", out.getvalue())
@@ -1,17 +1,25 @@
 import os
 import tempfile
+from datetime import timedelta
 from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
 from PIL import Image
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
-from core.models import Ingredient, Recipe, Tag
+from core.models import Ingredient, Recipe, RecipeImageVariant, Tag
+from recipe import images
 from recipe.serializers import ModelSerializer, RecipeDetailSerializer, RecipeSerializer
+from recipe.tests.query_budget import QueryBudgetMixin
 
 RECIPES_URL = reverse("recipe:recipe-list")
 
@@ -78,7 +86,7 @@ class PrivateRecipeApiTests(TestCase):
         serializer: ModelSerializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_recipes_limited_to_current_user(self):
         """Test that retrieved recipes are limited for the current authorized user only"""
@@ -95,8 +103,8 @@ class PrivateRecipeApiTests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertTrue(res.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertTrue(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_view_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -225,6 +233,10 @@ class RecipeImageUploadTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn("image", res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        self.assertEqual(
+            {variant["name"]: variant["status"] for variant in res.data["image_variants"]},
+            {"medium": RecipeImageVariant.PENDING, "thumbnail": RecipeImageVariant.PENDING},
+        )
 
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
@@ -235,6 +247,18 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=99)
+    def test_upload_image_too_many_pixels(self):
+        """Test that images over the pixel limit are rejected"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format="JPEG")
+            ntf.seek(0)
+            res: Response = self.client.post(url, {"image": ntf}, format="multipart")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pixels", res.data["image"][0])
+
     def test_filter_recipes_by_tags(self):
         """Test returning recipes with specific tags"""
         recipe_one: Recipe = sample_recipe(user=self.user, title="Thai Curry")
@@ -256,9 +280,9 @@ class RecipeImageUploadTests(TestCase):
         serializer_two = RecipeSerializer(recipe_two)
         serializer_three = RecipeSerializer(recipe_three)
 
-        self.assertIn(serializer_one.data, res.data)
-        self.assertIn(serializer_two.data, res.data)
-        self.assertNotIn(serializer_three.data, res.data)
+        self.assertIn(serializer_one.data, res.data["results"])
+        self.assertIn(serializer_two.data, res.data["results"])
+        self.assertNotIn(serializer_three.data, res.data["results"])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -278,6 +302,550 @@ class RecipeImageUploadTests(TestCase):
         serializer1 = RecipeSerializer(recipe_one)
         serializer2 = RecipeSerializer(recipe_two)
         serializer3 = RecipeSerializer(recipe_three)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertIn(serializer2.data, res.data["results"])
+        self.assertNotIn(serializer3.data, res.data["results"])
+
+
+@override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_RELEASE_GRACE=0)
+class RecipeImageVariantTests(TransactionTestCase):
+    """Test generating resized variants of uploaded recipe images"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe: Recipe = sample_recipe(user=self.user)
+
+    def tearDown(self):
+        for variant in RecipeImageVariant.objects.exclude(image=""):
+            variant.image.delete()
+        self.recipe.image.delete()
+
+    def _upload_image(self, size=(800, 400)):
+        """Upload a JPEG of the given size to the test recipe"""
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as ntf:
+            Image.new("RGB", size).save(ntf, format="JPEG")
+            ntf.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id), {"image": ntf}, format="multipart"
+            )
+
+    def test_upload_generates_variants(self):
+        """Test that uploading an image generates each configured variant"""
+        self._upload_image()
+
+        res: Response = self.client.get(recipe_detail_url(self.recipe.id))
+
+        variants = {variant["name"]: variant for variant in res.data["image_variants"]}
+        self.assertEqual(variants["thumbnail"]["status"], RecipeImageVariant.READY)
+        self.assertEqual(
+            (variants["thumbnail"]["width"], variants["thumbnail"]["height"]), (150, 75)
+        )
+        self.assertEqual(
+            (variants["medium"]["width"], variants["medium"]["height"]), (600, 300)
+        )
+        for variant in RecipeImageVariant.objects.filter(recipe=self.recipe):
+            self.assertTrue(os.path.exists(variant.image.path))
+
+    def test_replacing_image_regenerates_variants(self):
+        """Test that a new upload replaces the previous variants"""
+        self._upload_image()
+        old_paths = [
+            variant.image.path for variant in RecipeImageVariant.objects.all()
+        ]
+        self.recipe.refresh_from_db()
+        self.recipe.image.delete()
+
+        self._upload_image(size=(100, 100))
+
+        self.assertEqual(RecipeImageVariant.objects.count(), 2)
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        thumbnail = RecipeImageVariant.objects.get(name="thumbnail")
+        self.assertEqual((thumbnail.width, thumbnail.height), (100, 100))
+
+    def test_unreadable_image_marks_variants_failed(self):
+        """Test that variants of an unreadable original are marked as failed"""
+        self.recipe.image = "uploads/recipe/missing.jpg"
+        self.recipe.save()
+        RecipeImageVariant.objects.create(recipe=self.recipe, name="thumbnail")
+
+        images.generate_variants(self.recipe.id, self.recipe.image.name)
+
+        variant = RecipeImageVariant.objects.get(recipe=self.recipe)
+        self.assertEqual(variant.status, RecipeImageVariant.FAILED)
+        self.recipe.image = None
+
+
+class RecipeMatchFilterTests(TestCase):
+    """Test filtering recipes on all or any of the requested tags and ingredients"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = sample_tag(user=self.user, name="Vegan")
+        self.quick = sample_tag(user=self.user, name="Quick")
+        self.tofu = sample_ingredient(user=self.user, name="Tofu")
+
+        self.both = sample_recipe(user=self.user, title="Tofu scramble")
+        self.both.tags.add(self.vegan, self.quick)
+        self.both.ingredients.add(self.tofu)
+        self.vegan_only = sample_recipe(user=self.user, title="Lentil stew")
+        self.vegan_only.tags.add(self.vegan)
+
+    def _filter(self, **params):
+        """Return the ids of the recipes matching the filter parameters"""
+        res: Response = self.client.get(RECIPES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {recipe["id"] for recipe in res.data["results"]}
+
+    def test_match_all_tags(self):
+        """Test that match=all returns only recipes having every tag"""
+        ids = self._filter(tags=f"{self.vegan.id},{self.quick.id}", match="all")
+
+        self.assertEqual(ids, {self.both.id})
+
+    def test_match_any_tags(self):
+        """Test that match=any returns recipes having at least one tag"""
+        ids = self._filter(tags=f"{self.vegan.id},{self.quick.id}", match="any")
+
+        self.assertEqual(ids, {self.both.id, self.vegan_only.id})
+
+    def test_match_all_tags_and_ingredients(self):
+        """Test that match=all requires the tags and the ingredients"""
+        ids = self._filter(tags=f"{self.vegan.id}", ingredients=f"{self.tofu.id}", match="all")
+
+        self.assertEqual(ids, {self.both.id})
+
+    def test_index_follows_recipe_writes(self):
+        """Test that changing a recipe's tags is reflected in later filters"""
+        params = {"tags": f"{self.vegan.id},{self.quick.id}", "match": "all"}
+        self.assertEqual(self._filter(**params), {self.both.id})
+
+        self.vegan_only.tags.add(self.quick)
+        self.both.tags.remove(self.quick)
+
+        self.assertEqual(self._filter(**params), {self.vegan_only.id})
+
+    def test_index_kept_across_other_writes(self):
+        """Test that writes leaving tags and ingredients alone reuse the index"""
+        params = {"tags": f"{self.vegan.id}", "match": "any"}
+        self._filter(**params)
+
+        with patch("recipe.index.RecipeIndex.build") as build:
+            self.both.title = "Silken tofu scramble"
+            self.both.save()
+            self._filter(**params)
+            build.assert_not_called()
+
+        self.both.delete()
+        self.assertEqual(self._filter(**params), {self.vegan_only.id})
+
+    @override_settings(RECIPE_INDEX_MAX_IDS=0)
+    def test_large_matches_filtered_in_database(self):
+        """Test that matches past the id list limit give the same recipes"""
+        tags = f"{self.vegan.id},{self.quick.id}"
+        self.assertEqual(self._filter(tags=tags, match="all"), {self.both.id})
+        self.assertEqual(
+            self._filter(tags=tags, match="any"), {self.both.id, self.vegan_only.id}
+        )
+        self.assertEqual(
+            self._filter(tags=tags, ingredients=f"{self.tofu.id}", match="any"),
+            {self.both.id},
+        )
+
+    def test_invalid_match_mode(self):
+        """Test that an unknown match mode is rejected"""
+        res: Response = self.client.get(
+            RECIPES_URL, {"tags": f"{self.vegan.id}", "match": "most"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes by title"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_search_recipes_by_title(self):
+        """Test that only recipes matching every search word are returned"""
+        curry = sample_recipe(user=self.user, title="Thai green curry")
+        sample_recipe(user=self.user, title="Green salad")
+        sample_recipe(user=self.user, title="Fish and chips")
+
+        res: Response = self.client.get(RECIPES_URL, {"search": "green curry"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([recipe["id"] for recipe in res.data["results"]], [curry.id])
+
+    def test_search_ranks_closest_titles_first(self):
+        """Test that exact title matches are ranked before partial ones"""
+        exact = sample_recipe(user=self.user, title="Pancakes")
+        sample_recipe(user=self.user, title="Banana pancakes")
+        prefix = sample_recipe(user=self.user, title="Pancakes with syrup")
+
+        res: Response = self.client.get(RECIPES_URL, {"search": "pancakes"})
+
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids[:2], [exact.id, prefix.id])
+        self.assertEqual(len(ids), 3)
+
+    def test_search_results_paginated(self):
+        """Test paging through search results walks every match once by rank"""
+        recipes = [sample_recipe(user=self.user, title=f"Pancakes {i}") for i in range(5)]
+        exact = sample_recipe(user=self.user, title="Pancakes")
+
+        ids = []
+        res: Response = self.client.get(RECIPES_URL, {"search": "pancakes", "page_size": 2})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(recipe["id"] for recipe in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, [exact.id] + [recipe.id for recipe in reversed(recipes)])
+
+    def test_search_tied_results_paginated(self):
+        """Test that recipes tied on relevance are paged through once each"""
+        recipes = [sample_recipe(user=self.user, title="Pancakes") for _ in range(6)]
+
+        ids = []
+        res: Response = self.client.get(RECIPES_URL, {"search": "pancakes", "page_size": 2})
+        for _ in range(len(recipes)):
+            ids.extend(recipe["id"] for recipe in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    @skipUnless(connection.vendor == "postgresql", "Trigram matching needs PostgreSQL")
+    def test_search_matches_misspelt_terms(self):
+        """Test that a misspelt word still finds the recipe"""
+        curry = sample_recipe(user=self.user, title="Thai green curry")
+        sample_recipe(user=self.user, title="Green salad")
+
+        res: Response = self.client.get(RECIPES_URL, {"search": "grean curry"})
+
+        self.assertEqual([recipe["id"] for recipe in res.data["results"]], [curry.id])
+
+    def test_search_limited_to_current_user(self):
+        """Test that searching never returns other users' recipes"""
+        another_user = get_user_model().objects.create_user(
+            "another@example.com", "anotherpassword"
+        )
+        sample_recipe(user=another_user, title="Pancakes")
+
+        res: Response = self.client.get(RECIPES_URL, {"search": "pancakes"})
+
+        self.assertEqual(res.data["results"], [])
+
+
+class RecipeConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling of the recipe endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def test_unchanged_list_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 from a single query"""
+        res: Response = self.client.get(RECIPES_URL)
+        etag = res["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_write_changes_etag(self):
+        """Test that changing a recipe's tags invalidates the cached copy"""
+        res: Response = self.client.get(recipe_detail_url(self.recipe.id))
+        etag = res["ETag"]
+
+        self.recipe.tags.add(sample_tag(user=self.user))
+        res = self.client.get(recipe_detail_url(self.recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(len(res.data["tags"]), 1)
+
+    def test_variant_generation_changes_etag(self):
+        """Test that a variant generated in the background invalidates the list"""
+        # Keep the recipe id apart from its owner's id
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        sample_recipe(user=other)
+        sample_recipe(user=other)
+        recipe = sample_recipe(user=self.user)
+        self.assertNotEqual(recipe.pk, self.user.pk)
+        variant = RecipeImageVariant.objects.create(recipe=recipe, name="thumbnail")
+        res: Response = self.client.get(RECIPES_URL)
+        etag = res["ETag"]
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        data_version, other_data_version = self.user.data_version, other.data_version
+
+        variant.status = RecipeImageVariant.READY
+        variant.save(update_fields=["status"])
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.data_version, data_version + 1)
+        self.assertEqual(other.data_version, other_data_version)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"][0]["image_variants"][0]["status"], RecipeImageVariant.READY
+        )
+
+    def test_etag_differs_between_queries(self):
+        """Test that different filters of the same data get different ETags"""
+        res_all: Response = self.client.get(RECIPES_URL)
+        res_filtered: Response = self.client.get(RECIPES_URL, {"tags": "1"})
+
+        self.assertNotEqual(res_all["ETag"], res_filtered["ETag"])
+
+    def test_if_modified_since(self):
+        """Test that If-Modified-Since is honoured using Last-Modified"""
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            data_modified_at=timezone.now() - timedelta(seconds=5)
+        )
+        res: Response = self.client.get(RECIPES_URL)
+        last_modified = res["Last-Modified"]
+
+        res = self.client.get(RECIPES_URL, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_no_last_modified_within_write_second(self):
+        """Test that no date is validated while a write in its second can follow"""
+        now = timezone.now().replace(microsecond=500000)
+        get_user_model().objects.filter(pk=self.user.pk).update(data_modified_at=now)
+
+        # Keep the clock within the second of the write for the whole request
+        with patch("django.utils.timezone.now", return_value=now):
+            res: Response = self.client.get(
+                RECIPES_URL, HTTP_IF_MODIFIED_SINCE=http_date(now.timestamp())
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Last-Modified", res)
+
+
+class RecipeQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test that recipe endpoints run a fixed number of queries"""
+
+    # The user's data version, the recipes, then one prefetch per relation
+    QUERY_BUDGET = 5
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user)
+        self.ingredient = sample_ingredient(user=self.user)
+
+    def _create_recipes(self, count):
+        """Create `count` recipes, each with a tag and an ingredient"""
+        for index in range(count):
+            recipe = sample_recipe(user=self.user, title=f"Recipe {index}")
+            recipe.tags.add(self.tag, sample_tag(user=self.user, name=f"Tag {index}"))
+            recipe.ingredients.add(self.ingredient)
+
+    def test_list_recipes_query_budget(self):
+        """Test listing recipes does not scale queries with the result size"""
+        self._create_recipes(10)
+
+        # The first list also stores the snapshots of the recipes on the page
+        with self.assertMaxQueries(self.QUERY_BUDGET + 1):
+            res: Response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_list_recipes_from_snapshots_query_budget(self):
+        """Test listing recipes with stored snapshots joins them in one query"""
+        self._create_recipes(10)
+        self.client.get(RECIPES_URL)
+
+        # The user's data version, then the recipes joined to their snapshots
+        with self.assertMaxQueries(2):
+            res: Response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 10)
+
+    def test_retrieve_recipe_query_budget(self):
+        """Test retrieving a recipe detail runs a fixed number of queries"""
+        self._create_recipes(1)
+        recipe = Recipe.objects.get(user=self.user)
+
+        with self.assertMaxQueries(self.QUERY_BUDGET):
+            res: Response = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tags"]), 2)
+
+    def test_filter_recipes_query_budget(self):
+        """Test filtering recipes by tags and ingredients stays within budget"""
+        self._create_recipes(10)
+
+        # Plus one query per relation to build the user's recipe index
+        with self.assertMaxQueries(self.QUERY_BUDGET + 2):
+            res: Response = self.client.get(
+                RECIPES_URL,
+                {"tags": f"{self.tag.id}", "ingredients": f"{self.ingredient.id}"},
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 10)
+
+
+class RecipePaginationTests(TestCase):
+    """Test cursor pagination of the recipe listing"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            sample_recipe(user=self.user, title=f"Recipe {index}") for index in range(5)
+        ]
+
+    def test_paginate_recipes_with_cursor(self):
+        """Test following cursors walks every recipe exactly once, newest first"""
+        res: Response = self.client.get(RECIPES_URL, {"page_size": 2})
+
+        seen = []
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            seen.extend(recipe["id"] for recipe in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        expected = [recipe.id for recipe in reversed(self.recipes)]
+        self.assertEqual(seen, expected)
+
+    def test_pagination_opt_out_returns_list(self):
+        """Test that `paginate=0` returns the bare list of recipes"""
+        res: Response = self.client.get(RECIPES_URL, {"paginate": 0})
+
+        recipes = Recipe.objects.filter(user=self.user).order_by("-id")
+        serializer = RecipeSerializer(recipes, many=True)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_pagination_opt_out_accepts_booleans(self):
+        """Test that `paginate` takes true and false as well as 1 and 0"""
+        res: Response = self.client.get(RECIPES_URL, {"paginate": "false"})
+        self.assertEqual(len(res.data), len(self.recipes))
+
+        res = self.client.get(RECIPES_URL, {"paginate": "true"})
+        self.assertIn("results", res.data)
+
+    def test_pagination_opt_out_invalid(self):
+        """Test that an unknown `paginate` value is rejected"""
+        res: Response = self.client.get(RECIPES_URL, {"paginate": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("paginate", res.data)
+
+
+class RecipeSparseFieldsTests(QueryBudgetMixin, TestCase):
+    """Test trimming and expanding recipe fields"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.tag = sample_tag(user=self.user)
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(sample_ingredient(user=self.user))
+
+    def test_fields_trim_output(self):
+        """Test that only the requested fields are rendered"""
+        # The user's data version and the recipes, nothing is prefetched
+        with self.assertMaxQueries(2) as context:
+            res: Response = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [{"id": self.recipe.id, "title": self.recipe.title}]
+        )
+        self.assertNotIn('"price"', context.captured_queries[-1]["sql"])
+
+    def test_expand_inlines_relations(self):
+        """Test that expanded relations are rendered as nested objects"""
+        res: Response = self.client.get(RECIPES_URL, {"expand": "tags"})
+
+        recipe = res.data["results"][0]
+        self.assertEqual(
+            recipe["tags"], [{"id": self.tag.id, "name": self.tag.name, "recipe_count": 1}]
+        )
+        self.assertEqual(len(recipe["ingredients"]), 1)
+        self.assertIsInstance(recipe["ingredients"][0], int)
+
+    def test_fields_and_expand(self):
+        """Test that expanded relations are kept when trimming fields"""
+        res: Response = self.client.get(
+            recipe_detail_url(self.recipe.id), {"fields": "title", "expand": "ingredients"}
+        )
+
+        self.assertEqual(set(res.data), {"title", "ingredients"})
+        self.assertEqual(res.data["ingredients"][0]["name"], "Cinnamon")
+
+    def test_unknown_field_rejected(self):
+        """Test that asking for a field that doesn't exist is an error"""
+        res: Response = self.client.get(RECIPES_URL, {"fields": "id,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+
+    def test_unexpandable_field_rejected(self):
+        """Test that expanding anything but an expandable relation is an error"""
+        for expand in ("secret", "title"):
+            with self.subTest(expand=expand):
+                res: Response = self.client.get(RECIPES_URL, {"expand": expand})
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(list(res.data), ["expand"])
+
+    def test_fields_ignored_on_writes(self):
+        """Test that writes always validate and return the full recipe"""
+        res: Response = self.client.patch(
+            f"{recipe_detail_url(self.recipe.id)}?fields=id",
+            {"title": "Renamed"},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["title"], "Renamed")
+        self.assertIn("tags", res.data)
@@ -0,0 +1,150 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeMinHashBand
+from recipe import similarity
+
+
+def similar_url(recipe_id):
+    return reverse("recipe:recipe-similar", args=[recipe_id])
+
+
+class SimilarityTests(TestCase):
+    """Test the MinHash helpers"""
+
+    def test_identical_sets_share_every_bucket(self):
+        """Test that equal ingredient sets hash to the same buckets"""
+        first = list(similarity.band_buckets(similarity.minhash({1, 2, 3})))
+        second = list(similarity.band_buckets(similarity.minhash({3, 2, 1})))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), similarity.BANDS)
+
+    def test_similar_sets_share_a_bucket(self):
+        """Test that sets at a Jaccard similarity of 0.5 are found as candidates"""
+        found = 0
+        for offset in range(0, 2000, 20):
+            first = set(range(offset, offset + 6))
+            second = set(range(offset, offset + 4)) | {offset + 6, offset + 7}
+            first_buckets = set(similarity.band_buckets(similarity.minhash(first)))
+            second_buckets = set(similarity.band_buckets(similarity.minhash(second)))
+            found += bool(first_buckets & second_buckets)
+
+        self.assertEqual(found, 100)
+
+    def test_signature_estimates_jaccard(self):
+        """Test that matching signature rows estimate the Jaccard similarity"""
+        first, second = set(range(0, 40)), set(range(20, 60))
+        rows = zip(similarity.minhash(first), similarity.minhash(second))
+        estimate = sum(a == b for a, b in rows) / (similarity.BANDS * similarity.ROWS_PER_BAND)
+
+        self.assertAlmostEqual(estimate, similarity.jaccard(first, second), delta=0.15)
+
+
+class PrivateSimilarApiTests(TestCase):
+    """Test the similar recipes endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@example.com", "password123"
+        )
+        self.client.force_authenticate(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"Ingredient {index}")
+            for index in range(8)
+        ]
+
+    def create_recipe(self, title, ingredient_indexes, user=None):
+        user = user or self.user
+        recipe = Recipe.objects.create(user=user, title=title, time_minutes=10, price=5.00)
+        recipe.ingredients.add(*(self.ingredients[index] for index in ingredient_indexes))
+        return recipe
+
+    def test_similar_recipes_ranked_by_jaccard(self):
+        """Test that similar recipes are returned most similar first"""
+        recipe = self.create_recipe("Curry", [0, 1, 2, 3])
+        close = self.create_recipe("Close", [0, 1, 2, 3, 4])
+        closer = self.create_recipe("Closer", [0, 1, 2, 3])
+        self.create_recipe("Different", [5, 6, 7])
+
+        res: Response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in res.data], [closer.id, close.id])
+        self.assertEqual([item["similarity"] for item in res.data], [1.0, 0.8])
+        self.assertEqual(res.data[0]["title"], "Closer")
+
+    def test_similar_limited_to_user(self):
+        """Test that other users' recipes are never suggested"""
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        recipe = self.create_recipe("Curry", [0, 1])
+        self.create_recipe("Copy", [0, 1], user=other)
+
+        res: Response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.data, [])
+
+    def test_index_follows_ingredient_changes(self):
+        """Test that editing a recipe's ingredients updates its buckets"""
+        recipe = self.create_recipe("Curry", [0, 1, 2])
+        other = self.create_recipe("Stew", [5, 6, 7])
+
+        self.client.patch(
+            reverse("recipe:recipe-detail", args=[other.id]),
+            {"ingredients": [self.ingredients[index].id for index in (0, 1, 2)]},
+            format="json",
+        )
+        res: Response = self.client.get(similar_url(recipe.id))
+        self.assertEqual([item["id"] for item in res.data], [other.id])
+
+        other.ingredients.clear()
+        res = self.client.get(similar_url(recipe.id))
+        self.assertEqual(res.data, [])
+        self.assertFalse(RecipeMinHashBand.objects.filter(recipe=other).exists())
+
+    def test_index_follows_ingredient_delete(self):
+        """Test that deleting an ingredient rehashes the recipes using it"""
+        recipe = self.create_recipe("Curry", [0, 1, 2, 3])
+        other = self.create_recipe("Stew", [0, 1, 2, 4])
+
+        self.ingredients[4].delete()
+        res: Response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual([item["id"] for item in res.data], [other.id])
+        self.assertEqual(res.data[0]["similarity"], 0.75)
+
+    def test_bulk_created_recipes_indexed(self):
+        """Test that bulk created recipes can be found as similar"""
+        recipe = self.create_recipe("Curry", [0, 1, 2])
+        payload = [
+            {
+                "title": "Bulk curry",
+                "time_minutes": 10,
+                "price": "5.00",
+                "ingredients": [self.ingredients[index].id for index in (0, 1, 2)],
+            }
+        ]
+        self.client.post(reverse("recipe:recipe-bulk-create"), payload, format="json")
+
+        res: Response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual([item["title"] for item in res.data], ["Bulk curry"])
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command restores missing buckets"""
+        recipe = self.create_recipe("Curry", [0, 1])
+        other = self.create_recipe("Stew", [0, 1])
+        RecipeMinHashBand.objects.all().delete()
+
+        call_command("rebuild_similarity_index", stdout=io.StringIO())
+        res: Response = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual([item["id"] for item in res.data], [other.id])
@@ -0,0 +1,158 @@
+import uuid
+from io import StringIO
+from urllib.parse import parse_qsl, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Ingredient, Recipe, RecipeImageVariant, RecipeSnapshot, Tag
+
+RECIPES_URL = reverse("recipe:recipe-list")
+
+
+class RecipeSnapshotTests(TestCase):
+    """Test the recipe list served from pre-rendered snapshots"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("test@example.com", "password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name="Vegan")
+        self.ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+        self.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f"Recipe {index}", time_minutes=5, price="2.50"
+            )
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+            self.recipes.append(recipe)
+
+    def get_list(self, params=None, **settings):
+        """Fetch the recipe list bypassing the response cache"""
+        cache.clear()
+        with override_settings(**settings):
+            return self.client.get(RECIPES_URL, params or {})
+
+    def assertMatchesSerializers(self, params=None):
+        """Check the snapshot list is byte for byte the serialized one"""
+        res: Response = self.get_list(params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for setting in ("RECIPE_SNAPSHOTS", "RECIPE_FAST_SERIALIZERS"):
+            self.assertEqual(res.content, self.get_list(params, **{setting: False}).content)
+        return res
+
+    def test_list_stores_missing_snapshots(self):
+        """Test listing recipes renders and stores the snapshots they lack"""
+        self.assertFalse(RecipeSnapshot.objects.exists())
+
+        self.assertMatchesSerializers()
+
+        self.assertEqual(
+            set(RecipeSnapshot.objects.values_list("recipe_id", flat=True)),
+            {recipe.id for recipe in self.recipes},
+        )
+
+    def test_list_pages_match_serializers(self):
+        """Test paginated and unpaginated lists match the serializers"""
+        res: Response = self.assertMatchesSerializers({"page_size": 2})
+        self.assertMatchesSerializers(dict(parse_qsl(urlsplit(res.data["next"]).query)))
+        self.assertMatchesSerializers({"paginate": 0})
+
+    def test_snapshot_of_older_token_not_served(self):
+        """Test a snapshot stored from replaced data is rendered again"""
+        self.get_list()
+        recipe = self.recipes[0]
+        # A concurrent list stored a snapshot from data the recipe no longer has
+        RecipeSnapshot.objects.filter(recipe=recipe).update(body='{"id":0}')
+        Recipe.objects.filter(pk=recipe.pk).update(snapshot_token=uuid.uuid4())
+
+        res: Response = self.assertMatchesSerializers()
+
+        self.assertNotIn(0, [item["id"] for item in res.data["results"]])
+        snapshot = RecipeSnapshot.objects.get(recipe=recipe)
+        self.assertEqual(snapshot.token, Recipe.objects.get(pk=recipe.pk).snapshot_token)
+        self.assertNotEqual(snapshot.body, '{"id":0}')
+
+    def test_snapshot_invalidated_on_update(self):
+        """Test updating a recipe drops its snapshot"""
+        self.get_list()
+        recipe = self.recipes[0]
+        recipe.title = "Renamed"
+        recipe.save()
+
+        self.assertFalse(RecipeSnapshot.objects.filter(recipe=recipe).exists())
+        res: Response = self.assertMatchesSerializers()
+        self.assertIn("Renamed", [item["title"] for item in res.data["results"]])
+
+    def test_snapshot_invalidated_on_relation_change(self):
+        """Test changing the tags or ingredients of a recipe drops its snapshot"""
+        self.get_list()
+        other = Tag.objects.create(user=self.user, name="Quick")
+        self.recipes[0].tags.add(other)
+        other.recipe_set.add(self.recipes[1])
+        self.ingredient.recipe_set.clear()
+
+        self.assertEqual(RecipeSnapshot.objects.count(), 0)
+        self.assertMatchesSerializers()
+
+    def test_snapshots_invalidated_on_attr_delete(self):
+        """Test deleting a tag drops the snapshots of the recipes using it"""
+        self.get_list()
+        self.recipes[0].tags.clear()
+        self.get_list()
+
+        self.tag.delete()
+
+        self.assertEqual(
+            list(RecipeSnapshot.objects.values_list("recipe_id", flat=True)),
+            [self.recipes[0].id],
+        )
+        self.assertMatchesSerializers()
+
+    def test_snapshot_invalidated_on_variant_change(self):
+        """Test image variants becoming ready drop the recipe's snapshot"""
+        variant = RecipeImageVariant.objects.create(recipe=self.recipes[0], name="thumbnail")
+        self.get_list()
+
+        variant.status = RecipeImageVariant.READY
+        variant.image = "uploads/variants/thumbnail.jpg"
+        variant.save()
+
+        self.assertFalse(RecipeSnapshot.objects.filter(recipe=self.recipes[0]).exists())
+        self.assertMatchesSerializers()
+
+    def test_other_params_bypass_snapshots(self):
+        """Test filtered, sparse and browsable lists are rendered as before"""
+        self.get_list()
+        RecipeSnapshot.objects.update(body="{}")
+
+        for params in ({"fields": "id,title"}, {"search": "Recipe"}, {"tags": self.tag.id}):
+            res: Response = self.get_list(params)
+            self.assertNotIn(b"{}", res.content)
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT="application/json; indent=2")
+        self.assertNotIn(b"{}", res.content)
+
+    def test_check_command_repairs_stale_snapshots(self):
+        """Test the check command reports and rewrites corrupted snapshots"""
+        self.get_list()
+        RecipeSnapshot.objects.filter(recipe=self.recipes[1]).update(body='{"id":0}')
+
+        out = StringIO()
+        call_command("check_recipe_snapshots", stdout=out)
+        self.assertIn(f"Stale snapshot of recipe {self.recipes[1].id}", out.getvalue())
+        self.assertTrue(RecipeSnapshot.objects.filter(body='{"id":0}').exists())
+
+        call_command("check_recipe_snapshots", "--repair", stdout=StringIO())
+        self.assertFalse(RecipeSnapshot.objects.filter(body='{"id":0}').exists())
+        self.assertMatchesSerializers()
+
+        out = StringIO()
+        call_command("check_recipe_snapshots", stdout=out)
+        self.assertIn("0 stale snapshot(s) found", out.getvalue())
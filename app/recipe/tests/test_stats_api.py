@@ -0,0 +1,154 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeValueCount, Tag
+from recipe.stats import rebuild_stats
+
+STATS_URL = reverse("recipe:recipe-stats")
+RECIPES_BULK_URL = reverse("recipe:recipe-bulk-create")
+
+
+def stored_counts(user):
+    """Return {(field, value): count} of the user's non-zero counts"""
+    rows = RecipeValueCount.objects.filter(user=user, count__gt=0)
+    return {(row.field, row.value): row.count for row in rows}
+
+
+class PublicStatsApiTests(TestCase):
+    """Test the publicly available stats API"""
+
+    def test_login_required(self):
+        """Test that login is required to read stats"""
+        res: Response = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RECIPE_STATS_PERCENTILES=(10, 50, 90), RECIPE_STATS_HISTOGRAM_BINS=3)
+class PrivateStatsApiTests(TestCase):
+    """Test the authorized user stats API"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("test@example.com", "password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _recipe(self, price, time_minutes, user=None):
+        return Recipe.objects.create(
+            user=user or self.user, title="Recipe", time_minutes=time_minutes, price=price
+        )
+
+    def assertCountsMatchRebuild(self):
+        """Assert that the maintained counts equal counts rebuilt from scratch"""
+        maintained = stored_counts(self.user)
+        rebuild_stats()
+        self.assertEqual(maintained, stored_counts(self.user))
+
+    def test_no_recipes(self):
+        """Test the stats of a user without recipes"""
+        res: Response = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["recipe_count"], 0)
+        self.assertIsNone(res.data["price"])
+        self.assertIsNone(res.data["time_minutes"])
+        self.assertEqual(res.data["top_tags"], [])
+
+    def test_distributions(self):
+        """Test the summary of the prices and durations of the user's recipes"""
+        for index in range(1, 11):
+            self._recipe(f"{index}.00", index * 10)
+        self._recipe("99.00", 999, user=get_user_model().objects.create_user("o@x.com"))
+
+        res: Response = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data["recipe_count"], 10)
+        price = res.data["price"]
+        self.assertEqual((price["min"], price["max"], price["mean"]), ("1.00", "10.00", "5.50"))
+        self.assertEqual(price["percentiles"], {"p10": "1.00", "p50": "5.00", "p90": "9.00"})
+        self.assertEqual(
+            price["histogram"],
+            [
+                {"start": "1.00", "end": "4.00", "count": 3},
+                {"start": "4.00", "end": "7.00", "count": 3},
+                {"start": "7.00", "end": "10.00", "count": 4},
+            ],
+        )
+        minutes = res.data["time_minutes"]
+        self.assertEqual((minutes["min"], minutes["max"], minutes["mean"]), (10, 100, 55))
+        self.assertEqual(minutes["percentiles"], {"p10": 10, "p50": 50, "p90": 90})
+
+    def test_single_value(self):
+        """Test that identical values fall in a single bin"""
+        self._recipe("3.50", 20)
+        self._recipe("3.50", 20)
+
+        res: Response = self.client.get(STATS_URL)
+
+        self.assertEqual(
+            res.data["price"]["histogram"], [{"start": "3.50", "end": "3.50", "count": 2}]
+        )
+
+    def test_top_tags(self):
+        """Test that the most used tags come first"""
+        rare, common = (Tag.objects.create(user=self.user, name=name) for name in "AB")
+        Tag.objects.create(user=self.user, name="Unused")
+        for index in range(3):
+            recipe = self._recipe("1.00", 5)
+            recipe.tags.add(common)
+            if index == 0:
+                recipe.tags.add(rare)
+
+        res: Response = self.client.get(STATS_URL)
+
+        self.assertEqual([tag["name"] for tag in res.data["top_tags"]], ["B", "A"])
+        self.assertEqual(res.data["top_tags"][0]["recipe_count"], 3)
+
+    def test_counts_follow_writes(self):
+        """Test that updates, deletes and bulk inserts keep the counts exact"""
+        first = self._recipe("1.00", 10)
+        second = self._recipe("2.00", 20)
+
+        self.client.patch(
+            reverse("recipe:recipe-detail", args=[first.id]), {"price": "3.00"}
+        )
+        self.assertEqual(
+            stored_counts(self.user),
+            {("price", 200): 1, ("price", 300): 1, ("time_minutes", 10): 1,
+             ("time_minutes", 20): 1},
+        )
+
+        deferred = Recipe.objects.only("id", "user").get(pk=second.pk)
+        deferred.time_minutes = 30
+        deferred.save()
+        second.delete()
+        self.client.post(
+            RECIPES_BULK_URL,
+            [{"title": "Bulk", "time_minutes": 10, "price": "3.00"} for _ in range(2)],
+            format="json",
+        )
+
+        self.assertEqual(
+            stored_counts(self.user), {("price", 300): 3, ("time_minutes", 10): 3}
+        )
+        self.assertCountsMatchRebuild()
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command restores lost counts"""
+        self._recipe("1.00", 10)
+        RecipeValueCount.objects.all().delete()
+
+        out = StringIO()
+        call_command("rebuild_recipe_stats", "--user", self.user.email, stdout=out)
+
+        self.assertEqual(
+            stored_counts(self.user), {("price", 100): 1, ("time_minutes", 10): 1}
+        )
+        self.assertIn("rebuilt", out.getvalue())
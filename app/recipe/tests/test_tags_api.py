@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.core.cache import cache
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.response import Response
@@ -46,7 +47,7 @@ class PrivateTagsApiTest(TestCase):
         serializered_tags: ModelSerializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializered_tags.data)
+        self.assertEqual(res.data["results"], serializered_tags.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the current authenticated user only"""
@@ -59,8 +60,8 @@ class PrivateTagsApiTest(TestCase):
         res: Response = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0].get("name"), tag.name)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0].get("name"), tag.name)
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -88,13 +89,14 @@ class PrivateTagsApiTest(TestCase):
             title="Coriander eggs on toast", time_minutes=10, price=5.00, user=self.user
         )
         recipe.tags.add(tag1)
+        tag1.refresh_from_db()
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data["results"])
+        self.assertNotIn(serializer2.data, res.data["results"])
 
     def test_retrieve_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items"""
@@ -110,4 +112,99 @@ class PrivateTagsApiTest(TestCase):
 
         res: Response = self.client.get(TAGS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_paginate_tags_with_duplicate_names(self):
+        """Test that paging tags sharing a name neither skips nor repeats any"""
+        tags = [Tag.objects.create(user=self.user, name="Vegan") for _ in range(3)]
+        tags.append(Tag.objects.create(user=self.user, name="Dessert"))
+
+        res: Response = self.client.get(TAGS_URL, {"page_size": 1})
+        seen = []
+        while True:
+            seen.extend(tag["id"] for tag in res.data["results"])
+            if not res.data["next"]:
+                break
+            res = self.client.get(res.data["next"])
+
+        expected = list(
+            Tag.objects.filter(user=self.user)
+            .order_by("name", "id")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_creating_tag_changes_list_etag(self):
+        """Test that creating a tag invalidates cached tag listings"""
+        res: Response = self.client.get(TAGS_URL)
+        etag = res["ETag"]
+
+        self.client.post(TAGS_URL, {"name": "Vegan"})
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_list_served_from_cache(self):
+        """Test that an unchanged tag listing is served from the cache"""
+        cache.clear()
+        Tag.objects.create(user=self.user, name="Vegan")
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            res: Response = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"][0]["name"], "Vegan")
+
+    def test_order_tags_by_most_used(self):
+        """Test listing tags ordered by the number of recipes using them"""
+        tags = [Tag.objects.create(user=self.user, name=name) for name in "ABC"]
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                title=f"Recipe {index}", time_minutes=5, price=5.00, user=self.user
+            )
+            recipe.tags.add(*tags[2 - index:])
+
+        res: Response = self.client.get(TAGS_URL, {"ordering": "most_used"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag["name"] for tag in res.data["results"]], ["C", "B", "A"])
+        self.assertEqual([tag["recipe_count"] for tag in res.data["results"]], [3, 2, 1])
+
+    def test_paginate_tags_by_most_used_with_ties(self):
+        """Test that paging tags with equal counts neither skips nor repeats any"""
+        tags = [Tag.objects.create(user=self.user, name=name) for name in "BCD"]
+        params = {"ordering": "most_used", "page_size": 1}
+
+        res: Response = self.client.get(TAGS_URL, params)
+        seen = [tag["id"] for tag in res.data["results"]]
+        # Sorts before the rows already served, so it must not shift the next pages
+        Tag.objects.create(user=self.user, name="A")
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            seen.extend(tag["id"] for tag in res.data["results"])
+
+        self.assertEqual(seen, [tag.id for tag in tags])
+
+    def test_order_tags_invalid(self):
+        """Test that unknown orderings are rejected"""
+        res: Response = self.client.get(TAGS_URL, {"ordering": "newest"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_assigning_tag_invalidates_cache(self):
+        """Test that recipe writes invalidate cached assigned_only listings"""
+        cache.clear()
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        recipe = Recipe.objects.create(
+            title="Tofu stir fry", time_minutes=15, price=6.00, user=self.user
+        )
+        res: Response = self.client.get(TAGS_URL, {"assigned_only": 1})
+        self.assertEqual(res.data["results"], [])
+
+        recipe.tags.add(tag)
+        tag.refresh_from_db()
+        res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(res.data["results"], [TagSerializer(tag).data])
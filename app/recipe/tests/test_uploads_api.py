@@ -0,0 +1,201 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageUpload
+from recipe import uploads
+
+
+def start_url(recipe_id):
+    return reverse("recipe:recipe-start-upload", args=[recipe_id])
+
+
+def upload_url(recipe_id, upload_id):
+    return reverse("recipe:recipe-upload", args=[recipe_id, upload_id])
+
+
+def finish_url(recipe_id, upload_id):
+    return reverse("recipe:recipe-finish-upload", args=[recipe_id, upload_id])
+
+
+def jpeg_bytes(size=(64, 32)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class FlakyStream:
+    """Request body whose connection drops after `limit` bytes"""
+
+    def __init__(self, data, limit):
+        self.stream = BytesIO(data[:limit])
+
+    def read(self, size):
+        data = self.stream.read(size)
+        if not data:
+            raise OSError("Connection reset by peer")
+        return data
+
+
+class ChunkedUploadTests(TestCase):
+    """Test resumable chunked image uploads"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_root = override_settings(MEDIA_ROOT=directory.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.user = get_user_model().objects.create_user("test@example.com", "password123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Toast", time_minutes=5, price="1.00"
+        )
+        self.content = jpeg_bytes()
+
+    def _start(self, size=None):
+        res: Response = self.client.post(
+            start_url(self.recipe.id),
+            {"filename": "photo.jpg", "size": size or len(self.content)},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data["id"]
+
+    def _put(self, upload_id, first, last, data=None):
+        return self.client.put(
+            upload_url(self.recipe.id, upload_id),
+            data=self.content[first:last + 1] if data is None else data,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {first}-{last}/{len(self.content)}",
+        )
+
+    def test_upload_in_chunks(self):
+        """Test uploading an image in chunks and attaching it to the recipe"""
+        upload_id = self._start()
+        middle = len(self.content) // 2
+
+        res = self._put(upload_id, 0, middle - 1)
+        self.assertEqual(res.data["offset"], middle)
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data["offset"], middle)
+        res = self._put(upload_id, middle, len(self.content) - 1)
+        self.assertEqual(res.data["offset"], len(self.content))
+
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open("rb") as image:
+            self.assertEqual(image.read(), self.content)
+        self.assertEqual(len(res.data["image_variants"]), 2)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+        self.assertFalse(os.path.exists(uploads.part_path(upload_id)))
+
+    def test_chunk_out_of_order(self):
+        """Test that a chunk not starting at the offset is rejected with it"""
+        upload_id = self._start()
+
+        res = self._put(upload_id, 10, 19)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data["offset"], 0)
+
+    def test_resume_after_interrupted_chunk(self):
+        """Test that the bytes received before a disconnect are kept"""
+        upload = RecipeImageUpload.objects.get(pk=self._start())
+
+        offset = uploads.write_chunk(
+            upload, 0, len(self.content), FlakyStream(self.content, 100)
+        )
+
+        self.assertEqual(offset, 100)
+        res = self._put(upload.pk, 100, len(self.content) - 1)
+        self.assertEqual(res.data["offset"], len(self.content))
+        res = self.client.post(finish_url(self.recipe.id, upload.pk))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_content_range(self):
+        """Test that chunks outside the announced size are rejected"""
+        upload_id = self._start()
+
+        res = self.client.put(
+            upload_url(self.recipe.id, upload_id),
+            data=b"x",
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes 0-0/{len(self.content) + 1}",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_finish_incomplete_upload(self):
+        """Test that an upload can't be finished before every byte arrived"""
+        upload_id = self._start()
+        self._put(upload_id, 0, 9)
+
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("offset", res.data)
+
+    def test_finish_not_an_image(self):
+        """Test that uploads which aren't images are rejected"""
+        self.content = b"not an image at all"
+        upload_id = self._start()
+        self._put(upload_id, 0, len(self.content) - 1)
+
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=1000)
+    def test_finish_too_many_pixels(self):
+        """Test that images over the pixel limit are rejected from the header"""
+        upload_id = self._start()
+        self._put(upload_id, 0, len(self.content) - 1)
+
+        res = self.client.post(finish_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pixels", res.data["image"][0])
+
+    @override_settings(RECIPE_UPLOAD_MAX_SIZE=10)
+    def test_start_too_large(self):
+        """Test that uploads over the size limit are refused upfront"""
+        res = self.client.post(
+            start_url(self.recipe.id), {"filename": "photo.jpg", "size": 11}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_upload_not_found(self):
+        """Test that uploads past RECIPE_UPLOAD_EXPIRY can't be resumed"""
+        upload_id = self._start()
+        RecipeImageUpload.objects.update(created_at=timezone.now() - timedelta(days=2))
+
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_users_recipe(self):
+        """Test that uploads to another user's recipe are not allowed"""
+        upload_id = self._start()
+        other = get_user_model().objects.create_user("other@example.com", "password123")
+        self.client.force_authenticate(other)
+
+        res = self.client.get(upload_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
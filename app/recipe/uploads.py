@@ -0,0 +1,120 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.http import UnreadablePostError
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import RecipeImageUpload
+from recipe import images
+
+CHUNK_READ_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class PartFile(File):
+    """Finished upload, moved instead of copied into the image storage"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def part_path(upload_id):
+    """Return the path the chunks of an upload are written to"""
+    return os.path.join(settings.MEDIA_ROOT, "uploads", "partial", f"{upload_id}.part")
+
+
+def active_uploads(recipe):
+    """Return the uploads of a recipe that can still be resumed"""
+    cutoff = timezone.now() - timedelta(seconds=settings.RECIPE_UPLOAD_EXPIRY)
+    return RecipeImageUpload.objects.filter(recipe=recipe, created_at__gte=cutoff)
+
+
+def start_upload(recipe, filename, size):
+    """Create an upload and its empty part file
+
+    Expired uploads of the recipe's owner are discarded on the way.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.RECIPE_UPLOAD_EXPIRY)
+    RecipeImageUpload.objects.filter(
+        recipe__user_id=recipe.user_id, created_at__lt=cutoff
+    ).delete()
+
+    upload = RecipeImageUpload.objects.create(recipe=recipe, filename=filename, size=size)
+    path = part_path(upload.pk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return upload
+
+
+def parse_content_range(header, size):
+    """Return (start, length) of a chunk from its Content-Range header"""
+    match = CONTENT_RANGE_RE.match(header or "")
+    if match is None:
+        raise ValidationError(
+            {"Content-Range": ['Must be "bytes <first>-<last>/<size>".']}
+        )
+    first, last, total = (int(group) for group in match.groups())
+    if total != size or not first <= last < size:
+        raise ValidationError(
+            {"Content-Range": [f"Must be a range within the {size} bytes announced."]}
+        )
+    return first, last - first + 1
+
+
+def write_chunk(upload, start, length, stream):
+    """Stream a chunk from `stream` to the part file and return the new offset
+
+    `stream` is None for an empty body. Returns None if the chunk doesn't
+    start at the upload's offset. Whatever
+    arrived before the client went away is kept, so it resumes from there.
+    Memory use is bounded by CHUNK_READ_SIZE whatever the chunk length.
+    """
+    if start != upload.offset:
+        return None
+
+    received = 0
+    with open(part_path(upload.pk), "r+b") as part:
+        part.seek(start)
+        try:
+            while stream is not None and received < length:
+                data = stream.read(min(CHUNK_READ_SIZE, length - received))
+                if not data:
+                    break
+                part.write(data)
+                received += len(data)
+        except (OSError, UnreadablePostError):
+            pass
+        part.flush()
+        os.fsync(part.fileno())
+
+    # Only advance from the offset this chunk started at, a concurrent
+    # request for the same range wins otherwise
+    updated = RecipeImageUpload.objects.filter(pk=upload.pk, offset=start).update(
+        offset=start + received
+    )
+    upload.refresh_from_db(fields=["offset"])
+    return upload.offset if updated else None
+
+
+def finish_upload(upload):
+    """Validate the received image, attach it to the recipe and drop the upload"""
+    if upload.offset != upload.size:
+        raise ValidationError(
+            {"offset": [f"Received {upload.offset} of {upload.size} bytes."]}
+        )
+
+    recipe = upload.recipe
+    with open(part_path(upload.pk), "rb") as part:
+        try:
+            images.inspect_image(part)
+        except ValueError as exc:
+            raise ValidationError({"image": [str(exc)]})
+        recipe.image.save(upload.filename, PartFile(part), save=False)
+    recipe.save(update_fields=["image"])
+    upload.delete()
+    images.schedule_variants(recipe)
+    return recipe
@@ -1,39 +1,98 @@
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.mixins import ListModelMixin, CreateModelMixin
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import QuerySet
+from django.conf import settings
+from django.db.models import Prefetch, QuerySet
+from django.shortcuts import get_object_or_404
 from core.models import Tag, Ingredient, Recipe
+from users.authentication import SignedTokenAuthentication
+from recipe import (
+    bulk,
+    export,
+    fast,
+    images,
+    importer,
+    similarity,
+    snapshots,
+    stats,
+    uploads,
+)
+from recipe.cache import cache_user_response
+from recipe.conditional import conditional_on_user_data
+from recipe.index import get_recipe_index
+from recipe.pagination import RecipeAttrCursorPagination, RecipeCursorPagination
+from recipe.search import search_recipes
 from recipe.serializers import (
     TagSerializer,
     IngredientSerializer,
     RecipeSerializer,
     RecipeDetailSerializer,
     RecipeImageSerializer,
+    RecipeImageUploadSerializer,
+    SparseFieldsMixin,
 )
 
 
 class BaseRecipeAttrViewset(GenericViewSet, ListModelMixin, CreateModelMixin):
     """Base viewset for recipe attributes"""
 
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    orderings = {
+        "name": ("name", "id"),
+        "most_used": ("-recipe_count", "name", "id"),
+    }
+
+    def get_ordering(self):
+        """Return the ordering picked with `?ordering=`, alphabetical by default"""
+        ordering = self.request.query_params.get("ordering", "name")
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {"ordering": [f"Must be one of: {', '.join(self.orderings)}."]}
+            )
+        return self.orderings[ordering]
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         assigned_only = bool(int(self.request.query_params.get("assigned_only", 0)))
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False).distinct()
-        return queryset.filter(user=self.request.user).order_by("name")
+            queryset = queryset.filter(recipe_count__gt=0)
+        return queryset.filter(user=self.request.user).order_by(*self.get_ordering())
+
+    @conditional_on_user_data
+    @cache_user_response
+    def list(self, request, *args, **kwargs):
+        """List objects from cache, answering 304 if the user's data is unchanged"""
+        if not settings.RECIPE_FAST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        serializer = fast.AttrRowSerializer(self.get_serializer_class())
+        queryset = serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            extra=(field.lstrip("-") for field in self.get_ordering()),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.render(page))
+        return Response(serializer.render(queryset))
 
     def perform_create(self, serializer):
         """Create a new object and associate the current user with it"""
         serializer.save(user=self.request.user)
 
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk_create(self, request):
+        """Create a list of objects in a single batch of inserts"""
+        results = bulk.create_attrs(self.get_serializer_class(), request.user, request.data)
+        return bulk.bulk_response(results)
+
 
 class TagViewSet(BaseRecipeAttrViewset):
     """Manage tags in the database."""
@@ -54,27 +113,96 @@ class RecipeViewSet(ModelViewSet):
 
     queryset: QuerySet = Recipe.objects.all()
     serializer_class = RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+        return [int(str_id) for str_id in qs.split(",") if str_id]
+
+    def select_fields(self, queryset):
+        """Load only the columns and relations the serializer will render
+
+        Relations rendered as primary keys only prefetch the related ids.
+        """
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, SparseFieldsMixin):
+            return queryset.prefetch_related("image_variants")
+        fields, nested = serializer_class.requested_fields(self.request)
+        prefetches = []
+        for name, model in (("tags", Tag), ("ingredients", Ingredient)):
+            if name in fields:
+                related = model.objects.all() if name in nested else model.objects.only("id")
+                prefetches.append(Prefetch(name, queryset=related.order_by("id")))
+        if "image_variants" in fields:
+            prefetches.append("image_variants")
+
+        columns = [
+            name for name in fields if name in ("title", "time_minutes", "price", "link")
+        ]
+        if self.request.method in SAFE_METHODS:
+            queryset = queryset.only("id", "user", *columns)
+        return queryset.prefetch_related(*prefetches)
 
     def get_queryset(self):
         """Return recipe objects for the current authenticated user only"""
+        return self.select_fields(self.get_filtered_queryset())
+
+    def get_filtered_queryset(self):
+        """Return the user's recipes matching the query parameters"""
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        match = self.request.query_params.get("match", "any")
         queryset = Recipe.objects.all()
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__in=tag_ids).distinct()
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__in=ingredient_ids).distinct()
+        if match not in ("any", "all"):
+            raise ValidationError({"match": ['Must be either "any" or "all".']})
+        if tags or ingredients:
+            queryset = get_recipe_index(self.request).filter(
+                queryset,
+                tag_ids=self._params_to_ints(tags) if tags else None,
+                ingredient_ids=self._params_to_ints(ingredients) if ingredients else None,
+                match_all=match == "all",
+            )
+
+        queryset = queryset.filter(user=self.request.user).order_by("-id")
+
+        search = self.request.query_params.get("search")
+        if search:
+            queryset = search_recipes(queryset, search)
+
+        return queryset
+
+    def get_ordering(self):
+        """Return the list ordering, most relevant first when searching"""
+        if self.request.query_params.get("search"):
+            return ("-relevance", "-id")
+        return ("-id",)
+
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        """List recipes, returning the most relevant ones first when searching"""
+        if not settings.RECIPE_FAST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        if settings.RECIPE_SNAPSHOTS and snapshots.can_serve(request):
+            return snapshots.list_response(self, request)
+
+        serializer = fast.RecipeRowSerializer(request)
+        queryset = serializer.values(
+            self.filter_queryset(self.get_filtered_queryset()),
+            extra=(field.lstrip("-") for field in self.get_ordering()),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.render(page))
+        return Response(serializer.render(queryset))
 
-        return queryset.filter(user=self.request.user).order_by("-id")
+    @conditional_on_user_data
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a recipe, answering 304 if the user's data is unchanged"""
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """Associate the created recipe with the current user"""
@@ -84,10 +212,109 @@ class RecipeViewSet(ModelViewSet):
         """Return appropriate serializer class"""
         if self.action == "retrieve":
             return RecipeDetailSerializer
-        if self.action == "upload_image":
+        if self.action in ("upload_image", "start_upload", "upload_chunk", "finish_upload"):
             return RecipeImageSerializer
         return self.serializer_class
 
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk_create(self, request):
+        """Create a list of recipes in a single batch of inserts"""
+        results = bulk.create_recipes(request.user, request.data)
+        return bulk.bulk_response(results)
+
+    @action(methods=["GET"], detail=False, url_path="export", url_name="export")
+    def export_recipes(self, request):
+        """Stream every recipe of the user as NDJSON or CSV"""
+        file_format = request.query_params.get("file_format", "ndjson")
+        if file_format not in export.EXPORT_FORMATS:
+            raise ValidationError(
+                {"file_format": [f"Must be one of: {', '.join(export.EXPORT_FORMATS)}."]}
+            )
+        return export.streaming_response(request.user, file_format)
+
+    @action(methods=["POST"], detail=False, url_path="import", url_name="import")
+    def import_recipes(self, request):
+        """Load recipes from an uploaded NDJSON or CSV file"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["No file was submitted."]})
+        file_format = request.data.get("file_format") or importer.guess_format(upload.name)
+        if file_format not in importer.IMPORT_FORMATS:
+            raise ValidationError(
+                {"file_format": [f"Must be one of: {', '.join(importer.IMPORT_FORMATS)}."]}
+            )
+
+        records = importer.IMPORT_FORMATS[file_format](importer.decode_lines(upload))
+        result = importer.import_recipes(request.user, records)
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+    @action(methods=["GET"], detail=False, url_path="pantry")
+    @conditional_on_user_data
+    def pantry(self, request):
+        """List recipes cookable from the given ingredients, fewest missing first"""
+        try:
+            ingredient_ids = self._params_to_ints(request.query_params.get("ingredients", ""))
+        except ValueError:
+            raise ValidationError({"ingredients": ["Must be a comma-separated list of ids."]})
+        try:
+            max_missing = int(request.query_params.get("max_missing", 0))
+        except ValueError:
+            raise ValidationError({"max_missing": ["Must be an integer."]})
+        if not 0 <= max_missing <= settings.RECIPE_PANTRY_MAX_MISSING:
+            raise ValidationError(
+                {
+                    "max_missing": [
+                        f"Must be between 0 and {settings.RECIPE_PANTRY_MAX_MISSING}."
+                    ]
+                }
+            )
+
+        matches = get_recipe_index(request).pantry(ingredient_ids, max_missing)
+        matches = matches[: settings.RECIPE_PANTRY_MAX_RESULTS]
+        recipes = self.select_fields(
+            Recipe.objects.filter(pk__in=[pk for pk, _ in matches])
+        ).in_bulk()
+        missing_ingredients = self._missing_ingredients(recipes, set(ingredient_ids))
+        data = []
+        for pk, missing in matches:
+            if pk not in recipes:
+                # Deleted since the index was read
+                continue
+            item = self.get_serializer(recipes[pk]).data
+            item["missing"] = missing
+            item["missing_ingredients"] = missing_ingredients.get(pk, [])
+            data.append(item)
+        return Response(data)
+
+    def _missing_ingredients(self, recipe_ids, pantry):
+        """Return {recipe id: sorted ids of its ingredients outside the pantry}"""
+        missing = {}
+        rows = Recipe.ingredients.through.objects.filter(recipe_id__in=recipe_ids)
+        for recipe_id, ingredient_id in rows.values_list("recipe_id", "ingredient_id"):
+            if ingredient_id not in pantry:
+                missing.setdefault(recipe_id, []).append(ingredient_id)
+        return {recipe_id: sorted(ids) for recipe_id, ids in missing.items()}
+
+    @action(methods=["GET"], detail=False, url_path="stats")
+    @conditional_on_user_data
+    def stats(self, request):
+        """Summarize the prices, durations, tags and ingredients of the user's recipes"""
+        return Response(stats.user_stats(request.user))
+
+    @action(methods=["GET"], detail=True, url_path="similar")
+    @conditional_on_user_data
+    def similar(self, request, pk=None):
+        """List the user's recipes with the most similar ingredients"""
+        recipe = self.get_object()
+        scores = similarity.similar_recipes(recipe, settings.RECIPE_SIMILAR_MAX_RESULTS)
+        recipes = self.select_fields(Recipe.objects.filter(pk__in=[pk for pk, _ in scores]))
+        recipes = recipes.in_bulk()
+        data = [
+            dict(self.get_serializer(recipes[pk]).data, similarity=score)
+            for pk, score in scores
+        ]
+        return Response(data)
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to an recipe"""
@@ -96,6 +323,64 @@ class RecipeViewSet(ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            images.schedule_variants(recipe)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_upload(self, upload_id):
+        """Return a resumable upload of the recipe or raise 404"""
+        return get_object_or_404(uploads.active_uploads(self.get_object()), pk=upload_id)
+
+    @action(methods=["POST"], detail=True, url_path="uploads", url_name="start-upload")
+    def start_upload(self, request, pk=None):
+        """Start a chunked image upload of `size` bytes"""
+        serializer = RecipeImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = uploads.start_upload(
+            self.get_object(),
+            serializer.validated_data["filename"],
+            serializer.validated_data["size"],
+        )
+        return Response(
+            RecipeImageUploadSerializer(upload).data, status=status.HTTP_201_CREATED
+        )
+
+    @action(
+        methods=["GET", "PUT"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]{36})",
+        url_name="upload",
+    )
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """Report the offset to resume from, or append the chunk in the body
+
+        A chunk is sent with a `Content-Range: bytes <first>-<last>/<size>`
+        header and must start at the current offset, otherwise the response
+        is 409 with the offset to resume from.
+        """
+        upload = self.get_upload(upload_id)
+        if request.method == "GET":
+            return Response(RecipeImageUploadSerializer(upload).data)
+
+        start, length = uploads.parse_content_range(
+            request.META.get("HTTP_CONTENT_RANGE"), upload.size
+        )
+        offset = uploads.write_chunk(upload, start, length, request.stream)
+        if offset is None:
+            upload.refresh_from_db(fields=["offset"])
+            return Response(
+                RecipeImageUploadSerializer(upload).data, status=status.HTTP_409_CONFLICT
+            )
+        return Response(RecipeImageUploadSerializer(upload).data)
+
+    @action(
+        methods=["POST"],
+        detail=True,
+        url_path=r"uploads/(?P<upload_id>[0-9a-f-]{36})/finish",
+        url_name="finish-upload",
+    )
+    def finish_upload(self, request, pk=None, upload_id=None):
+        """Validate the fully received image and attach it to the recipe"""
+        recipe = uploads.finish_upload(self.get_upload(upload_id))
+        return Response(self.get_serializer(recipe).data)
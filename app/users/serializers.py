@@ -4,6 +4,7 @@ from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
 from core.models import UserModel
+from users.authentication import revoke_tokens
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -27,6 +28,7 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            revoke_tokens(user)
 
         return user
 
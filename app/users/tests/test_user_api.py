@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.test import APIClient
 
@@ -10,6 +11,7 @@ from core.models import UserModel
 CREATE_USER_URL = reverse("users:create")
 TOKEN_URL = reverse("users:token")
 ME_URL = reverse("users:me")
+LOGOUT_URL = reverse("users:logout")
 
 
 def create_user(**params):
@@ -134,3 +136,98 @@ class PrivateUserApiTest(TestCase):
         self.assertEqual(self.user.name, new_user_info.get("name"))
         self.assertTrue(self.user.check_password(new_user_info.get("password")))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class SignedTokenApiTests(TestCase):
+    """Test issuing and authenticating with signed tokens"""
+
+    def setUp(self):
+        self.payload = {"email": "test@example.com", "password": "password123"}
+        self.user: UserModel = create_user(**self.payload, name="test user")
+        self.client = APIClient()
+
+    def _obtain_signed_token(self):
+        """Log in and return a signed token for the test user"""
+        res: Response = self.client.post(f"{TOKEN_URL}?signed=1", self.payload)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data["token"]
+
+    def test_create_signed_token(self):
+        """Test that a signed token is issued without storing a token row"""
+        token = self._obtain_signed_token()
+
+        self.assertTrue(token)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+
+    def test_signed_flag_accepts_booleans(self):
+        """Test that `signed` takes true and false as well as 1 and 0"""
+        res: Response = self.client.post(f"{TOKEN_URL}?signed=true", self.payload)
+        self.assertIn("expires_in", res.data)
+
+        res = self.client.post(f"{TOKEN_URL}?signed=false", self.payload)
+        self.assertNotIn("expires_in", res.data)
+        self.assertTrue(Token.objects.filter(user=self.user).exists())
+
+    def test_invalid_signed_flag(self):
+        """Test that an unknown `signed` value is rejected"""
+        res: Response = self.client.post(f"{TOKEN_URL}?signed=abc", self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("signed", res.data)
+
+    def test_authenticate_with_signed_token(self):
+        """Test that a signed token authenticates with a single user lookup"""
+        token = self._obtain_signed_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        with self.assertNumQueries(1):
+            res: Response = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_tampered_signed_token_rejected(self):
+        """Test that a modified signed token is rejected"""
+        token = self._obtain_signed_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}x")
+
+        res: Response = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_TOKEN_MAX_AGE=-1)
+    def test_expired_signed_token_rejected(self):
+        """Test that a signed token older than its max age is rejected"""
+        token = self._obtain_signed_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        res: Response = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_tokens(self):
+        """Test that logging out invalidates signed and stored tokens"""
+        token = self._obtain_signed_token()
+        stored_token = self.client.post(TOKEN_URL, self.payload).data["token"]
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        res: Response = self.client.post(LOGOUT_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {stored_token}")
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_signed_tokens(self):
+        """Test that changing the password invalidates signed tokens"""
+        old_token = self._obtain_signed_token()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {old_token}")
+
+        res: Response = self.client.patch(ME_URL, {"password": "newpassword"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
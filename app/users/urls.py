@@ -8,5 +8,6 @@ app_name = "users"
 urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name="create"),
     path("token/", views.CreateTokenView.as_view(), name="token"),
+    path("logout/", views.LogoutView.as_view(), name="logout"),
     path("me", views.ManageUserView.as_view(), name="me"),
 ]
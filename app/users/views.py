@@ -1,9 +1,21 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from users.authentication import (
+    SignedTokenAuthentication,
+    create_signed_token,
+    revoke_tokens,
+)
 from users.serializers import UserSerializer, AuthTokenSerializer
 
+# Accepted values of `?signed=`
+SIGNED_VALUES = {"1": True, "true": True, "0": False, "false": False}
+
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user."""
@@ -12,17 +24,57 @@ class CreateUserView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    """Create a new auth token for user"""
+    """Create a new auth token for user
+
+    Pass `?signed=1` (or `true`) to receive a stateless signed token instead of a stored one.
+    """
 
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        signed = request.query_params.get("signed", "0").lower()
+        if signed not in SIGNED_VALUES:
+            raise ValidationError({"signed": ["Must be one of: 0, 1, true, false."]})
+        if not SIGNED_VALUES[signed]:
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.serializer_class(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data["user"]
+
+        return Response(
+            {
+                "token": create_signed_token(user),
+                "expires_in": settings.SIGNED_TOKEN_MAX_AGE,
+            }
+        )
+
+
+class LogoutView(APIView):
+    """Revoke every token issued to the authenticated user"""
+
+    authentication_classes = (
+        authentication.TokenAuthentication,
+        SignedTokenAuthentication,
+    )
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        revoke_tokens(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
 
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        authentication.TokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):